@@ -411,8 +411,8 @@ def main():
         print("Please ensure MySQL is running and credentials are correct in .env file")
         return
     
-    posts = db_handler.fetch_cleaned_posts(conn)
-    conn.close()
+    with conn:
+        posts = db_handler.fetch_cleaned_posts(conn)
     
     if not posts:
         print("ERROR: No cleaned posts found")
@@ -13,4 +13,5 @@ REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT")
 DB_HOST = os.getenv("DB_HOST")
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_NAME = os.getenv("DB_NAME")
\ No newline at end of file
+DB_NAME = os.getenv("DB_NAME")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
@@ -151,83 +151,82 @@ def run_analysis():
     if not connection:
         return
 
-    posts = db_handler.fetch_cleaned_posts(connection)
-    if not posts or len(posts) < 5:
-        print("Not enough posts to analyze (minimum 5 required).")
-        connection.close()
-        return
+    with connection:
+        posts = db_handler.fetch_cleaned_posts(connection)
+        if not posts or len(posts) < 5:
+            print("Not enough posts to analyze (minimum 5 required).")
+            return
 
-    print(f"Found {len(posts)} posts to analyze.")
+        print(f"Found {len(posts)} posts to analyze.")
     
-    # Step 1: Create document embeddings (message content abstraction)
-    model = create_document_embeddings(posts)
+        # Step 1: Create document embeddings (message content abstraction)
+        model = create_document_embeddings(posts)
     
-    # Step 2: Generate vectors for all posts
-    vectors = []
-    for post in posts:
-        text = (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
-        if text:
-            vector = model.infer_vector(text.split())
-            vectors.append(vector.astype(np.float64))  # Ensure consistent data type
-        else:
-            vectors.append(np.zeros(model.vector_size, dtype=np.float64))
-    
-    vectors = np.array(vectors, dtype=np.float64)
-    
-    # Step 3: Find optimal number of clusters
-    optimal_k = find_optimal_clusters(vectors)
-    
-    # Step 4: Perform K-means clustering with improved parameters
-    print(f"Performing K-means clustering with {optimal_k} clusters...")
-    kmeans = KMeans(
-        n_clusters=optimal_k, 
-        random_state=42, 
-        n_init=20,              # More initializations to find better centroids
-        max_iter=500,           # More iterations for convergence
-        algorithm='lloyd',      # Use Lloyd's algorithm for better results
-        init='k-means++'        # Smart initialization
-    )
-    cluster_labels = kmeans.fit_predict(vectors)
+        # Step 2: Generate vectors for all posts
+        vectors = []
+        for post in posts:
+            text = (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
+            if text:
+                vector = model.infer_vector(text.split())
+                vectors.append(vector.astype(np.float64))  # Ensure consistent data type
+            else:
+                vectors.append(np.zeros(model.vector_size, dtype=np.float64))
+    
+        vectors = np.array(vectors, dtype=np.float64)
+    
+        # Step 3: Find optimal number of clusters
+        optimal_k = find_optimal_clusters(vectors)
+    
+        # Step 4: Perform K-means clustering with improved parameters
+        print(f"Performing K-means clustering with {optimal_k} clusters...")
+        kmeans = KMeans(
+            n_clusters=optimal_k, 
+            random_state=42, 
+            n_init=20,              # More initializations to find better centroids
+            max_iter=500,           # More iterations for convergence
+            algorithm='lloyd',      # Use Lloyd's algorithm for better results
+            init='k-means++'        # Smart initialization
+        )
+        cluster_labels = kmeans.fit_predict(vectors)
     
-    # Save the clustering model
-    with open("models/kmeans.pkl", "wb") as f:
-        pickle.dump(kmeans, f)
-    print("K-Means clustering model saved.")
+        # Save the clustering model
+        with open("models/kmeans.pkl", "wb") as f:
+            pickle.dump(kmeans, f)
+        print("K-Means clustering model saved.")
     
-    # Step 5: Extract keywords for each cluster
-    cluster_keywords = extract_cluster_keywords(posts, cluster_labels)
+        # Step 5: Extract keywords for each cluster
+        cluster_keywords = extract_cluster_keywords(posts, cluster_labels)
     
-    # Step 6: Update database with analysis results
-    for i, post in enumerate(posts):
-        post_id = post['id']
-        vector = vectors[i]
-        cluster_id = int(cluster_labels[i])
+        # Step 6: Update database with analysis results
+        for i, post in enumerate(posts):
+            post_id = post['id']
+            vector = vectors[i]
+            cluster_id = int(cluster_labels[i])
         
-        db_handler.update_post_analysis(connection, post_id, vector, cluster_id)
-        print(f"Updated post {post_id} with vector and cluster ID {cluster_id}")
+            db_handler.update_post_analysis(connection, post_id, vector, cluster_id)
+            print(f"Updated post {post_id} with vector and cluster ID {cluster_id}")
     
-    # Step 7: Display clustering results
-    print(f"\n=== CLUSTERING RESULTS ===")
-    print(f"Total posts analyzed: {len(posts)}")
-    print(f"Number of clusters: {optimal_k}")
+        # Step 7: Display clustering results
+        print(f"\n=== CLUSTERING RESULTS ===")
+        print(f"Total posts analyzed: {len(posts)}")
+        print(f"Number of clusters: {optimal_k}")
     
-    for cluster_id in range(optimal_k):
-        cluster_posts = [posts[i] for i in range(len(posts)) if cluster_labels[i] == cluster_id]
-        keywords = cluster_keywords.get(cluster_id, [])
+        for cluster_id in range(optimal_k):
+            cluster_posts = [posts[i] for i in range(len(posts)) if cluster_labels[i] == cluster_id]
+            keywords = cluster_keywords.get(cluster_id, [])
         
-        print(f"\nCluster {cluster_id}: {len(cluster_posts)} posts")
-        if keywords:
-            keyword_str = ', '.join([word for word, _ in keywords[:5]])
-            print(f"  Top keywords: {keyword_str}")
+            print(f"\nCluster {cluster_id}: {len(cluster_posts)} posts")
+            if keywords:
+                keyword_str = ', '.join([word for word, _ in keywords[:5]])
+                print(f"  Top keywords: {keyword_str}")
         
-        # Show sample post titles
-        sample_titles = [post.get('title', 'No title')[:60] + '...' 
-                        for post in cluster_posts[:3]]
-        for title in sample_titles:
-            print(f"  - {title}")
+            # Show sample post titles
+            sample_titles = [post.get('title', 'No title')[:60] + '...' 
+                            for post in cluster_posts[:3]]
+            for title in sample_titles:
+                print(f"  - {title}")
 
-    print("\nAnalysis finished successfully.")
-    connection.close()
+        print("\nAnalysis finished successfully.")
 
 
 def create_visualization(save_path="visualizations"):
@@ -246,72 +245,71 @@ def create_visualization(save_path="visualizations"):
         if not connection:
             return
             
-        posts = db_handler.fetch_all_analyzed_posts(connection)
-        if not posts:
-            print("No analyzed posts found.")
-            connection.close()
-            return
+        with connection:
+            posts = db_handler.fetch_all_analyzed_posts(connection)
+            if not posts:
+                print("No analyzed posts found.")
+                return
         
-        # Create visualizations directory
-        os.makedirs(save_path, exist_ok=True)
+            # Create visualizations directory
+            os.makedirs(save_path, exist_ok=True)
         
-        # Group posts by cluster for analysis
-        clusters = {}
-        for post in posts:
-            cluster_id = post['cluster_id']
-            if cluster_id not in clusters:
-                clusters[cluster_id] = []
-            clusters[cluster_id].append(post)
+            # Group posts by cluster for analysis
+            clusters = {}
+            for post in posts:
+                cluster_id = post['cluster_id']
+                if cluster_id not in clusters:
+                    clusters[cluster_id] = []
+                clusters[cluster_id].append(post)
         
-        # Create cluster size visualization
-        cluster_sizes = [len(clusters.get(i, [])) for i in range(len(kmeans.cluster_centers_))]
+            # Create cluster size visualization
+            cluster_sizes = [len(clusters.get(i, [])) for i in range(len(kmeans.cluster_centers_))]
         
-        plt.figure(figsize=(10, 6))
-        plt.bar(range(len(cluster_sizes)), cluster_sizes, color='skyblue', edgecolor='navy', alpha=0.7)
-        plt.xlabel('Cluster ID')
-        plt.ylabel('Number of Posts')
-        plt.title('Distribution of Posts Across Clusters')
-        plt.xticks(range(len(cluster_sizes)))
+            plt.figure(figsize=(10, 6))
+            plt.bar(range(len(cluster_sizes)), cluster_sizes, color='skyblue', edgecolor='navy', alpha=0.7)
+            plt.xlabel('Cluster ID')
+            plt.ylabel('Number of Posts')
+            plt.title('Distribution of Posts Across Clusters')
+            plt.xticks(range(len(cluster_sizes)))
         
-        # Add value labels on bars
-        for i, v in enumerate(cluster_sizes):
-            plt.text(i, v + 0.5, str(v), ha='center', va='bottom')
+            # Add value labels on bars
+            for i, v in enumerate(cluster_sizes):
+                plt.text(i, v + 0.5, str(v), ha='center', va='bottom')
         
-        plt.tight_layout()
-        plt.savefig(f"{save_path}/cluster_distribution.png", dpi=300, bbox_inches='tight')
-        plt.close()
+            plt.tight_layout()
+            plt.savefig(f"{save_path}/cluster_distribution.png", dpi=300, bbox_inches='tight')
+            plt.close()
         
-        # Create word clouds for each cluster
-        for cluster_id, cluster_posts in clusters.items():
-            if cluster_posts:
-                # Combine all text in cluster
-                cluster_text = ' '.join([
-                    (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
-                    for post in cluster_posts
-                ])
+            # Create word clouds for each cluster
+            for cluster_id, cluster_posts in clusters.items():
+                if cluster_posts:
+                    # Combine all text in cluster
+                    cluster_text = ' '.join([
+                        (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
+                        for post in cluster_posts
+                    ])
                 
-                if cluster_text and len(cluster_text) > 50:
-                    try:
-                        wordcloud = WordCloud(
-                            width=800, height=400, 
-                            background_color='white',
-                            max_words=50,
-                            colormap='viridis'
-                        ).generate(cluster_text)
+                    if cluster_text and len(cluster_text) > 50:
+                        try:
+                            wordcloud = WordCloud(
+                                width=800, height=400, 
+                                background_color='white',
+                                max_words=50,
+                                colormap='viridis'
+                            ).generate(cluster_text)
                         
-                        plt.figure(figsize=(10, 5))
-                        plt.imshow(wordcloud, interpolation='bilinear')
-                        plt.axis('off')
-                        plt.title(f'Cluster {cluster_id} Word Cloud ({len(cluster_posts)} posts)')
-                        plt.tight_layout()
-                        plt.savefig(f"{save_path}/cluster_{cluster_id}_wordcloud.png", 
-                                  dpi=300, bbox_inches='tight')
-                        plt.close()
-                    except Exception as e:
-                        print(f"Could not create word cloud for cluster {cluster_id}: {e}")
+                            plt.figure(figsize=(10, 5))
+                            plt.imshow(wordcloud, interpolation='bilinear')
+                            plt.axis('off')
+                            plt.title(f'Cluster {cluster_id} Word Cloud ({len(cluster_posts)} posts)')
+                            plt.tight_layout()
+                            plt.savefig(f"{save_path}/cluster_{cluster_id}_wordcloud.png", 
+                                      dpi=300, bbox_inches='tight')
+                            plt.close()
+                        except Exception as e:
+                            print(f"Could not create word cloud for cluster {cluster_id}: {e}")
         
-        print(f"Visualizations saved to {save_path}/ directory")
-        connection.close()
+            print(f"Visualizations saved to {save_path}/ directory")
         
     except Exception as e:
         print(f"Error creating visualizations: {e}")
@@ -335,90 +333,89 @@ def interpret_clusters():
     if not connection: 
         return
 
-    posts = db_handler.fetch_all_analyzed_posts(connection)
-    if not posts:
-        print("No analyzed posts found in the database.")
-        connection.close()
-        return
+    with connection:
+        posts = db_handler.fetch_all_analyzed_posts(connection)
+        if not posts:
+            print("No analyzed posts found in the database.")
+            return
     
-    # Group posts by cluster
-    clusters = {}
-    for post in posts:
-        cluster_id = post['cluster_id']
-        if cluster_id not in clusters:
-            clusters[cluster_id] = []
-        clusters[cluster_id].append(post)
+        # Group posts by cluster
+        clusters = {}
+        for post in posts:
+            cluster_id = post['cluster_id']
+            if cluster_id not in clusters:
+                clusters[cluster_id] = []
+            clusters[cluster_id].append(post)
     
-    centroids = kmeans.cluster_centers_
+        centroids = kmeans.cluster_centers_
     
-    print(f"\n{'='*60}")
-    print(f"CLUSTER INTERPRETATION RESULTS")
-    print(f"{'='*60}")
-    print(f"Total clusters: {len(centroids)}")
-    print(f"Total posts analyzed: {len(posts)}")
+        print(f"\n{'='*60}")
+        print(f"CLUSTER INTERPRETATION RESULTS")
+        print(f"{'='*60}")
+        print(f"Total clusters: {len(centroids)}")
+        print(f"Total posts analyzed: {len(posts)}")
     
-    for cluster_id, centroid in enumerate(centroids):
-        cluster_posts = clusters.get(cluster_id, [])
+        for cluster_id, centroid in enumerate(centroids):
+            cluster_posts = clusters.get(cluster_id, [])
         
-        print(f"\n{'-'*50}")
-        print(f"CLUSTER {cluster_id}")
-        print(f"{'-'*50}")
-        print(f"Number of posts: {len(cluster_posts)}")
+            print(f"\n{'-'*50}")
+            print(f"CLUSTER {cluster_id}")
+            print(f"{'-'*50}")
+            print(f"Number of posts: {len(cluster_posts)}")
         
-        if not cluster_posts:
-            print("No posts in this cluster.")
-            continue
+            if not cluster_posts:
+                print("No posts in this cluster.")
+                continue
         
-        # Find most representative posts (closest to centroid)
-        try:
-            post_vectors = np.array([np.frombuffer(post['embedding_vector'], dtype=np.float64) 
-                                   for post in cluster_posts])
-            distances = distance.cdist(post_vectors, [centroid], 'euclidean').flatten()
-            closest_indices = distances.argsort()[:5]
+            # Find most representative posts (closest to centroid)
+            try:
+                post_vectors = np.array([np.frombuffer(post['embedding_vector'], dtype=np.float64) 
+                                       for post in cluster_posts])
+                distances = distance.cdist(post_vectors, [centroid], 'euclidean').flatten()
+                closest_indices = distances.argsort()[:5]
             
-            print("Most representative posts (closest to centroid):")
-            for i, index in enumerate(closest_indices, 1):
-                title = cluster_posts[index]['title'][:80] + '...' if len(cluster_posts[index]['title']) > 80 else cluster_posts[index]['title']
-                print(f"  {i}. {title}")
+                print("Most representative posts (closest to centroid):")
+                for i, index in enumerate(closest_indices, 1):
+                    title = cluster_posts[index]['title'][:80] + '...' if len(cluster_posts[index]['title']) > 80 else cluster_posts[index]['title']
+                    print(f"  {i}. {title}")
                 
-        except Exception as e:
-            print(f"Could not calculate distances: {e}")
-            print("Sample posts from this cluster:")
-            for i, post in enumerate(cluster_posts[:5], 1):
-                title = post['title'][:80] + '...' if len(post['title']) > 80 else post['title']
-                print(f"  {i}. {title}")
+            except Exception as e:
+                print(f"Could not calculate distances: {e}")
+                print("Sample posts from this cluster:")
+                for i, post in enumerate(cluster_posts[:5], 1):
+                    title = post['title'][:80] + '...' if len(post['title']) > 80 else post['title']
+                    print(f"  {i}. {title}")
         
-        # Extract and display cluster keywords
-        cluster_text = ' '.join([
-            (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
-            for post in cluster_posts
-        ])
+            # Extract and display cluster keywords
+            cluster_text = ' '.join([
+                (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).strip()
+                for post in cluster_posts
+            ])
         
-        if cluster_text:
-            words = cluster_text.lower().split()
-            word_freq = Counter(words)
+            if cluster_text:
+                words = cluster_text.lower().split()
+                word_freq = Counter(words)
             
-            # Filter common words
-            common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
-                           'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 
-                           'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'}
+                # Filter common words
+                common_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 
+                               'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have', 
+                               'has', 'had', 'do', 'does', 'did', 'will', 'would', 'could', 'should'}
             
-            keywords = []
-            for word, freq in word_freq.most_common(20):
-                if len(word) > 2 and word not in common_words and word.isalpha():
-                    keywords.append(f"{word}({freq})")
-                    if len(keywords) >= 10:
-                        break
+                keywords = []
+                for word, freq in word_freq.most_common(20):
+                    if len(word) > 2 and word not in common_words and word.isalpha():
+                        keywords.append(f"{word}({freq})")
+                        if len(keywords) >= 10:
+                            break
             
-            if keywords:
-                print(f"Top keywords: {', '.join(keywords)}")
+                if keywords:
+                    print(f"Top keywords: {', '.join(keywords)}")
     
-    print(f"\n{'='*60}")
+        print(f"\n{'='*60}")
     
-    # Create visualizations
-    create_visualization()
+        # Create visualizations
+        create_visualization()
     
-    connection.close()    
 
 def find_matching_cluster(query_text):
     """
@@ -458,62 +455,61 @@ def find_matching_cluster(query_text):
     # Method 2: If we have diverse clusters, use keyword-based matching
     connection = db_handler.create_connection()
     if connection:
-        cursor = connection.cursor(dictionary=True)
+        with connection:
+            cursor = connection.cursor(dictionary=True)
         
-        # Get cluster statistics
-        cursor.execute("""
-            SELECT cluster_id, COUNT(*) as count 
-            FROM reddit_posts 
-            WHERE cluster_id IS NOT NULL 
-            GROUP BY cluster_id
-        """)
-        cluster_stats = cursor.fetchall()
+            # Get cluster statistics
+            cursor.execute("""
+                SELECT cluster_id, COUNT(*) as count 
+                FROM reddit_posts 
+                WHERE cluster_id IS NOT NULL 
+                GROUP BY cluster_id
+            """)
+            cluster_stats = cursor.fetchall()
         
-        # If we have more balanced clusters, use keyword matching
-        if len(cluster_stats) > 2:
-            query_words = set(cleaned_query.lower().split())
-            best_cluster = doc2vec_cluster
-            best_score = 0
+            # If we have more balanced clusters, use keyword matching
+            if len(cluster_stats) > 2:
+                query_words = set(cleaned_query.lower().split())
+                best_cluster = doc2vec_cluster
+                best_score = 0
             
-            for stat in cluster_stats:
-                cluster_id = stat['cluster_id']
+                for stat in cluster_stats:
+                    cluster_id = stat['cluster_id']
                 
-                # Get sample posts from this cluster
-                cursor.execute("""
-                    SELECT title, post_body_cleaned 
-                    FROM reddit_posts 
-                    WHERE cluster_id = %s 
-                    LIMIT 10
-                """, (cluster_id,))
-                posts = cursor.fetchall()
+                    # Get sample posts from this cluster
+                    cursor.execute("""
+                        SELECT title, post_body_cleaned 
+                        FROM reddit_posts 
+                        WHERE cluster_id = %s 
+                        LIMIT 10
+                    """, (cluster_id,))
+                    posts = cursor.fetchall()
                 
-                # Calculate keyword overlap score
-                cluster_text = ' '.join([
-                    (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).lower()
-                    for post in posts
-                ])
-                cluster_words = set(cluster_text.split())
+                    # Calculate keyword overlap score
+                    cluster_text = ' '.join([
+                        (post.get('title', '') + ' ' + post.get('post_body_cleaned', '')).lower()
+                        for post in posts
+                    ])
+                    cluster_words = set(cluster_text.split())
                 
-                # Calculate Jaccard similarity
-                intersection = len(query_words.intersection(cluster_words))
-                union = len(query_words.union(cluster_words))
+                    # Calculate Jaccard similarity
+                    intersection = len(query_words.intersection(cluster_words))
+                    union = len(query_words.union(cluster_words))
                 
-                if union > 0:
-                    jaccard_score = intersection / union
+                    if union > 0:
+                        jaccard_score = intersection / union
                     
-                    # Weight smaller clusters higher to overcome imbalance
-                    weight = 1.0 / (stat['count'] ** 0.3)  # Reduce influence of large clusters
-                    weighted_score = jaccard_score * weight
+                        # Weight smaller clusters higher to overcome imbalance
+                        weight = 1.0 / (stat['count'] ** 0.3)  # Reduce influence of large clusters
+                        weighted_score = jaccard_score * weight
                     
-                    if weighted_score > best_score:
-                        best_score = weighted_score
-                        best_cluster = cluster_id
+                        if weighted_score > best_score:
+                            best_score = weighted_score
+                            best_cluster = cluster_id
             
-            cursor.close()
-            connection.close()
-            return int(best_cluster)
+                cursor.close()
+                return int(best_cluster)
         
-        cursor.close()
-        connection.close()
+            cursor.close()
     
     return int(doc2vec_cluster)    
\ No newline at end of file
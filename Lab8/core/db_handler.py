@@ -1,26 +1,32 @@
 import mysql.connector
 from mysql.connector import Error
 import config
+from core.db_pool import ConnectionPool
 import numpy as np
 
 
+_pool = None
+
 def create_connection():
-    """Teh database connection."""
-    connection = None
+    """Teh database connection (from a shared pool; use it as `with connection:` so it always goes back)."""
+    global _pool
     try:
-        connection = mysql.connector.connect(
-            host=config.DB_HOST,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD,
-            database=config.DB_NAME
-        )
-        if connection.is_connected():
-            print("Successfully connected to the database.")
+        if _pool is None:
+            _pool = ConnectionPool({
+                "host": config.DB_HOST,
+                "user": config.DB_USER,
+                "password": config.DB_PASSWORD,
+                "database": config.DB_NAME,
+            }, size=config.DB_POOL_SIZE)
+        connection = _pool.get_connection()
     except Error as e:
         print(f"Error while connecting to MySQL: {e}")
         return None
     return connection
 
+def pool_stats():
+    return _pool.stats() if _pool is not None else {}
+
 def create_table(connection):
     """Create the reddit_posts table incase its not there!"""
     cursor = connection.cursor()
@@ -110,49 +110,48 @@ def run_preprocessor():
     if not connection:
         return
 
-    posts_to_process = db_handler.fetch_unprocessed_posts(connection)
-    if not posts_to_process:
-        print("No new posts to process.")
-        connection.close()
-        return
+    with connection:
+        posts_to_process = db_handler.fetch_unprocessed_posts(connection)
+        if not posts_to_process:
+            print("No new posts to process.")
+            return
 
-    print(f"Found {len(posts_to_process)} posts to clean.")
+        print(f"Found {len(posts_to_process)} posts to clean.")
     
-    for post in posts_to_process:
-        # Combine title and body for comprehensive text analysis
-        combined_text = (post['title'] or '') + " " + (post['post_body_raw'] or '')
+        for post in posts_to_process:
+            # Combine title and body for comprehensive text analysis
+            combined_text = (post['title'] or '') + " " + (post['post_body_raw'] or '')
         
-        # Clean the text according to assignment requirements
-        cleaned_text = clean_text(combined_text)
+            # Clean the text according to assignment requirements
+            cleaned_text = clean_text(combined_text)
         
-        # Extract keywords and topics as required by assignment
-        keywords = extract_keywords(cleaned_text, top_n=15)
-        keywords_str = ', '.join(keywords) if keywords else ''
+            # Extract keywords and topics as required by assignment
+            keywords = extract_keywords(cleaned_text, top_n=15)
+            keywords_str = ', '.join(keywords) if keywords else ''
         
-        # Handle image text extraction (placeholder for now)
-        image_text = ""  # Would extract from embedded images using pytesseract
+            # Handle image text extraction (placeholder for now)
+            image_text = ""  # Would extract from embedded images using pytesseract
         
-        # Update database with cleaned text, keywords, and image text
-        db_handler.update_cleaned_post(connection, post['id'], cleaned_text)
+            # Update database with cleaned text, keywords, and image text
+            db_handler.update_cleaned_post(connection, post['id'], cleaned_text)
         
-        # Update keywords field if it exists in database schema
-        try:
-            cursor = connection.cursor()
-            update_keywords_query = """
-            UPDATE reddit_posts 
-            SET keywords = %s, image_text = %s 
-            WHERE id = %s
-            """
-            cursor.execute(update_keywords_query, (keywords_str, image_text, post['id']))
-            connection.commit()
-            cursor.close()
-        except Exception as e:
-            # Keywords field might not exist in current schema
-            pass
+            # Update keywords field if it exists in database schema
+            try:
+                cursor = connection.cursor()
+                update_keywords_query = """
+                UPDATE reddit_posts 
+                SET keywords = %s, image_text = %s 
+                WHERE id = %s
+                """
+                cursor.execute(update_keywords_query, (keywords_str, image_text, post['id']))
+                connection.commit()
+                cursor.close()
+            except Exception as e:
+                # Keywords field might not exist in current schema
+                pass
             
-        print(f"Cleaned and updated post: {post['id']}")
-        if keywords:
-            print(f"  Keywords: {keywords_str[:100]}...")
+            print(f"Cleaned and updated post: {post['id']}")
+            if keywords:
+                print(f"  Keywords: {keywords_str[:100]}...")
 
-    print("Preprocessing finished.")
-    connection.close()
\ No newline at end of file
+        print("Preprocessing finished.")
\ No newline at end of file
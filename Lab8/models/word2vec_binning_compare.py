@@ -76,9 +76,8 @@ def fetch_cleaned_posts():
     conn = db_handler.create_connection()
     if not conn:
         raise RuntimeError('Could not connect to DB')
-    posts = db_handler.fetch_cleaned_posts(conn)
-    conn.close()
-    return posts
+    with conn:
+        return db_handler.fetch_cleaned_posts(conn)
 
 
 def tokenize_post(text):
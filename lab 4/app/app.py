@@ -8,43 +8,84 @@ import pandas as pd
 from flask import Flask, jsonify, render_template, request,Response
 import mysql.connector
 import os
+import logging
 import pyarrow.parquet as pq
-from backtest import fetch_and_store_prices
-from strategies import sma,consensus,ema_rsi
+from backtest import fetch_and_store_prices, load_prices_from_parquet, load_price_matrix, price_versions
 import engine
+import registry
+import sweep
+import walkforward
+import batch
+import montecarlo
+import live
+import profiling
+import ledger
+import indicators
+import reports
+import results
+import runcache
+import jobs
 
 #env-based config (MYSQL_HOST, MYSQL_DB, etc.)
-from db_config import get_connection
+from db_config import get_connection, pool_stats
 
 
 app = Flask(__name__)
 
+JOBS = jobs.JobQueue(workers=int(os.environ.get("BACKTEST_WORKERS", "2")),
+                     max_pending=int(os.environ.get("BACKTEST_MAX_PENDING", "20")))
+
+# one JSON line per timed run, TIMINGS_LOG=path to keep them in a file (see profiling.py)
+if os.environ.get("TIMINGS_LOG"):
+    _timings_file = logging.FileHandler(os.environ["TIMINGS_LOG"])
+    _timings_file.setFormatter(logging.Formatter("%(message)s"))
+    profiling.log.addHandler(_timings_file)
+    profiling.log.setLevel(logging.INFO)
+
+# paper-trading portfolios, advanced one daily close at a time (see live.py)
+PAPER = live.PaperBook()
+
 # tiny DB helpers 
+# a pooled connection per DB operation: `with _db() as cn:` hands it back when the block ends,
+# so none is held while prices are fetched or the engine runs
+def _db():
+    return get_connection()
+
 def _all(sql: str, params=()):
-    cn = get_connection(); cur = cn.cursor()
-    cur.execute(sql, params)
-    rows = cur.fetchall()
-    cur.close(); cn.close()
+    with _db() as cn:
+        cur = cn.cursor()
+        cur.execute(sql, params)
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 def _one(sql: str, params=()):
-    cn = get_connection(); cur = cn.cursor()
-    cur.execute(sql, params)
-    row = cur.fetchone()
-    cur.close(); cn.close()
+    with _db() as cn:
+        cur = cn.cursor()
+        cur.execute(sql, params)
+        row = cur.fetchone()
+        cur.close()
     return row
 
 def _exec(sql: str, params=(), multi=False): 
-    cn = get_connection(); cur = cn.cursor()
-    if multi:
-      for result in cur.execute(sql, params, multi=True): pass
-    else:
-      cur.execute(sql, params)
-    cn.commit()
-    last_id = cur.lastrowid
-    cur.close(); cn.close()
+    with _db() as cn:
+        cur = cn.cursor()
+        if multi:
+          for result in cur.execute(sql, params, multi=True): pass
+        else:
+          cur.execute(sql, params)
+        cn.commit()
+        last_id = cur.lastrowid
+        cur.close()
     return last_id
 
+def _worker_count(value):
+    # "workers" from a request body: None for the default, else clamped to 1..cpu count
+    # (raises TypeError / ValueError when it isn't an integer)
+    if value is None:
+        return None
+    return max(1, min(int(value), os.cpu_count() or 1))
+
 # Different Pages 
 @app.route("/")
 def index():
@@ -60,12 +101,7 @@ def portfolio_page(pid: int):
 # Portfolio CRUD 
 @app.get("/api/portfolios")
 def api_portfolios():
-    from db_config import get_connection
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT portfolio_id, portfolio_name FROM portfolios ORDER BY portfolio_id DESC;")
-    rows = cur.fetchall()
-    cur.close(); conn.close()
+    rows = _all("SELECT portfolio_id, portfolio_name FROM portfolios ORDER BY portfolio_id DESC;")
     return jsonify([{"id": pid, "name": name} for (pid, name) in rows])
 
 @app.post("/api/portfolio")
@@ -134,22 +170,6 @@ def api_stock_delete(pid: int):
     _exec("DELETE FROM portfolio_stocks WHERE portfolio_id=%s AND stock_symbol=%s",
           (pid, symbol))
     return jsonify({"ok": True})
-# For parquet
-def load_prices_from_parquet(symbol: str, start: str, end: str) -> pd.DataFrame:
-    file_path = os.path.join('data', f"{symbol}.parquet")
-    if not os.path.exists(file_path):
-        return pd.DataFrame()
-    
-    df = pd.read_parquet(file_path)
-
-    if isinstance(df.index, pd.MultiIndex):
-        df = df.reset_index()
-    
-    df["dt"] = pd.to_datetime(df["dt"])
-    
-    mask = (df['dt'] >= pd.to_datetime(start)) & (df['dt'] <= pd.to_datetime(end))
-    return df.loc[mask]
-
 def get_portfolio_symbols(pid: int) -> list[str]:
     rows = _all("SELECT stock_symbol FROM portfolio_stocks WHERE portfolio_id=%s ORDER BY stock_symbol", (pid,))
     return [r[0] for r in rows]
@@ -160,10 +180,8 @@ def backtest_page():
     pid = request.args.get("pid", type=int)
     return render_template("backtest.html", pid=pid)
 
-#  /api/run endpoint
-@app.post("/api/run")
-def api_run():
-    body = request.get_json(force=True) or {}
+def _run_request(body: dict):
+    # validates a /api/run body -> (args for _run_backtest, None) or (None, error response)
     pid = int(body.get("portfolio_id") or 0)
     start = body.get("start_date")
     end = body.get("end_date")
@@ -171,106 +189,585 @@ def api_run():
     params = body.get("params") or {}
 
     if not (pid and start and end and cash_start > 0):
-        return jsonify({"error": "portfolio_id, start_date, end_date, cash_start required"}), 400
+        return None, (jsonify({"error": "portfolio_id, start_date, end_date, cash_start required"}), 400)
+
+    try:
+        strategy = registry.get(params.get("strategy") or "sma")
+    except ValueError as e:
+        return None, (jsonify({"error": str(e)}), 400)
+    try:
+        strategy.resolve(params)
+    except (TypeError, ValueError) as e:
+        return None, (jsonify({"error": f"bad {strategy.name} parameters: {e}"}), 400)
 
     symbols = get_portfolio_symbols(pid)
     if not symbols:
-        return jsonify({"error": "No symbols in this portfolio."}), 400
-        
+        return None, (jsonify({"error": "No symbols in this portfolio."}), 400)
+    with_timings = bool(body.get("timings")) or request.args.get("timings") == "1"
+    return (pid, symbols, start, end, cash_start, params, with_timings), None
+
+
+def _run_backtest(pid, symbols, start, end, cash_start, params, with_timings=False, progress=engine._no_progress, publish=None):
+    # every run is timed per stage (logged + /api/timings); the block is only returned when asked for.
+    # publish(name, data), when streaming, gets each fetched symbol and partial equity points
+    timings = profiling.Timings()
     app.logger.info(f"Fetching data for {len(symbols)} symbols...")
-    for sym in symbols:
-        fetch_and_store_prices(sym, start, end)
+    for i, sym in enumerate(symbols):
+        progress("fetching", i, len(symbols))
+        with timings.stage("fetch"):
+            data = fetch_and_store_prices(sym, start, end)
+        if publish is not None:
+            publish("fetched", {"symbol": sym, "rows": len(data), "done": i + 1, "total": len(symbols)})
     app.logger.info("Data fetching complete.")
     
-    strategy_name = (params.get("strategy") or "sma").lower()
-    res = {}
-    
-    if strategy_name == "sma":
-        sma_params = {
-            "short": int(params.get("short", 10)),
-            "long":  int(params.get("long", 30)),
-        }
-        res = engine.run_backtest(
-            symbols=symbols,
-            start_date=start,
-            end_date=end,
-            cash_start=cash_start,
-            price_loader=load_prices_from_parquet,
-            strategy_logic=sma,
-            strategy_params=sma_params
-        )
-    elif strategy_name == "consensus":
+    strategy = registry.get(params.get("strategy") or "sma")
+    strategy_name = strategy.name
+    strategy_params = strategy.resolve(params)
+
+    # same inputs over the same parquet content -> same result (see runcache.py)
+    with timings.stage("cache"):
+        cache_key = runcache.key(symbols, start, end, cash_start, strategy_name, strategy_params,
+                                 price_versions(symbols, start, end))
+        res = runcache.RUNS.get(cache_key)
+    cached = res is not None
+
+    if cached:
+        app.logger.info("Backtest served from the run cache.")
+        stored = res.get("portfolio_id") == pid and res.get("run_id")
+        if stored:
+            try:
+                with _db() as cn:
+                    stored = results.run_exists(cn, res["run_id"])
+            except mysql.connector.Error:
+                stored = False
+    else:
         res = engine.run_backtest(
             symbols=symbols,
             start_date=start,
             end_date=end,
             cash_start=cash_start,
             price_loader=load_prices_from_parquet,
-            strategy_logic=consensus,
-            strategy_params={} 
+            matrix_loader=load_price_matrix,
+            strategy_logic=strategy.module,
+            strategy_params=strategy_params,
+            progress=progress,
+            timings=timings,
+            on_equity=(lambda points: publish("equity", points)) if publish is not None else None
         )
-    
-    elif strategy_name == "ema_rsi":
-        res = engine.run_backtest(
-            symbols=symbols,
-            start_date=start,
-            end_date=end,
-            cash_start=cash_start,
-            price_loader=load_prices_from_parquet,
-            strategy_logic=ema_rsi,
-            strategy_params={} 
-    )    
+        stored = False
+
+    # keep the result server-side so saving / reloading it is just a run id
+    if res and not stored:
+        progress("saving", 0, 1)
+        try:
+            with timings.stage("persist"), _db() as cn:
+                res["run_id"] = results.persist_run(cn, pid, params, start, end, cash_start, res)
+        except mysql.connector.Error as e:
+            app.logger.error(f"Could not store run: {e}")
+            res["run_id"] = None
+        res["portfolio_id"] = pid
+        res["cache_key"] = cache_key
+        runcache.RUNS.put(cache_key, res)
+
+    run_timings = timings.to_dict()
+    profiling.HISTORY.record("backtest", run_timings, portfolio_id=pid, strategy=strategy_name, cached=cached)
+    if with_timings:
+        res["timings"] = run_timings
 
     app.logger.info("Backtest complete. Returning results to UI.")
-    return jsonify(res)
+    return res
+
+
+def _run_backtest_job(*args, progress, publish=None):
+    return _run_backtest(*args, progress=progress, publish=publish)
+
+
+#  /api/run endpoint (runs in the request; large portfolios should use /api/jobs)
+@app.post("/api/run")
+def api_run():
+    run_args, err = _run_request(request.get_json(force=True) or {})
+    if err:
+        return err
+    return _cached_response(_run_backtest(*run_args), jsonify)
+
+
+def _result_etag(res):
+    # results carrying a timings block are one-offs, everything else is keyed by the run cache
+    return runcache.etag(res) if res and "timings" not in res else None
+
+
+def _cached_response(res, render):
+    # weak ETag from the run cache key; a client that already has this result gets a 304
+    tag = _result_etag(res)
+    if tag and request.if_none_match.contains_weak(tag):
+        resp = Response(status=304)
+    else:
+        resp = render(res)
+    if tag:
+        resp.set_etag(tag, weak=True)
+    return resp
+
+
+#  /api/jobs: same body as /api/run, returns a job id to poll instead of blocking
+@app.post("/api/jobs")
+def api_job_submit():
+    run_args, err = _run_request(request.get_json(force=True) or {})
+    if err:
+        return err
+    pid, symbols = run_args[0], run_args[1]
+    try:
+        job = JOBS.submit("backtest", _run_backtest_job, *run_args, events=True,
+                          meta={"portfolio_id": pid, "symbols": len(symbols)})
+    except jobs.QueueFull as e:
+        return jsonify({"error": f"Too many backtests in progress ({e}), try again shortly."}), 429
+    return jsonify(job.to_dict()), 202
+
+@app.get("/api/jobs/<job_id>")
+def api_job_status(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job.kind == "backtest" and job.status == "done":
+        return _cached_response(job.result, lambda res: jsonify(job.to_dict()))
+    return jsonify(job.to_dict())
+
+#  /api/jobs/<id>/events: the job's progress as server-sent events (EventSource), instead of polling.
+#  event: fetched (one per symbol), progress (stage counters), equity (partial curve points),
+#  then done / failed / cancelled with the job dict ("error" is EventSource's own connection
+#  event, so a failed job is sent as "failed"). Reconnects resume after Last-Event-ID.
+#  ?etag=<ETag of a result the client already has> leaves an unchanged result out of "done".
+@app.get("/api/jobs/<job_id>/events")
+def api_job_events(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    try:
+        after = int(request.headers.get("Last-Event-ID") or request.args.get("after") or 0)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID / after must be an integer event id"}), 400
+    known = (request.args.get("etag") or "").removeprefix("W/").strip('"')
+
+    def stream():
+        yield "retry: 2000\n\n"
+        for item in job.follow(after):
+            if item is None:
+                yield ": keep-alive\n\n"
+                continue
+            seq, name, data = item
+            if name == "error":
+                name = "failed"
+            if name == "done" and job.kind == "backtest":
+                tag = _result_etag(job.result)
+                data = dict(data, etag=tag)
+                if tag and tag == known:
+                    data.pop("result", None)
+                    data["unchanged"] = True
+            head = f"id: {seq}\n" if seq is not None else ""
+            yield f"{head}event: {name}\ndata: {app.json.dumps(data)}\n\n"
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.delete("/api/jobs/<job_id>")
+def api_job_cancel(job_id: str):
+    job = JOBS.cancel(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(with_result=False))
+
+@app.get("/api/jobs")
+def api_job_stats():
+    return jsonify(JOBS.stats())
+
+
+#  /api/sweep endpoint: grid search over strategy params, ranked by a KPI
+@app.post("/api/sweep")
+def api_sweep():
+    body = request.get_json(force=True) or {}
+    pid = int(body.get("portfolio_id") or 0)
+    start = body.get("start_date")
+    end = body.get("end_date")
+    cash_start = float(body.get("cash_start") or 0)
+    strategy_name = (body.get("strategy") or "sma").lower()
+    grid = body.get("grid") or {}
+
+    if not (pid and start and end and cash_start > 0 and grid):
+        return jsonify({"error": "portfolio_id, start_date, end_date, cash_start, grid required"}), 400
+    try:
+        workers = _worker_count(body.get("workers"))
+        top = None if body.get("top") is None else int(body["top"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "workers and top must be integers"}), 400
+    if top is not None and top < 1:
+        return jsonify({"error": "top must be at least 1"}), 400
+    rank_by = body.get("rank_by") or "sharpe_ratio"
+    if rank_by not in engine.RANK_KPIS:
+        return jsonify({"error": f"rank_by must be one of {', '.join(engine.RANK_KPIS)}"}), 400
+    if strategy_name not in sweep.STRATEGIES:
+        return jsonify({"error": f"unknown strategy '{strategy_name}'"}), 400
+    try:
+        sweep.expand_grid(strategy_name, grid)  # an oversized or malformed grid fails before any price work
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    symbols = get_portfolio_symbols(pid)
+    if not symbols:
+        return jsonify({"error": "No symbols in this portfolio."}), 400
+
+    for sym in symbols:
+        fetch_and_store_prices(sym, start, end)
+
+    prices_df = engine.build_price_matrix(symbols, start, end, load_prices_from_parquet, load_price_matrix)
+    if prices_df.empty:
+        return jsonify({"error": "No price data for this portfolio in that range."}), 400
+
+    try:
+        rows = sweep.run_sweep(
+            prices_df, strategy_name, grid, cash_start,
+            rank_by=rank_by,
+            workers=workers,
+            top=top,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    app.logger.info(f"Sweep complete: {len(rows)} combinations for {strategy_name}.")
+    return jsonify({"strategy": strategy_name, "results": rows})
+
+
+def _walkforward_job(symbols, start, end, cash_start, strategy_name, grid, options, progress):
+    for i, sym in enumerate(symbols):
+        progress("fetching", i, len(symbols))
+        fetch_and_store_prices(sym, start, end)
+    prices_df = engine.build_price_matrix(symbols, start, end, load_prices_from_parquet, load_price_matrix)
+    if prices_df.empty:
+        raise ValueError("No price data for this portfolio in that range.")
+    return walkforward.run_walkforward(prices_df, strategy_name, grid, cash_start, progress=progress, **options)
+
+
+#  /api/walkforward: rolling train/test optimization, runs as a job (poll /api/jobs/<id>)
+@app.post("/api/walkforward")
+def api_walkforward():
+    body = request.get_json(force=True) or {}
+    pid = int(body.get("portfolio_id") or 0)
+    start = body.get("start_date")
+    end = body.get("end_date")
+    cash_start = float(body.get("cash_start") or 0)
+    strategy_name = (body.get("strategy") or "sma").lower()
+    grid = body.get("grid") or {}
+
+    if not (pid and start and end and cash_start > 0):
+        return jsonify({"error": "portfolio_id, start_date, end_date, cash_start required"}), 400
+    if strategy_name not in sweep.STRATEGIES:
+        return jsonify({"error": f"unknown strategy '{strategy_name}'"}), 400
+    try:
+        n_combos = len(sweep.expand_grid(strategy_name, grid))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if not n_combos:
+        return jsonify({"error": "no valid parameter combinations in the grid"}), 400
+
+    try:
+        options = {
+            "train_months": int(body.get("train_months", 36)),
+            "test_months": int(body.get("test_months", 6)),
+            "step_months": int(body.get("step_months", 1)),
+            "rank_by": body.get("rank_by") or "sharpe_ratio",
+            "workers": _worker_count(body.get("workers")),
+        }
+    except (TypeError, ValueError):
+        return jsonify({"error": "train_months, test_months, step_months and workers must be integers"}), 400
+    if options["rank_by"] not in engine.RANK_KPIS:
+        return jsonify({"error": f"rank_by must be one of {', '.join(engine.RANK_KPIS)}"}), 400
+
+    symbols = get_portfolio_symbols(pid)
+    if not symbols:
+        return jsonify({"error": "No symbols in this portfolio."}), 400
+
+    try:
+        job = JOBS.submit("walkforward", _walkforward_job, symbols, start, end, cash_start, strategy_name, grid, options,
+                          meta={"portfolio_id": pid, "strategy": strategy_name, "combos": n_combos})
+    except jobs.QueueFull as e:
+        return jsonify({"error": f"Too many jobs in progress ({e}), try again shortly."}), 429
+    return jsonify(job.to_dict()), 202
+
+
+def _batch_job(portfolios, names, start, end, cash_start, params, options, progress):
+    timings = profiling.Timings()
+    union = sorted({s for syms in portfolios.values() for s in syms})
+    for i, sym in enumerate(union):
+        progress("fetching", i, len(union))
+        with timings.stage("fetch"):
+            fetch_and_store_prices(sym, start, end)
+    raw = engine.build_price_matrix(union, start, end, load_prices_from_parquet, load_price_matrix, timings, fill=False)
+    if raw.empty:
+        raise ValueError("No price data for these portfolios in that range.")
+
+    strategy = registry.get(params.get("strategy") or "sma")
+    res = batch.run_batch(raw, portfolios, strategy.name, params, cash_start, options["workers"], progress, timings)
+    rows = batch.comparison(res, portfolios, options["rank_by"])
+
+    # each portfolio is stored like an /api/run, so its details open by run id
+    for i, row in enumerate(rows):
+        progress("saving", i, len(rows))
+        pid = row["portfolio"]
+        row["portfolio_name"] = names.get(pid)
+        try:
+            with timings.stage("persist"), _db() as cn:
+                row["run_id"] = results.persist_run(cn, pid, params, start, end, cash_start, res[pid])
+        except mysql.connector.Error as e:
+            app.logger.error(f"Could not store run for portfolio {pid}: {e}")
+            row["run_id"] = None
+
+    run_timings = timings.to_dict()
+    profiling.HISTORY.record("batch", run_timings, portfolios=len(portfolios), strategy=strategy.name)
+    app.logger.info(f"Batch complete: {len(rows)} portfolios, {len(union)} distinct symbols.")
+    return {
+        "strategy": strategy.name, "params": strategy.resolve(params), "symbols": len(union),
+        "rank_by": options["rank_by"], "portfolios": sorted(rows, key=lambda r: r["rank"]),
+        "no_data": [pid for pid in portfolios if pid not in res],
+    }
+
+
+#  /api/batch: one strategy over several portfolios ("all" or a list of ids) as a job;
+#  the union of their symbols is loaded and signalled once (see batch.py)
+@app.post("/api/batch")
+def api_batch():
+    body = request.get_json(force=True) or {}
+    start = body.get("start_date")
+    end = body.get("end_date")
+    cash_start = float(body.get("cash_start") or 0)
+    params = body.get("params") or {}
+    ids = body.get("portfolio_ids") or "all"
+
+    if not (start and end and cash_start > 0):
+        return jsonify({"error": "start_date, end_date, cash_start required"}), 400
+    try:
+        strategy = registry.get(params.get("strategy") or "sma")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        strategy.resolve(params)
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"bad {strategy.name} parameters: {e}"}), 400
+    try:
+        options = {"rank_by": body.get("rank_by") or "sharpe_ratio", "workers": _worker_count(body.get("workers"))}
+    except (TypeError, ValueError):
+        return jsonify({"error": "workers must be an integer"}), 400
+    if options["rank_by"] not in engine.RANK_KPIS:
+        return jsonify({"error": f"rank_by must be one of {', '.join(engine.RANK_KPIS)}"}), 400
+
+    rows = _all("""
+        SELECT p.portfolio_id, p.portfolio_name, s.stock_symbol
+          FROM portfolios p JOIN portfolio_stocks s ON s.portfolio_id = p.portfolio_id
+         ORDER BY p.portfolio_id, s.stock_symbol
+    """)
+    if ids != "all":
+        try:
+            wanted = {int(i) for i in ids}
+        except (TypeError, ValueError):
+            return jsonify({"error": "portfolio_ids must be a list of ids or \"all\""}), 400
+        rows = [r for r in rows if r[0] in wanted]
+    portfolios, names = {}, {}
+    for pid, name, symbol in rows:
+        portfolios.setdefault(pid, []).append(symbol)
+        names[pid] = name
+    if not portfolios:
+        return jsonify({"error": "No portfolios with symbols to run."}), 400
+
+    try:
+        job = JOBS.submit("batch", _batch_job, portfolios, names, start, end, cash_start, params, options,
+                          meta={"portfolios": len(portfolios), "strategy": strategy.name})
+    except jobs.QueueFull as e:
+        return jsonify({"error": f"Too many jobs in progress ({e}), try again shortly."}), 429
+    return jsonify(job.to_dict()), 202
+
+
+#  /api/montecarlo: resampled-path confidence intervals for a stored run (run_id) or a posted equity curve
+@app.post("/api/montecarlo")
+def api_montecarlo():
+    body = request.get_json(force=True) or {}
+    try:
+        run_id = int(body.get("run_id") or 0)
+        n_paths = int(body.get("paths", 5000))
+        block = int(body.get("block", 20))
+        seed = None if body.get("seed") is None else int(body["seed"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "run_id, paths, block and seed must be integers"}), 400
+    if not 1 <= n_paths <= 20000:
+        return jsonify({"error": "paths must be between 1 and 20000"}), 400
+    if seed is not None and seed < 0:
+        return jsonify({"error": "seed must be a non-negative integer"}), 400
+    method = body.get("method") or "bootstrap"
+    if method not in montecarlo.METHODS:
+        return jsonify({"error": f"method must be one of {', '.join(montecarlo.METHODS)}"}), 400
+    if block < 1:
+        return jsonify({"error": "block must be a positive integer"}), 400
+
+    equity = body.get("equity")
+    if run_id:
+        with _db() as cn:
+            run = results.load_run(cn, run_id)
+        if run is None:
+            return jsonify({"error": "Session not found"}), 404
+        equity = run["equity"]
+    if not equity:
+        return jsonify({"error": "run_id or equity required"}), 400
+    if not isinstance(equity, list):
+        return jsonify({"error": "equity must be a list of {date, value} points"}), 400
+
+    try:
+        out = montecarlo.simulate_paths(
+            equity, n_paths,
+            method=method,
+            block=block,
+            seed=seed,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(out)
+
+
+#  /api/paper: paper trading. A portfolio is replayed from start_date, then moves with each new close
+@app.post("/api/paper")
+def api_paper_start():
+    body = request.get_json(force=True) or {}
+    pid = int(body.get("portfolio_id") or 0)
+    start = body.get("start_date")
+    cash_start = float(body.get("cash_start") or 0)
+    params = dict(body.get("params") or {})
+    strategy_name = (params.pop("strategy", None) or "sma").lower()
+
+    if not (pid and start and cash_start > 0):
+        return jsonify({"error": "portfolio_id, start_date, cash_start required"}), 400
+    symbols = get_portfolio_symbols(pid)
+    if not symbols:
+        return jsonify({"error": "No symbols in this portfolio."}), 400
+
+    end = (PAPER.last_date + timedelta(days=1)).strftime('%Y-%m-%d') if PAPER.last_date is not None \
+        else (date.today() + timedelta(days=1)).isoformat()
+    for sym in symbols:
+        fetch_and_store_prices(sym, start, end)
+    history = engine.build_price_matrix(symbols, start, end, load_prices_from_parquet, load_price_matrix)
+
+    try:
+        portfolio = live.PaperPortfolio(pid, symbols, strategy_name, params, cash_start, start)
+        PAPER.add(portfolio, history)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    app.logger.info(f"Paper trading portfolio {pid} ({strategy_name}), replayed {len(history)} bars.")
+    return jsonify(portfolio.summary())
+
+@app.post("/api/paper/bar")
+def api_paper_bar():
+    # one new close per symbol: {"date": "2025-01-02", "closes": {"AAPL": 243.85, ...}}
+    body = request.get_json(force=True) or {}
+    if not body.get("date") or not isinstance(body.get("closes"), dict):
+        return jsonify({"error": "date and closes required"}), 400
+    try:
+        fills = PAPER.on_bar(body["date"], {s.upper(): float(c) for s, c in body["closes"].items()})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"trades": {str(pid): t for pid, t in fills.items() if t}, **PAPER.stats()})
+
+@app.post("/api/paper/update")
+def api_paper_update():
+    # pulls the closes after the book's last date into the price store and feeds them in order
+    symbols = PAPER.symbols()
+    if not symbols or PAPER.last_date is None:
+        return jsonify({"error": "No portfolios are paper trading."}), 400
+    start = (PAPER.last_date + timedelta(days=1)).strftime('%Y-%m-%d')
+    end = (date.today() + timedelta(days=1)).isoformat()
+    for sym in symbols:
+        fetch_and_store_prices(sym, start, end)
+    bars = engine.build_price_matrix(symbols, start, end, load_prices_from_parquet, load_price_matrix)
+
+    trades = 0
+    for dt, row in bars.iterrows():
+        fills = PAPER.on_bar(dt, row.to_dict())
+        trades += sum(len(t) for t in fills.values())
+    return jsonify({"bars": len(bars), "trades": trades, **PAPER.stats()})
+
+@app.get("/api/paper")
+def api_paper_list():
+    return jsonify({**PAPER.stats(), "portfolios": [p.summary() for p in PAPER.portfolios.values()]})
+
+@app.get("/api/paper/<int:pid>")
+def api_paper_get(pid: int):
+    portfolio = PAPER.portfolios.get(pid)
+    if portfolio is None:
+        return jsonify({"error": "Portfolio is not paper trading"}), 404
+    return jsonify(portfolio.to_dict())
+
+@app.delete("/api/paper/<int:pid>")
+def api_paper_stop(pid: int):
+    portfolio = PAPER.remove(pid)
+    if portfolio is None:
+        return jsonify({"error": "Portfolio is not paper trading"}), 404
+    return jsonify(portfolio.summary())
+
+
+#  /api/timings: p50 / p95 per pipeline stage over the recent runs of this process
+@app.get("/api/timings")
+def api_timings():
+    return jsonify(profiling.HISTORY.summary(request.args.get("kind")))
+
+@app.get("/api/indicator_cache")
+def api_indicator_cache():
+    return jsonify(indicators.stats())
+
+@app.get("/api/run_cache")
+def api_run_cache():
+    return jsonify(runcache.RUNS.stats())
+
+@app.get("/api/strategies")
+def api_strategies():
+    # declared parameters (with defaults), constraints and default indicators per strategy
+    return jsonify([s.to_dict() for s in registry.STRATEGIES.values()])
+
+
+@app.get("/api/db_pool")
+def api_db_pool():
+    return jsonify(pool_stats())
 
 
 # /api/save_session endpoint 
+# {"run_id": N} locks a run stored by /api/run; a full {params, kpis, trades} payload still works
 @app.post("/api/save_session")
 def api_save_session():
     data = request.get_json(force=True)
-    params = data.get("params", {})
-    kpis = data.get("kpis", {})
-    trades = data.get("trades", [])
-
-    pid = params.get("portfolio_id")
-    start = params.get("start_date")
-    end = params.get("end_date")
-    cash = params.get("cash_start")
-    
-    strategy_id = 1 
 
     try:
-        session_id = _exec("""
-            INSERT INTO sessions (portfolio_id, strategy_id, start_date, end_date, initial_cash, status)
-            VALUES (%s, %s, %s, %s, %s, 'locked')
-        """, (pid, strategy_id, start, end, cash))
-
-        if trades:
-            trade_inserts = []
-            for trade in trades:
-                trade_inserts.append((
-                    session_id, trade['date'], trade['symbol'], trade['side'],
-                    trade['price'], trade['qty']
-                ))
-            
-            conn = get_connection()
+        run_id = data.get("run_id")
+        if run_id:
+            with _db() as cn:
+                locked = results.lock_run(cn, int(run_id))
+            if not locked:
+                return jsonify({"error": f"run {run_id} not found"}), 404
+            return jsonify({"ok": True, "session_id": int(run_id)})
+
+        params = data.get("params", {})
+        kpis = data.get("kpis", {})
+        trades = data.get("trades", [])
+
+        pid = params.get("portfolio_id")
+        start = params.get("start_date")
+        end = params.get("end_date")
+        cash = params.get("cash_start")
+        
+        strategy_id = 1 
+
+        with _db() as conn:
             cur = conn.cursor()
-            cur.executemany("""
-                INSERT INTO session_trades (session_id, dt, stock_symbol, side, price, shares)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, trade_inserts)
+            cur.execute("""
+                INSERT INTO sessions (portfolio_id, strategy_id, start_date, end_date, initial_cash, status)
+                VALUES (%s, %s, %s, %s, %s, 'locked')
+            """, (pid, strategy_id, start, end, cash))
+            session_id = cur.lastrowid
+            results.save_trades(cur, session_id, trades)
+            results.save_metrics(cur, session_id, kpis, len(trades))
             conn.commit()
             cur.close()
-            conn.close()
-
-        _exec("""
-            INSERT INTO session_metrics (session_id, total_return, sharpe, max_drawdown, trades_count)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            session_id, kpis.get('total_pnl', 0), kpis.get('sharpe_ratio', 0),
-            kpis.get('max_drawdown_pct', 0), len(trades)
-        ))
 
         return jsonify({"ok": True, "session_id": session_id})
     except mysql.connector.Error as e:
@@ -278,6 +775,21 @@ def api_save_session():
         return jsonify({"error": str(e)}), 500
 
 
+# past sessions: list per portfolio, reload one without re-running the engine
+@app.get("/api/portfolio/<int:pid>/sessions")
+def api_sessions_list(pid: int):
+    limit = min(int(request.args.get("limit", 50)), 500)
+    with _db() as cn:
+        return jsonify(results.list_runs(cn, pid, limit))
+
+@app.get("/api/session/<int:run_id>")
+def api_session_load(run_id: int):
+    with _db() as cn:
+        run = results.load_run(cn, run_id)
+    if run is None:
+        return jsonify({"error": "Session not found"}), 404
+    return jsonify(run)
+
 
 @app.post("/api/download_csv")
 def api_download_csv():
@@ -286,36 +798,38 @@ def api_download_csv():
     kpis = data.get("kpis", {})
     params = data.get("params", {})
 
-    header = []
-    header.append("# Backtest Report\n")
-    header.append(f"# Strategy: {params.get('params', {}).get('strategy', 'N/A')}\n")
-    header.append(f"# Date Range: {params.get('start_date', '')} to {params.get('end_date', '')}\n")
-    header.append("-" * 30 + "\n")
-    header.append("# Key Performance Indicators\n")
-    header.append(f"# Final Portfolio Value: ${kpis.get('portfolio_value', 0):,.2f}\n")
-    header.append(f"# Total P&L: ${kpis.get('total_pnl', 0):,.2f}\n")
-    header.append(f"# Total Return: {kpis.get('return_pct', 0.0):.2f}%\n")
-    header.append(f"# Sharpe Ratio: {kpis.get('sharpe_ratio', 0.0):.2f}\n")
-    header.append(f"# Max Drawdown: {kpis.get('max_drawdown_pct', 0.0):.2f}%\n")
-    header.append("-" * 30 + "\n")
-    header.append("# Trades\n")
-    
-    summary_header = "".join(header)
-
-    if not trades:
-        csv_content = summary_header
-    else:
-        df = pd.DataFrame(trades)
-        trades_csv = df.to_csv(index=False)
-        csv_content = summary_header + trades_csv
-
+    # streamed: header first, then the trades in chunks (no DataFrame / full string in memory)
     filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
     return Response(
-        csv_content,
+        reports.iter_csv(kpis, params, trades),
         mimetype="text/csv",
         headers={"Content-disposition": f"attachment; filename={filename}"}
     )
 
+# /api/export: trades, FIFO round trips (built from the posted trades) or the daily
+# equity curve as Parquet / Arrow IPC for analytics tools
+@app.post("/api/export")
+def api_export():
+    data = request.get_json(force=True) or {}
+    fmt = (data.get("format") or "parquet").lower()
+    dataset = (data.get("dataset") or "trades").lower()
+    if fmt not in reports.FORMATS:
+        return jsonify({"error": f"format must be one of {sorted(reports.FORMATS)}"}), 400
+    if dataset not in ("trades", "round_trips", "equity"):
+        return jsonify({"error": "dataset must be 'trades', 'round_trips' or 'equity'"}), 400
+
+    if dataset == "round_trips":
+        rows = ledger.from_trades(data.get("trades", [])).records()
+    else:
+        rows = data.get(dataset, [])
+    mimetype, ext = reports.FORMATS[fmt]
+    filename = f"{dataset}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{ext}"
+    return Response(
+        reports.iter_columnar(rows, fmt),
+        mimetype=mimetype,
+        headers={"Content-disposition": f"attachment; filename={filename}"}
+    )
+
 # ---------------------------- main ----------------------------
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
@@ -1,34 +1,501 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+from datetime import date, timedelta
+
+import numpy as np
 import pandas as pd
-import yfinance as yf
 import pyarrow.parquet as pq
 import pyarrow as pa
-from datetime import datetime
-import os
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
 
+from marketdata import MarketData
 
-"""We decided to use,Fetches stock data and stores it in a Parquet file."""
-def fetch_and_store_prices(symbol: str, start: str, end: str) -> pd.DataFrame:
-   
-    try:
-        data_dir = 'data'
-        if not os.path.exists(data_dir):
-            os.makedirs(data_dir)
+PRICE_COLUMNS = ['dt', 'open', 'high', 'low', 'close', 'adj_close', 'volume']
 
+# bar intervals a store can hold (yfinance names) -> bar length
+INTERVALS = {'1m': '1min', '2m': '2min', '5m': '5min', '15m': '15min', '30m': '30min', '60m': '60min', '1h': '60min', '1d': '1D'}
+# how each column is combined when bars are resampled to a coarser frequency
+BAR_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'adj_close': 'last', 'volume': 'sum'}
+INTRADAY_ROW_GROUP = 65_536  # rows per row group; dt filters skip whole groups by their min/max
 
-        file_path = os.path.join(data_dir, f"{symbol}.parquet")
-        
-        data = yf.download(symbol, start=start, end=end)
+_PARTITIONING = ds.partitioning(pa.schema([('symbol', pa.string()), ('year', pa.int32())]), flavor='hive')
+# every partition file is written with these types so the dataset never has to reconcile them
+_LAKE_SCHEMA = pa.schema([('dt', pa.timestamp('ns')), ('open', pa.float64()), ('high', pa.float64()), ('low', pa.float64()),
+                          ('close', pa.float64()), ('adj_close', pa.float64()), ('volume', pa.int64())])
+_MMAP_FS = pafs.LocalFileSystem(use_mmap=True)
+
+
+class Downloader:
+    """
+    Interface for price providers. download() returns bars of the given interval
+    (see INTERVALS) for [start, end) with at least dt and close columns
+    (open/high/low/volume when available). An empty frame means there are no bars
+    in the range (before the listing, weekends, holidays); failures raise.
+    Tests can plug in a local fake instead of yfinance.
+    """
+    def download(self, symbol: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
+        raise NotImplementedError
+
+
+class YFinanceDownloader(Downloader):
+    def download(self, symbol: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
+        import yfinance as yf  # imported here so offline runs don't need it
+        # yfinance only keeps recent intraday history (~7 days of 1m, ~60 days of 5m-30m)
+        data = yf.download(symbol, start=start, end=end, interval=interval, progress=False)
+        # a failed request also comes back as an empty frame; yfinance notes the error per ticker
+        error = (getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {}).get(symbol.upper())
+        if error:
+            raise RuntimeError(f"download failed for {symbol}: {error}")
         if data.empty:
-            print(f"No data found for {symbol}")
             return pd.DataFrame()
+        return normalize_prices(data.reset_index())
+
+
+def normalize_prices(df: pd.DataFrame) -> pd.DataFrame:
+    # yfinance hands back (Price, Ticker) column pairs; older files were saved that way too
+    df = df.copy()
+    if isinstance(df.columns, pd.MultiIndex):
+        df.columns = [c[0] for c in df.columns]
+    df.rename(columns={'Date': 'dt', 'Datetime': 'dt', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Adj Close': 'adj_close', 'Volume': 'volume'}, inplace=True)
+    df['dt'] = pd.to_datetime(df['dt'])
+    if df['dt'].dt.tz is not None:
+        df['dt'] = df['dt'].dt.tz_localize(None)  # intraday bars come tz-aware; keep the exchange's wall clock
+    return df[[c for c in PRICE_COLUMNS if c in df.columns]]
+
+
+def _calendar_freq(freq: str):
+    """
+    (multiple, Period alias) for calendar frequencies: weeks ('W', '1W', '2W', 'W-FRI'),
+    months ('M', 'ME'), quarters ('Q', 'QE', 'QE-DEC') and years ('Y', 'YE'), the
+    *E resample aliases mapped to their Period names. None for fixed-length ones.
+    """
+    m = re.fullmatch(r'(\d*)(W|ME|QE|YE|M|Q|Y)(-[A-Za-z]{3})?', freq)
+    if m is None:
+        return None
+    return int(m[1] or 1), m[2].rstrip('E') + (m[3] or '')
+
+
+def _fixed_freq(freq: str) -> pd.Timedelta:
+    # '5min', '1h', '1D' (a bare unit such as 'h' or 'D' means one of it)
+    return pd.Timedelta(freq if freq[:1].isdigit() else f"1{freq}")
+
+
+def _buckets(dt: np.ndarray, freq: str) -> np.ndarray:
+    # start of the freq bucket each datetime64[ns] falls in. Calendar frequencies go
+    # through periods, so weeks start on Monday (or after the anchor day) however they're
+    # spelled; a fixed '7D' step would count from the epoch, a Thursday
+    calendar = _calendar_freq(freq)
+    if calendar is not None:
+        n, alias = calendar
+        periods = pd.DatetimeIndex(dt).to_period(alias)
+        if n > 1:
+            periods = pd.PeriodIndex.from_ordinals(periods.asi8 // n * n, freq=alias)
+        return periods.start_time.to_numpy().astype('datetime64[ns]')
+    step = _fixed_freq(freq).value
+    return (dt.view(np.int64) // step * step).view('datetime64[ns]')
+
+
+def _aggregate(values: np.ndarray, how: str, starts: np.ndarray) -> np.ndarray:
+    # one value per run of rows beginning at starts (rows are grouped and in time order)
+    if how == 'first':
+        return values[starts]
+    if how == 'last':
+        return values[np.append(starts[1:], len(values)) - 1]
+    if how == 'max':
+        return np.fmax.reduceat(values, starts)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts)
+    return np.add.reduceat(values, starts)
+
+
+def resample_bars(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    OHLCV bars (sorted by dt) aggregated to freq: first open, max high, min low, last
+    close, summed volume per bucket, labelled with the bucket's start. Any pandas
+    frequency coarser than the bars works ('5min', '1h', '1D', 'W', 'ME', ...).
+    """
+    if df.empty:
+        return df
+    dt = df['dt'].to_numpy().astype('datetime64[ns]')
+    bucket = _buckets(dt, freq)
+    starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+    out = {'dt': bucket[starts]}
+    for col in df.columns:
+        if col in BAR_AGG:
+            out[col] = _aggregate(df[col].to_numpy(), BAR_AGG[col], starts)
+    return pd.DataFrame(out)
+
+
+class PriceStore:
+    """
+    Local price lake partitioned by symbol and year:
+        data/lake/symbol=<SYMBOL>/year=<YYYY>/part-0.parquet
+    Reads go through pyarrow datasets over memory-mapped files, only touching the
+    year partitions in range and pushing the date filter / column projection down.
+    Flat data/<SYMBOL>.parquet files from before the lake are imported on first use.
+
+    The requested date range each symbol covers is kept in data/_coverage.json so
+    ensure() only downloads the missing head/tail gaps and appends them.
+    With offline=True (or PRICE_STORE_OFFLINE=1) nothing is downloaded and
+    backtests run off whatever is already on disk.
+
+    A store holds one bar interval. Intraday stores ('1m', '5m', '1h', ...) live in
+    data/lake_<interval>/ with zstd-compressed, dt-sorted row groups and their own
+    coverage file; date-only end bounds include that whole day. Loads can resample
+    to any coarser frequency on the way out (freq=...), one symbol at a time.
+    """
+    def __init__(self, data_dir: str = 'data', downloader: Downloader | None = None, offline: bool = False, interval: str = '1d'):
+        if interval not in INTERVALS:
+            raise ValueError(f"unknown bar interval '{interval}' (use one of {', '.join(INTERVALS)})")
+        self.data_dir = data_dir
+        self.downloader = downloader or YFinanceDownloader()
+        self.offline = offline
+        self.interval = interval
+        self._lock = threading.RLock()  # re-entered when ensure() reads a symbol that needs importing
+        self._hashes = {}  # path -> ((size, mtime_ns), content digest)
+
+    def path(self, symbol: str) -> str:
+        # legacy flat file, only read to seed the lake
+        return os.path.join(self.data_dir, f"{symbol}.parquet")
+
+    @property
+    def intraday(self) -> bool:
+        return self.interval != '1d'
+
+    @property
+    def lake_dir(self) -> str:
+        return os.path.join(self.data_dir, f"lake_{self.interval}" if self.intraday else 'lake')
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.lake_dir, f"symbol={symbol}")
+
+    def _files(self, symbol: str, first_year=None, last_year=None) -> list[str]:
+        sym_dir = self._symbol_dir(symbol)
+        if not os.path.isdir(sym_dir):
+            if self.intraday or not self._import_flat(symbol):
+                return []
+        files = []
+        for part in sorted(os.listdir(sym_dir)):
+            if not part.startswith('year='):
+                continue
+            year = int(part[5:])
+            if (first_year is not None and year < first_year) or (last_year is not None and year > last_year):
+                continue
+            part_dir = os.path.join(sym_dir, part)
+            files += [os.path.join(part_dir, f) for f in sorted(os.listdir(part_dir)) if f.endswith('.parquet')]
+        return files
+
+    def _file_hash(self, path: str) -> bytes:
+        # content digest, re-read only when the file's size or mtime changes
+        st = os.stat(path)
+        stamp = (st.st_size, st.st_mtime_ns)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        with open(path, 'rb') as f:
+            digest = hashlib.blake2b(f.read(), digest_size=16).digest()
+        self._hashes[path] = (stamp, digest)
+        return digest
+
+    def version(self, symbol: str, start=None, end=None) -> str:
+        """
+        Hash of the symbol's parquet content for the years in [start, end]; it changes
+        whenever a partition in range is written, so it can key anything derived from
+        those prices.
+        """
+        first = pd.to_datetime(start).year if start is not None else None
+        last = pd.to_datetime(end).year if end is not None else None
+        h = hashlib.blake2b(digest_size=16)
+        for path in self._files(symbol, first, last):
+            h.update(os.path.relpath(path, self.lake_dir).encode())
+            h.update(self._file_hash(path))
+        return h.hexdigest()
+
+    def _import_flat(self, symbol: str) -> bool:
+        # reached from reads, so it takes the write lock; another thread may have
+        # imported (or ensure() written) the symbol while this one waited for it
+        with self._lock:
+            sym_dir = self._symbol_dir(symbol)
+            if os.path.isdir(sym_dir):
+                return True
+            if not os.path.exists(self.path(symbol)):
+                return False
+            df = pd.read_parquet(self.path(symbol))
+            if isinstance(df.index, pd.MultiIndex):
+                df = df.reset_index()
+            # built aside and renamed in, so unlocked readers never see half the years
+            staging = f"{sym_dir}.{os.getpid()}.tmp"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            self._write(symbol, normalize_prices(df), sym_dir=staging)
+            os.rename(staging, sym_dir)
+            return True
+
+    def _write(self, symbol: str, df: pd.DataFrame, years=None, sym_dir=None):
+        # rewrites the given year partitions (all of them by default) from df
+        df = df.drop_duplicates(subset='dt', keep='last').sort_values('dt')
+        df_years = df['dt'].dt.year
+        for year in sorted(set(df_years) if years is None else years):
+            part_dir = os.path.join(sym_dir or self._symbol_dir(symbol), f"year={year}")
+            os.makedirs(part_dir, exist_ok=True)
+            part = df.loc[df_years == year].reset_index(drop=True)
+            schema = pa.schema([f for f in _LAKE_SCHEMA if f.name in part.columns])
+            table = pa.Table.from_pandas(part[schema.names], schema=schema, preserve_index=False)
+            tmp = os.path.join(part_dir, f"part-0.parquet.{os.getpid()}.tmp")
+            if self.intraday:
+                pq.write_table(table, tmp, compression='zstd', row_group_size=INTRADAY_ROW_GROUP)
+            else:
+                pq.write_table(table, tmp)
+            os.replace(tmp, os.path.join(part_dir, 'part-0.parquet'))
+
+    def _scan(self, symbols: list[str], start=None, end=None, columns=None) -> pa.Table:
+        start = pd.to_datetime(start) if start is not None else None
+        end = pd.to_datetime(end) if end is not None else None
+        files = []
+        for symbol in symbols:
+            files += self._files(symbol, start.year if start is not None else None, end.year if end is not None else None)
+        if not files:
+            return None
+
+        dataset = ds.dataset(files, schema=pa.unify_schemas([_LAKE_SCHEMA, _PARTITIONING.schema]), format='parquet',
+                             partitioning=_PARTITIONING, partition_base_dir=self.lake_dir, filesystem=_MMAP_FS)
+        flt = None
+        if start is not None:
+            flt = ds.field('dt') >= start.to_pydatetime()
+        if end is not None:
+            if self.intraday and end == end.normalize():
+                upper = ds.field('dt') < (end + timedelta(days=1)).to_pydatetime()
+            else:
+                upper = ds.field('dt') <= end.to_pydatetime()
+            flt = upper if flt is None else (flt & upper)
+        if columns is not None:
+            columns = [c for c in columns if c in dataset.schema.names]
+        return dataset.to_table(columns=columns, filter=flt)
+
+    def read(self, symbol: str) -> pd.DataFrame:
+        table = self._scan([symbol])
+        if table is None:
+            return pd.DataFrame()
+        return normalize_prices(table.to_pandas()).sort_values('dt').reset_index(drop=True)
+
+    def _coverage_path(self) -> str:
+        return os.path.join(self.data_dir, f"_coverage_{self.interval}.json" if self.intraday else '_coverage.json')
+
+    def _read_coverage(self) -> dict:
+        try:
+            with open(self._coverage_path()) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_coverage(self, cov: dict):
+        tmp = self._coverage_path() + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(cov, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._coverage_path())
+
+    def coverage(self, symbol: str):
+        """(start, end) covered on disk, end exclusive, or None."""
+        c = self._read_coverage().get(symbol)
+        if c:
+            return c['start'], c['end']
+        # files written before coverage was tracked: trust their first/last bar
+        df = self.read(symbol)
+        if df.empty:
+            return None
+        return str(df['dt'].min().date()), str((df['dt'].max() + timedelta(days=1)).date())
+
+    def missing_ranges(self, symbol: str, start: str, end: str, cov=None) -> list[tuple[str, str]]:
+        cov = cov or self.coverage(symbol)
+        if cov is None:
+            return [(start, end)]
+        gaps = []
+        if start < cov[0]:
+            gaps.append((start, cov[0]))
+        if end > cov[1]:
+            gaps.append((cov[1], end))
+        return gaps
+
+    def ensure(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        """Makes sure [start, end) is on disk, fetching only what is missing."""
+        start, end = str(pd.to_datetime(start).date()), str(pd.to_datetime(end).date())
+        old = None if self.offline else self.coverage(symbol)
+        gaps = [] if self.offline else self.missing_ranges(symbol, start, end, old)
+
+        new_parts, fetched = [], []
+        for gap_start, gap_end in gaps:
+            part = self.downloader.download(symbol, gap_start, gap_end, self.interval)
+            print(f"{symbol}: fetched {gap_start} -> {gap_end} ({0 if part is None else len(part)} rows)")
+            if part is None:
+                continue
+            # an answered gap counts as covered even with no rows (before the listing, a
+            # weekend or holiday tail) so it isn't asked for again; failed downloads raise
+            fetched.append((gap_start, gap_end))
+            if not part.empty:
+                new_parts.append(normalize_prices(part))
+
+        if fetched:
+            with self._lock:
+                os.makedirs(self.data_dir, exist_ok=True)
+                existing = self.read(symbol)
+                if new_parts:
+                    merged = pd.concat([existing] + new_parts, ignore_index=True) if not existing.empty else pd.concat(new_parts, ignore_index=True)
+                    merged = merged.drop_duplicates(subset='dt', keep='last').sort_values('dt').reset_index(drop=True)
+                    touched = set(pd.concat([p['dt'] for p in new_parts]).dt.year)
+                    self._write(symbol, merged, touched)
+                    existing = merged
+
+                # merged into the coverage on disk now, not the one read before downloading,
+                # so an ensure() that finished in the meantime can't be undone; gaps border
+                # the old range and coverage only grows, so it stays one interval
+                cov = self._read_coverage()
+                known = [old] if old else []
+                if symbol in cov:
+                    known.append((cov[symbol]['start'], cov[symbol]['end']))
+                spans = known + fetched
+                new_start, new_end = min(s for s, _ in spans), max(e for _, e in spans)
+                # today's bar is still moving, so never claim coverage past the last full day
+                today = str(date.today())
+                if new_end > today:
+                    last = str((existing['dt'].max() + timedelta(days=1)).date()) if not existing.empty else new_start
+                    new_end = max(min(last, today), max((e for _, e in known), default=new_start))
+                cov[symbol] = {'start': new_start, 'end': new_end}
+                self._write_coverage(cov)
+
+        return self.load(symbol, start, end)
+
+    def _check_freq(self, freq: str):
+        calendar = _calendar_freq(freq)
+        try:
+            if calendar is not None:
+                pd.Period('2000-01-01', freq=calendar[1])
+                return  # calendar frequencies are coarser than any bar
+            finer = _fixed_freq(freq) < pd.Timedelta(INTERVALS[self.interval])
+        except ValueError:
+            raise ValueError(f"unknown resample frequency '{freq}' (e.g. '5min', '1h', '1D', 'W', 'ME', 'QE', 'YE')") from None
+        if finer:
+            raise ValueError(f"can't resample {self.interval} bars to {freq}")
+
+    def load(self, symbol: str, start: str, end: str, columns=None, freq: str | None = None) -> pd.DataFrame:
+        """Bars in [start, end], resampled to freq when one is given."""
+        table = self._scan([symbol], start, end, columns)
+        if table is None or table.num_rows == 0:
+            return pd.DataFrame()
+        df = table.to_pandas()
+        df = normalize_prices(df) if columns is None else df[[c for c in columns if c in df.columns]]
+        df = df.sort_values('dt').reset_index(drop=True)
+        if freq is not None:
+            self._check_freq(freq)
+            df = resample_bars(df, freq)
+        return df
+
+    def load_market(self, symbols: list[str], start: str, end: str, column: str = 'close', dtype=None,
+                    freq: str | None = None) -> MarketData | None:
+        """
+        One scan for every symbol, as a MarketData matrix over the bar times in range
+        (columns in the order given, symbols without data left out). None if nothing is on disk.
+        With freq, each symbol is read and resampled on its own so only one symbol's
+        raw bars are in memory at a time.
+        """
+        if freq is not None:
+            return self._load_resampled(symbols, start, end, column, dtype, freq)
+        table = self._scan(symbols, start, end, ['symbol', 'dt', column])
+        if table is None or table.num_rows == 0:
+            return None
+
+        found = set(pc.unique(table['symbol']).to_pylist())
+        present = [s for s in symbols if s in found]
+        codes = pc.index_in(table['symbol'], value_set=pa.array(present, type=pa.string())).to_numpy()
+        return MarketData.from_rows(present, codes, table['dt'].to_numpy(),
+                                    table[column].to_numpy(zero_copy_only=False), dtype)
+
+    def _load_resampled(self, symbols, start, end, column, dtype, freq) -> MarketData | None:
+        self._check_freq(freq)
+        present, codes, times, values = [], [], [], []
+        for symbol in symbols:
+            table = self._scan([symbol], start, end, ['dt', column])
+            if table is None or table.num_rows == 0:
+                continue
+            dt = table['dt'].to_numpy().astype('datetime64[ns]')
+            vals = table[column].to_numpy(zero_copy_only=False)
+            if len(dt) > 1 and (dt[1:] < dt[:-1]).any():
+                order = np.argsort(dt, kind='stable')
+                dt, vals = dt[order], vals[order]
+            bucket = _buckets(dt, freq)
+            starts = np.flatnonzero(np.concatenate([[True], bucket[1:] != bucket[:-1]]))
+            codes.append(np.full(len(starts), len(present)))
+            times.append(bucket[starts])
+            values.append(_aggregate(vals, BAR_AGG.get(column, 'last'), starts))
+            present.append(symbol)
+        if not present:
+            return None
+        return MarketData.from_rows(present, np.concatenate(codes), np.concatenate(times), np.concatenate(values), dtype)
+
+    def load_matrix(self, symbols: list[str], start: str, end: str, column: str = 'close', freq: str | None = None) -> pd.DataFrame:
+        """load_market as a dates x symbols frame (float32 for large universes, see marketdata.py)."""
+        market = self.load_market(symbols, start, end, column, freq=freq)
+        return market.frame() if market is not None else pd.DataFrame()
+
 
-        data.reset_index(inplace=True)
-        data.rename(columns={'Date': 'dt', 'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close', 'Adj Close': 'adj_close', 'Volume': 'volume'}, inplace=True)
-        
-        table = pa.Table.from_pandas(data)
-        pq.write_table(table, file_path)
-        print(f"Data for {symbol} saved to {file_path}")
+STORE = PriceStore(offline=os.environ.get('PRICE_STORE_OFFLINE') == '1')
+_STORES = {'1d': STORE}
+_STORES_LOCK = threading.Lock()
+
+
+def store_for(interval: str = '1d') -> PriceStore:
+    # one store per bar interval, sharing STORE's directory and offline setting
+    with _STORES_LOCK:
+        if interval not in _STORES:
+            _STORES[interval] = PriceStore(STORE.data_dir, STORE.downloader, STORE.offline, interval)
+        return _STORES[interval]
+
+
+"""We decided to use,Fetches stock data and stores it in a Parquet file."""
+def fetch_and_store_prices(symbol: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
+    # Only the part of [start, end) that isn't already on disk is downloaded
+    try:
+        data = store_for(interval).ensure(symbol, start, end)
+        if data.empty:
+            print(f"No data found for {symbol}")
         return data
     except Exception as e:
         print(f"Error fetching/storing data for {symbol}: {e}")
-        return pd.DataFrame()
\ No newline at end of file
+        return pd.DataFrame()
+
+
+# For parquet
+def load_prices_from_parquet(symbol: str, start: str, end: str) -> pd.DataFrame:
+    return STORE.load(symbol, start, end)
+
+
+def price_versions(symbols: list[str], start: str, end: str) -> dict:
+    # symbol -> content hash of its prices in range (see PriceStore.version)
+    return {s: STORE.version(s, start, end) for s in symbols}
+
+
+def load_price_matrix(symbols: list[str], start: str, end: str) -> pd.DataFrame:
+    return STORE.load_matrix(symbols, start, end)
+
+
+def bar_loaders(interval: str = '1d', freq: str | None = None):
+    """
+    (price_loader, matrix_loader) for engine.build_price_matrix over interval bars,
+    resampled to freq when given, e.g. bar_loaders('1m', '5min').
+    """
+    store = store_for(interval)
+    if freq is not None:
+        store._check_freq(freq)
+
+    def price_loader(symbol: str, start: str, end: str) -> pd.DataFrame:
+        return store.load(symbol, start, end, freq=freq)
+
+    def matrix_loader(symbols: list[str], start: str, end: str) -> pd.DataFrame:
+        return store.load_matrix(symbols, start, end, freq=freq)
+
+    return price_loader, matrix_loader
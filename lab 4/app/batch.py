@@ -0,0 +1,144 @@
+# batch.py
+# One strategy over many portfolios at once. The union of their symbols is loaded and
+# run through the strategy a single time; every portfolio is then simulated on its own
+# rows and columns of the shared price / signal matrices, in a process pool that gets
+# the matrices once per worker.
+#
+# A portfolio's rows are the dates on which at least one of its symbols has a price,
+# as in a single /api/run. Signals come from each symbol's series on the union's dates,
+# which is the same series as in a single run when the symbols share a trading calendar.
+#
+#   python batch.py --portfolios tech=AAPL,MSFT,NVDA energy=CVX,XOM mixed=AAPL,CVX \
+#       --start 2020-01-01 --end 2025-01-01 --strategy consensus
+
+import argparse
+import os
+
+import numpy as np
+
+import engine
+import pools
+import registry
+from backtest import fetch_and_store_prices, load_prices_from_parquet, load_price_matrix
+from profiling import NO_TIMINGS
+
+# KPI columns of the comparison table (each one can be ranked by)
+COLUMNS = engine.RANK_KPIS
+
+_STATE = None  # per-worker (prices_df, signals, rsi) over the union of symbols
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _run_portfolio(job):
+    key, rows, cols, cash_start = job
+    prices_df, signals, rsi = _STATE
+    sub = prices_df.iloc[rows, cols]
+    res = engine.backtest_signals(sub, signals[np.ix_(rows, cols)], rsi[np.ix_(rows, cols)], cash_start)
+    return key, res
+
+
+def portfolio_slices(raw_prices, portfolios: dict) -> dict:
+    """
+    key -> (row positions, column positions) into the union matrix for each portfolio
+    with price data; raw_prices is the union before forward filling.
+    """
+    out = {}
+    for key, symbols in portfolios.items():
+        cols = [raw_prices.columns.get_loc(s) for s in dict.fromkeys(symbols) if s in raw_prices.columns]
+        if not cols:
+            continue
+        rows = np.flatnonzero(raw_prices.iloc[:, cols].notna().any(axis=1).to_numpy())
+        out[key] = (rows, np.asarray(cols))
+    return out
+
+
+def run_batch(raw_prices, portfolios: dict, strategy_name: str, params: dict, cash_start: float,
+              workers: int | None = None, progress=engine._no_progress, timings=NO_TIMINGS) -> dict:
+    """
+    portfolios: key -> symbols; raw_prices: engine.build_price_matrix(union, ..., fill=False).
+    Returns key -> engine result (kpis, positions, trades, equity) for every portfolio
+    with price data, in the order given.
+    """
+    strategy = registry.get(strategy_name)
+    slices = portfolio_slices(raw_prices, portfolios)
+    if not slices:
+        return {}
+    prices_df = raw_prices.ffill()
+
+    # signals for the whole union, once
+    signals, rsi = engine.build_signal_matrices(prices_df, strategy.module, strategy.resolve(params), progress, timings)
+
+    jobs = [(key, rows, cols, cash_start) for key, (rows, cols) in slices.items()]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    out = {}
+    progress("portfolios", 0, len(jobs))
+
+    def collect(done):
+        for i, (key, res) in enumerate(done):
+            out[key] = res
+            progress("portfolios", i + 1, len(jobs))
+
+    with timings.stage("simulation"):
+        if workers <= 1:
+            _init_worker((prices_df, signals, rsi))
+            collect(map(_run_portfolio, jobs))
+        else:
+            with pools.process_pool(workers, _init_worker, ((prices_df, signals, rsi),)) as pool:
+                collect(pool.map(_run_portfolio, jobs))
+    timings.count("portfolios", len(jobs))
+    return out
+
+
+def comparison(results: dict, portfolios: dict, rank_by: str = "sharpe_ratio") -> list[dict]:
+    """
+    One row per portfolio: headline KPIs, trade count and rank by rank_by (best first,
+    portfolios without a value for it last). rank_by must be one of COLUMNS.
+    """
+    engine.check_rank_by(rank_by)
+    rows = []
+    for key, res in results.items():
+        row = {"portfolio": key, "symbols": len(portfolios[key]), "trades_count": len(res["trades"])}
+        row.update({k: res["kpis"].get(k) for k in COLUMNS})
+        rows.append(row)
+    ranked = sorted(rows, key=lambda r: engine.rank_key(r, rank_by), reverse=True)
+    for rank, r in enumerate(ranked, start=1):
+        r["rank"] = rank
+    return rows
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Same strategy over several portfolios, sharing the market data")
+    ap.add_argument("--portfolios", nargs="+", required=True, help="name=SYM,SYM,... per portfolio")
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", required=True)
+    ap.add_argument("--cash", type=float, default=10000)
+    ap.add_argument("--strategy", default="sma", choices=sorted(registry.STRATEGIES))
+    ap.add_argument("--params", nargs="*", default=[], help="name=value strategy parameters")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--rank-by", default="sharpe_ratio", choices=COLUMNS)
+    ap.add_argument("--fetch", action="store_true", help="download prices from yfinance first")
+    args = ap.parse_args()
+
+    portfolios = {}
+    for spec in args.portfolios:
+        name, _, syms = spec.partition("=")
+        portfolios[name] = [s.strip().upper() for s in syms.split(",") if s.strip()]
+    union = sorted({s for syms in portfolios.values() for s in syms})
+    if args.fetch:
+        for sym in union:
+            fetch_and_store_prices(sym, args.start, args.end)
+
+    raw = engine.build_price_matrix(union, args.start, args.end, load_prices_from_parquet, load_price_matrix, fill=False)
+    if raw.empty:
+        raise SystemExit("No price data on disk for these symbols (use --fetch).")
+
+    params = dict(p.split("=", 1) for p in args.params)
+    results = run_batch(raw, portfolios, args.strategy, params, args.cash, args.workers)
+    print(f"{len(union)} symbols shared by {len(portfolios)} portfolios\n")
+    for r in sorted(comparison(results, portfolios, args.rank_by), key=lambda r: r["rank"]):
+        print(f"{r['rank']:>3}  {r['portfolio']:<16} {args.rank_by}={r.get(args.rank_by)}  "
+              f"return={r['return_pct']}%  mdd={r['max_drawdown_pct']}%  trades={r['trades_count']}")
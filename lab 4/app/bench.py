@@ -0,0 +1,257 @@
+# bench.py
+# Benchmark suite for the backtest hot paths, on synthetic prices (no network, no DB).
+# Synthetic GBM bars are written into a throwaway parquet price lake through the
+# PriceStore downloader hook, so runs go through the same parquet load / align /
+# signals / simulation / KPI path as /api/run. For every strategy and scale it records
+# wall time (best of --repeat), peak Python heap (tracemalloc, a separate run) and
+# trades/sec, plus calculate_kpis on large synthetic trade lists.
+#
+# Results are appended to a JSON history; each case is compared with the previous
+# entry and --check exits non-zero when one got slower than --tolerance allows.
+#
+#   python bench.py --symbols 10 100 500 --years 5 10 --repeat 3
+#   python bench.py --symbols 50 --years 5 --check          # before deploy
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+
+import numpy as np
+import pandas as pd
+
+import engine
+import indicators
+import marketdata
+import sweep
+from backtest import INTERVALS, Downloader, PriceStore
+from metrics import calculate_kpis
+from profiling import Timings
+
+BASE_DATE = "2000-01-03"
+
+
+def make_gbm_prices(n_symbols: int, years: int, seed: int = 42) -> dict:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(BASE_DATE, periods=252 * years)
+    data = {}
+    for k in range(n_symbols):
+        returns = rng.normal(0.0003, 0.02, len(dates))
+        close = 100 * np.exp(np.cumsum(returns))
+        data[f"SYM{k:04d}"] = pd.DataFrame({"dt": dates, "close": close})
+    return data
+
+
+class GBMDownloader(Downloader):
+    """
+    Deterministic OHLCV bars: each symbol gets its own seeded GBM path over
+    business days from BASE_DATE, so any [start, end) slice is the same every time.
+    Intraday intervals give 09:30-16:00 session bars with the same daily drift / vol.
+    """
+    def __init__(self, seed: int = 42, drift: float = 0.0003, vol: float = 0.02):
+        self.seed, self.drift, self.vol = seed, drift, vol
+
+    def download(self, symbol: str, start: str, end: str, interval: str = '1d') -> pd.DataFrame:
+        dates = pd.bdate_range(BASE_DATE, pd.Timestamp(end) - pd.Timedelta(days=1))
+        drift, vol = self.drift, self.vol
+        if interval != '1d':
+            step = pd.Timedelta(INTERVALS[interval])
+            offsets = pd.timedelta_range(pd.Timedelta(hours=9, minutes=30), pd.Timedelta(hours=16) - step, freq=step)
+            dates = pd.DatetimeIndex((dates.to_numpy()[:, None] + offsets.to_numpy()[None, :]).ravel())
+            drift, vol = self.drift / len(offsets), self.vol / np.sqrt(len(offsets))
+        rng = np.random.default_rng([self.seed, zlib.crc32(symbol.encode())])
+        close = 100 * np.exp(np.cumsum(rng.normal(drift, vol, len(dates))))
+        spread = np.abs(rng.normal(0, vol / 2, len(dates)))
+        df = pd.DataFrame({
+            "dt": dates, "open": close * (1 + rng.normal(0, vol / 4, len(dates))),
+            "high": close * (1 + spread), "low": close * (1 - spread), "close": close, "adj_close": close,
+            "volume": rng.integers(100_000, 10_000_000, len(dates)),
+        })
+        return df.loc[df["dt"] >= pd.Timestamp(start)].reset_index(drop=True)
+
+
+def write_lake(data_dir: str, n_symbols: int, years: int, seed: int = 42) -> tuple[list[str], str, str]:
+    """Synthetic parquet files for SYM0000.. under data_dir/lake. Returns (symbols, start, end)."""
+    store = PriceStore(data_dir, downloader=GBMDownloader(seed))
+    start = BASE_DATE
+    end = str((pd.bdate_range(BASE_DATE, periods=252 * years)[-1] + pd.Timedelta(days=1)).date())
+    symbols = [f"SYM{k:04d}" for k in range(n_symbols)]
+    for sym in symbols:
+        store.ensure(sym, start, end)
+    return symbols, start, end
+
+
+def _quiet(fn, *args, **kwargs):
+    # the engine prints progress lines; keep the table readable
+    stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def bench_backtest(store: PriceStore, symbols, start, end, strategy_name: str, repeat: int) -> dict:
+    strategy = sweep.STRATEGIES[strategy_name]
+
+    def run(timings=None):
+        indicators.STORE.clear()  # every run computes its indicators from scratch
+        return _quiet(engine.run_backtest, symbols, start, end, 1_000_000.0, store.load, strategy, {},
+                      matrix_loader=store.load_matrix, timings=timings or Timings())
+
+    best, best_timings, res = None, None, None
+    for _ in range(repeat):
+        timings = Timings()
+        t0 = time.perf_counter()
+        res = run(timings)
+        elapsed = time.perf_counter() - t0
+        if best is None or elapsed < best:
+            best, best_timings = elapsed, timings.to_dict()
+
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    trades = len(res["trades"])
+    return {
+        "seconds": round(best, 4), "peak_mb": round(peak / 2**20, 1), "trades": trades,
+        "trades_per_sec": round(trades / best, 1) if best > 0 else None,
+        "stages_ms": {k: v["ms"] for k, v in best_timings["stages"].items()},
+    }
+
+
+def synthetic_trades(n_trades: int, n_symbols: int = 200, seed: int = 7) -> tuple[list, list]:
+    # alternating buy / full sell per symbol, plus a daily equity curve for the same span
+    rng = np.random.default_rng(seed)
+    n_days = max(2, n_trades // 4)
+    dates = pd.bdate_range(BASE_DATE, periods=n_days)
+    day = np.sort(rng.integers(0, n_days, n_trades))
+    sym = rng.integers(0, n_symbols, n_trades)
+    price = rng.uniform(20, 200, n_trades)
+    qty = rng.integers(1, 100, n_trades)
+    held = np.zeros(n_symbols, dtype=np.int64)
+    trades = []
+    for d, s, p, q in zip(day.tolist(), sym.tolist(), price.tolist(), qty.tolist()):
+        if held[s] and q % 2:
+            trades.append({"date": dates[d].strftime('%Y-%m-%d'), "symbol": f"S{s}", "side": "SELL", "qty": int(held[s]), "price": p})
+            held[s] = 0
+        else:
+            trades.append({"date": dates[d].strftime('%Y-%m-%d'), "symbol": f"S{s}", "side": "BUY", "qty": q, "price": p})
+            held[s] += q
+    equity = list(zip(dates, 1e6 * np.exp(np.cumsum(rng.normal(0.0002, 0.01, n_days)))))
+    return equity, trades
+
+
+def bench_kpis(n_trades: int, repeat: int) -> dict:
+    equity, trades = synthetic_trades(n_trades)
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        calculate_kpis(equity, 1e6, trades)
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    calculate_kpis(equity, 1e6, trades)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"seconds": round(best, 4), "peak_mb": round(peak / 2**20, 1), "trades": n_trades,
+            "trades_per_sec": round(n_trades / best, 1) if best > 0 else None}
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "machine": platform.machine(), "cpus": os.cpu_count(),
+            "signal_workers": engine.SIGNAL_WORKERS, "signal_parallel_min_symbols": engine.SIGNAL_PARALLEL_MIN_SYMBOLS,
+            "compact_min_cells": marketdata.COMPACT_MIN_CELLS}
+
+
+def load_history(path: str) -> list:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def previous_results(history: list) -> dict:
+    # latest recorded result per case name
+    out = {}
+    for entry in history:
+        for r in entry["results"]:
+            out[r["case"]] = r
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Backtest benchmark suite on synthetic parquet prices")
+    ap.add_argument("--symbols", type=int, nargs="+", default=[10, 50, 200])
+    ap.add_argument("--years", type=int, nargs="+", default=[5])
+    ap.add_argument("--strategies", nargs="+", default=sorted(sweep.STRATEGIES), choices=sorted(sweep.STRATEGIES))
+    ap.add_argument("--kpi-trades", type=int, nargs="*", default=[100_000, 1_000_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--data-dir", default=None, help="where to write the synthetic lake (default: temp dir, removed)")
+    ap.add_argument("--signal-workers", type=int, default=None, help="signal process pool size (1 = serial)")
+    ap.add_argument("--history", default=os.path.join("data", "bench_history.json"))
+    ap.add_argument("--label", default=None, help="free text stored with this run")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the previous run")
+    ap.add_argument("--check", action="store_true", help="exit 1 if any case regressed beyond --tolerance")
+    ap.add_argument("--no-save", action="store_true", help="compare only, don't append to the history")
+    args = ap.parse_args()
+
+    indicators.STORE.persist = False
+    if args.signal_workers:
+        engine.SIGNAL_WORKERS = args.signal_workers
+    history = load_history(args.history)
+    before = previous_results(history)
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="bench_lake_")
+    results = []
+
+    def report(case: str, r: dict):
+        prev = before.get(case)
+        ratio = r["seconds"] / prev["seconds"] if prev and prev["seconds"] else None
+        r = {"case": case, **r, "vs_previous": round(ratio, 3) if ratio else None}
+        results.append(r)
+        flag = "  REGRESSION" if ratio and ratio > 1 + args.tolerance else ""
+        tps = f"{r['trades_per_sec']:,.0f}" if r["trades_per_sec"] is not None else "-"
+        print(f"{case:<34} {r['seconds']:>9.3f} {r['peak_mb']:>9.1f} {r['trades']:>9} {tps:>13} "
+              f"{(f'{ratio:.2f}x' if ratio else '-'):>8}{flag}")
+
+    print(f"{'case':<34} {'seconds':>9} {'peak MB':>9} {'trades':>9} {'trades/sec':>13} {'vs prev':>8}")
+    try:
+        for years in args.years:
+            for n in args.symbols:
+                symbols, start, end = _quiet(write_lake, data_dir, n, years, args.seed)
+                store = PriceStore(data_dir, offline=True)
+                for name in args.strategies:
+                    report(f"backtest/{name}/{n}x{years}y", bench_backtest(store, symbols, start, end, name, args.repeat))
+        for n in args.kpi_trades:
+            report(f"kpis/{n}", bench_kpis(n, args.repeat))
+    finally:
+        if args.data_dir is None:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    if not args.no_save:
+        history.append({"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "label": args.label, **environment(), "results": results})
+        os.makedirs(os.path.dirname(args.history) or ".", exist_ok=True)
+        with open(args.history, "w") as f:
+            json.dump(history, f, indent=1)
+        print(f"\nappended to {args.history} ({len(history)} runs)")
+
+    regressed = [r["case"] for r in results if r["vs_previous"] and r["vs_previous"] > 1 + args.tolerance]
+    if args.check and regressed:
+        print(f"slower than the previous run by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+        sys.exit(1)
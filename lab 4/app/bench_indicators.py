@@ -0,0 +1,62 @@
+# bench_indicators.py
+# Timing of the NumPy indicator kernels (one call over a dates x symbols matrix) against
+# the previous path: pandas_ta called once per symbol on a Series. Also reports the
+# largest relative difference between the two. Needs pandas_ta (pip install -r requirements-dev.txt).
+#   python bench_indicators.py --symbols 10 100 500 --years 10
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import kernels
+
+# name -> (kernel over the matrix, pandas_ta on one Series)
+CASES = {
+    "sma(20)": (lambda X: kernels.sma(X, 20), lambda ta, s: ta.sma(s, length=20)),
+    "ema(30)": (lambda X: kernels.ema(X, 30), lambda ta, s: ta.ema(s, length=30)),
+    "rsi(14)": (lambda X: kernels.rsi(X, 14), lambda ta, s: ta.rsi(s, length=14)),
+    "macd(12,26,9)": (lambda X: kernels.macd(X, 12, 26, 9)[2], lambda ta, s: ta.macd(s, 12, 26, 9).iloc[:, 2]),
+}
+
+
+def gbm_matrix(n_symbols: int, years: int, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, (252 * years, n_symbols)), axis=0))
+
+
+def per_symbol(ta, fn, X: np.ndarray) -> np.ndarray:
+    return np.column_stack([np.asarray(fn(ta, pd.Series(X[:, j])), dtype=float) for j in range(X.shape[1])])
+
+
+def max_rel_diff(a: np.ndarray, b: np.ndarray) -> float:
+    both = ~(np.isnan(a) | np.isnan(b))
+    if (np.isnan(a) != np.isnan(b)).any():
+        return float("inf")
+    return float(np.max(np.abs(a[both] - b[both]) / np.maximum(1.0, np.abs(b[both])))) if both.any() else 0.0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 500])
+    ap.add_argument("--years", type=int, default=10)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    import pandas_ta as ta
+    print(f"import pandas_ta: {time.perf_counter() - t0:.2f}s\n")
+
+    print(f"{'indicator':<14} {'symbols':>8} {'pandas_ta s':>12} {'numpy s':>9} {'speedup':>8}  max rel diff")
+    for n in args.symbols:
+        X = gbm_matrix(n, args.years)
+        for name, (kernel, ta_fn) in CASES.items():
+            t0 = time.perf_counter()
+            ref = per_symbol(ta, ta_fn, X)
+            t_ta = time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            out = kernel(X)
+            t_np = time.perf_counter() - t0
+
+            print(f"{name:<14} {n:>8} {t_ta:12.3f} {t_np:9.4f} {t_ta / t_np:7.0f}x  {max_rel_diff(out, ref):.1e}")
@@ -1,7 +1,10 @@
 # app/db_config.py
 import os
+import threading
 import mysql.connector
 
+from db_pool import ConnectionPool
+
 def _env(k, d=None): 
     v = os.environ.get(k)
     return v if v not in (None, "") else d
@@ -14,5 +17,28 @@ DB_SETTINGS = {
     "database": _env("MYSQL_DATABASE", "lab4db"),
 }
 
+POOL_SETTINGS = {
+    "size": int(_env("MYSQL_POOL_SIZE", "5")),
+    "timeout": float(_env("MYSQL_POOL_TIMEOUT", "10")),
+    "ping_idle": float(_env("MYSQL_POOL_PING_IDLE", "30")),
+    "recycle": float(_env("MYSQL_POOL_RECYCLE", "3600")),
+}
+
+# created on first use so each gunicorn worker gets its own sockets after the fork
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(DB_SETTINGS, **POOL_SETTINGS)
+    return _pool
+
 def get_connection():
-    return mysql.connector.connect(**DB_SETTINGS)
+    # close() hands the connection back to the pool
+    return get_pool().get_connection()
+
+def pool_stats() -> dict:
+    return get_pool().stats()
@@ -1,128 +1,410 @@
 from __future__ import annotations
+import importlib
+import os
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+import numpy as np
 import pandas as pd
 from metrics import calculate_kpis
+import indicators
+import ledger
+import marketdata
+import pools
+from profiling import NO_TIMINGS
+from strategies import common
 
+# Signal generation runs in a process pool when there are enough symbols to pay for it.
+# SIGNAL_WORKERS=1 turns the pool off; below SIGNAL_PARALLEL_MIN_SYMBOLS the serial loop is used
+SIGNAL_WORKERS = int(os.environ.get("SIGNAL_WORKERS", "0")) or os.cpu_count() or 1
+SIGNAL_PARALLEL_MIN_SYMBOLS = int(os.environ.get("SIGNAL_PARALLEL_MIN_SYMBOLS", "64"))
+# on_equity gets about this many partial equity points per run, EQUITY_BATCH at a time
+EQUITY_POINTS = 250
+EQUITY_BATCH = 25
+# keys of a run's "kpis" that sweeps, walk-forward and batches can rank runs by
+RANK_KPIS = ("portfolio_value", "total_pnl", "return_pct", "cagr_pct", "sharpe_ratio", "sortino_ratio",
+             "max_drawdown_pct", "calmar_ratio", "profit_factor", "win_rate_pct", "avg_win_loss_ratio",
+             "avg_holding_days")
+
+
+def check_rank_by(rank_by: str):
+    if rank_by not in RANK_KPIS:
+        raise ValueError(f"unknown rank_by '{rank_by}' (use one of {', '.join(RANK_KPIS)})")
+
+
+def rank_key(kpis: dict, rank_by: str) -> tuple:
+    # sort key for best-first ranking (reverse=True); runs without a value rank last
+    value = kpis.get(rank_by)
+    return value is not None, value or 0
+
+
+def build_price_matrix(symbols: list[str], start_date: str, end_date: str, price_loader, matrix_loader=None, timings=NO_TIMINGS, fill=True) -> pd.DataFrame:
+    # dates x symbols close matrix, one column per symbol that has data.
+    # matrix_loader(symbols, start, end) fetches the whole matrix in one call; otherwise
+    # price_loader is called per symbol. fill=False leaves the gaps unfilled.
+    # Large matrices are stored as float32 (see marketdata.py)
+    with timings.stage("load"):
+        if matrix_loader is not None:
+            prices_df = matrix_loader(symbols, start_date, end_date)
+            if prices_df.empty:
+                return pd.DataFrame()
+        else:
+            columns = {}
+            for symbol in symbols:
+                df = price_loader(symbol, start_date, end_date)
+                if not df.empty:
+                    columns[symbol] = pd.Series(np.asarray(df['close'], dtype=float).ravel(), index=pd.DatetimeIndex(df['dt']))
+
+            if not columns:
+                return pd.DataFrame()
+            prices_df = pd.concat(columns, axis=1)
+
+    with timings.stage("align"):
+        if marketdata.price_dtype(*prices_df.shape) == np.float32:
+            prices_df = prices_df.astype(np.float32)
+        prices_df = prices_df.sort_index()
+        end = pd.to_datetime(end_date)
+        if end == end.normalize() and marketdata.is_intraday(prices_df.index):
+            end += pd.Timedelta(days=1) - pd.Timedelta(1)  # a date-only end includes that day's bars
+        prices_df = prices_df.loc[(prices_df.index >= pd.to_datetime(start_date)) & (prices_df.index <= end)]
+        prices_df.dropna(how='all', inplace=True)
+        if fill:
+            prices_df.ffill(inplace=True)
+    timings.count("symbols", prices_df.shape[1])
+    timings.count("dates", prices_df.shape[0])
+    return prices_df
+
+
+def _no_progress(stage, done, total):
+    pass
+
+
+def _fill_signals(prices_df: pd.DataFrame, runs: list, outputs: list, on_symbol=None):
+    # Runs every (strategy, params) in runs for every column of prices_df and writes into
+    # the matching columns of that run's (signals, rsi) pair in outputs. The indicators
+    # all runs declare are evaluated once per symbol and shared between them.
+    dates = prices_df.index
+    for j, symbol in enumerate(prices_df.columns):
+        symbol_data = prices_df[[symbol]].dropna().astype(float).rename(columns={symbol: 'close'}).reset_index()
+        symbol_data = symbol_data.rename(columns={symbol_data.columns[0]: 'dt'})
+        symbol_data.attrs['symbol'] = symbol  # lets the indicator store key its cache by symbol
+        values = indicators.evaluate(symbol_data, [spec for strategy, params in runs for spec in common.specs(strategy, params)])
+
+        for (strategy_logic, strategy_params), (signals, rsi) in zip(runs, outputs):
+            frame = symbol_data.copy() if len(runs) > 1 else symbol_data  # strategies add columns in place
+            symbol_signals = common.generate(strategy_logic, frame, strategy_params, values)
+            symbol_signals = symbol_signals.set_index('dt')
+
+            sig = symbol_signals['signal'].reindex(dates).to_numpy(dtype=float)
+            signals[sig == 1, j] = 1
+            signals[sig == -1, j] = -1
+            if 'rsi_14' in symbol_signals.columns:
+                rsi[:, j] = symbol_signals['rsi_14'].reindex(dates).to_numpy(dtype=float)
+        if on_symbol is not None:
+            on_symbol(j)
+
+
+def build_signal_matrices(prices_df: pd.DataFrame, strategy_logic, strategy_params: dict, progress=_no_progress, timings=NO_TIMINGS, workers=None):
+    # Runs the strategy per symbol and lays signal / rsi out on the same grid as prices_df.
+    # workers=None uses SIGNAL_WORKERS; callers that already run in a pool pass 1
+    return build_signal_sets(prices_df, [(strategy_logic, strategy_params)], progress, timings, workers)[0]
+
+
+def build_signal_sets(prices_df: pd.DataFrame, runs: list, progress=_no_progress, timings=NO_TIMINGS, workers=None) -> list:
+    # build_signal_matrices for several (strategy, params) runs over the same prices;
+    # indicators the runs have in common are computed once. Returns [(signals, rsi), ...]
+    rsi_dtype = marketdata.price_dtype(*prices_df.shape)
+    outputs = [(np.zeros(prices_df.shape, dtype=marketdata.SIGNAL_DTYPE), np.full(prices_df.shape, np.nan, dtype=rsi_dtype))
+               for _ in runs]
+    n_symbols = prices_df.shape[1]
+
+    workers = min(workers or SIGNAL_WORKERS, n_symbols)
+    if workers > 1 and n_symbols >= SIGNAL_PARALLEL_MIN_SYMBOLS:
+        try:
+            with timings.stage("signals"):
+                _parallel_signals(prices_df, runs, outputs, workers, progress)
+            timings.count("signal_workers", workers)
+            return outputs
+        except (OSError, BrokenProcessPool) as e:
+            print(f"Parallel signal generation unavailable ({e}); running serially.")
+            for signals, rsi in outputs:
+                signals[:] = 0
+                rsi[:] = np.nan
+
+    def symbol_done(j):
+        progress("signals", j + 1, n_symbols)
+
+    with timings.stage("signals"):
+        _fill_signals(prices_df, runs, outputs, symbol_done)
+    return outputs
+
+
+# --- process pool path -------------------------------------------------------
+# The price matrix and the output matrices live in shared memory. Each worker maps
+# them once at start-up and gets contiguous column ranges to fill in place, so results
+# land at fixed positions and the output doesn't depend on which worker finished first.
+
+_SHARED = None  # per-worker (prices_df over shared memory, signals, rsi, runs, segments)
+
+
+def _attach(name: str):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # 3.13+: the parent owns the block
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _init_signal_worker(names, dtypes, shape, dates, columns, runs):
+    global _SHARED
+    segments = [_attach(n) for n in names]
+    n_runs = len(runs)
+    prices = np.ndarray(shape, dtype=dtypes[0], buffer=segments[0].buf)
+    signals = np.ndarray((n_runs,) + shape, dtype=dtypes[1], buffer=segments[1].buf)
+    rsi = np.ndarray((n_runs,) + shape, dtype=dtypes[2], buffer=segments[2].buf)
+    prices_df = pd.DataFrame(prices, index=dates, columns=columns, copy=False)
+    runs = [(importlib.import_module(module), params) for module, params in runs]
+    _SHARED = (prices_df, signals, rsi, runs, segments)
+
+
+def _signal_columns(job):
+    lo, hi = job
+    prices_df, signals, rsi, runs, _ = _SHARED
+    outputs = [(signals[k][:, lo:hi], rsi[k][:, lo:hi]) for k in range(len(runs))]
+    _fill_signals(prices_df.iloc[:, lo:hi], runs, outputs)
+    return hi - lo
+
+
+def _parallel_signals(prices_df, runs, outputs, workers, progress):
+    n_symbols = prices_df.shape[1]
+    prices = prices_df.to_numpy()
+    # one block for the prices, one each for all runs' signals and rsi stacked
+    stacked = (len(runs),) + prices.shape
+    layout = [(prices.shape, prices.dtype), (stacked, outputs[0][0].dtype), (stacked, outputs[0][1].dtype)]
+    segments = [shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+                for shape, dtype in layout]
+    shared = []
+    try:
+        shared += [np.ndarray(shape, dtype=dtype, buffer=seg.buf) for (shape, dtype), seg in zip(layout, segments)]
+        shared[0][:] = prices
+        shared[1][:] = 0
+        shared[2][:] = np.nan
+
+        # a few chunks per worker so a slow range doesn't hold up the end of the run
+        bounds = np.linspace(0, n_symbols, min(n_symbols, workers * 4) + 1).astype(int)
+        jobs = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        initargs = ([seg.name for seg in segments], [np.dtype(dtype).str for _, dtype in layout], prices.shape,
+                    prices_df.index, list(prices_df.columns),
+                    [(strategy.__name__, params) for strategy, params in runs])
+        with pools.process_pool(workers, _init_signal_worker, initargs) as pool:
+            done = 0
+            for n in pool.map(_signal_columns, jobs):
+                done += n
+                progress("signals", done, n_symbols)
+
+        for k, (signals, rsi) in enumerate(outputs):
+            signals[:] = shared[1][k]
+            rsi[:] = shared[2][k]
+    finally:
+        shared.clear()  # views must go before the blocks can be closed
+        for seg in segments:
+            seg.close()
+            seg.unlink()
 
-def run_backtest(symbols: list[str], start_date: str, end_date: str, cash_start: float, price_loader, strategy_logic, strategy_params: dict):
-    print("Backtest engine running...")
 
-    #  First, Data Consolidation 
-    all_dates = pd.date_range(start=start_date, end=end_date)
-    prices_df = pd.DataFrame(index=all_dates)
+def trade_row(cash: float, positions: np.ndarray, row_prices: np.ndarray, row_signals: np.ndarray, row_rsi: np.ndarray):
+    """
+    Applies one day's signals to the book: sells close the whole position, buys put
+    10% of the portfolio value to work, scaled up by RSI conviction.
+    positions is updated in place. Returns (cash, [(col, side, qty), ...]).
+    """
+    held = np.flatnonzero(positions)
+    total_value = cash + sum(int(positions[j]) * row_prices[j] for j in held if not np.isnan(row_prices[j]))
+    fills = []
 
-    for symbol in symbols:
-        df = price_loader(symbol, start_date, end_date)
-        if not df.empty:
-            temp_df = pd.DataFrame(index=df['dt'])
-            temp_df[symbol] = df['close'].values
-            prices_df = prices_df.join(temp_df)
+    for j in np.flatnonzero(row_signals):
+        current_price = row_prices[j]
+        if np.isnan(current_price): continue
+
+        if row_signals[j] == -1 and positions[j] > 0:
+            shares_to_sell = int(positions[j])
+            cash += shares_to_sell * current_price
+            positions[j] = 0
+            fills.append((j, "SELL", shares_to_sell))
+
+        elif row_signals[j] == 1:
+            base_investment = total_value * 0.10
+
+            conviction_multiplier = 1.0
+            current_rsi = row_rsi[j]
+            if current_rsi > 50:
+                conviction_multiplier += min((current_rsi - 50) / 20, 1.0)
+
+            investment_amount = base_investment * conviction_multiplier
+            if cash >= investment_amount:
+                shares_to_buy = int(investment_amount / current_price)
+                if shares_to_buy > 0:
+                    cash -= shares_to_buy * current_price
+                    positions[j] += shares_to_buy
+                    fills.append((j, "BUY", shares_to_buy))
+
+    return cash, fills
+
+
+def simulate(prices: np.ndarray, signals: np.ndarray, rsi: np.ndarray, cash_start: float, on_mark=None):
+    """
+    Columnar event loop. prices/signals/rsi are dates x symbols arrays (float32
+    prices / rsi are read a row at a time as float64).
+    Only rows that carry a buy or sell signal are visited in Python; holdings
+    and the equity curve for the remaining days are filled in with NumPy.
+    Returns (fills, holdings, equity) where fills is a list of (row, col, side, qty)
+    and holdings is int32 unless a position could outgrow it.
+    on_mark(row, value), if given, is called with the marked equity of about
+    EQUITY_POINTS evenly spaced event rows while the loop runs.
+    """
+    n_dates, n_symbols = prices.shape
+    cash = cash_start
+    positions = np.zeros(n_symbols, dtype=np.int64)
+    cash_after = np.empty(n_dates)
+    cash_after.fill(np.nan)
+    fills = []
+
+    event_rows = np.flatnonzero((signals != 0).any(axis=1))
+    stride = max(1, len(event_rows) // EQUITY_POINTS)
+    for k, i in enumerate(event_rows):
+        row_prices = np.asarray(prices[i], dtype=float)
+        if on_mark is not None and k % stride == 0:
+            held = np.flatnonzero(positions)
+            marked = positions[held] * row_prices[held]
+            on_mark(i, cash + float(np.where(np.isnan(marked), 0.0, marked).sum()))
+        cash, row_fills = trade_row(cash, positions, row_prices, signals[i], np.asarray(rsi[i], dtype=float))
+        for j, side, qty in row_fills:
+            fills.append((i, j, side, qty))
+        cash_after[i] = cash
+
+    # share count changes per day, then running holdings, in one array
+    rows = np.array([f[0] for f in fills], dtype=np.int64)
+    cols = np.array([f[1] for f in fills], dtype=np.int64)
+    qty = np.array([f[3] if f[2] == "BUY" else -f[3] for f in fills], dtype=np.int64)
+    bought = np.bincount(cols, weights=np.maximum(qty, 0), minlength=n_symbols)
+    holdings = np.zeros((n_dates, n_symbols), dtype=marketdata.share_dtype(int(bought.max(initial=0))))
+    np.add.at(holdings, (rows, cols), qty)
+    np.cumsum(holdings, axis=0, out=holdings)
+
+    # Portfolio is marked before the day's trades, so each day sees the previous day's book
+    cash_after = pd.Series(cash_after).ffill().fillna(cash_start).to_numpy()
+    cash_at_mark = np.concatenate([[cash_start], cash_after[:-1]])
+
+    # summed symbol by symbol so the totals match a left-to-right python sum;
+    # day i is marked with the holdings after day i-1 (nothing is held on day 0)
+    market_value = np.zeros(n_dates)
+    for j in range(n_symbols):
+        col = holdings[:-1, j] * prices[1:, j]
+        market_value[1:] += np.where(np.isnan(col), 0.0, col)
+    equity = cash_at_mark + market_value
+
+    return fills, holdings, equity
+
+
+def run_backtest(symbols: list[str], start_date: str, end_date: str, cash_start: float, price_loader, strategy_logic, strategy_params: dict, matrix_loader=None, progress=_no_progress, timings=NO_TIMINGS, workers=None, on_equity=None):
+    # progress(stage, done, total) is called as the run moves through signals / simulation / kpis;
+    # raising from it aborts the run (used for job cancellation).
+    # timings (profiling.Timings) collects per-stage wall time and counters.
+    # workers caps the signal process pool (default SIGNAL_WORKERS)
+    # on_equity(points) receives partial equity curve points ({date, value}) during the simulation
+    print("Backtest engine running...")
+
+    #  First, Data Consolidation
+    prices_df = build_price_matrix(symbols, start_date, end_date, price_loader, matrix_loader, timings)
 
-    prices_df.dropna(how='all', inplace=True)
-    prices_df.ffill(inplace=True)
-    
     if prices_df.empty:
         print("No price data found for any symbols after processing. Exiting.")
-        return {"kpis": {"portfolio_value": cash_start}, "positions": [], "trades": []}
+        return {"kpis": {"portfolio_value": cash_start}, "positions": [], "trades": [], "equity": []}
+
+    return backtest_prices(prices_df, cash_start, strategy_logic, strategy_params, progress, timings, workers, on_equity)
+
+
+def backtest_prices(prices_df: pd.DataFrame, cash_start: float, strategy_logic, strategy_params: dict, progress=_no_progress, timings=NO_TIMINGS, workers=None, on_equity=None):
+    # Same as run_backtest but on an already consolidated price matrix (used by sweeps)
 
     # The needed signal generation
-    all_signals = []
-    for symbol in prices_df.columns:
-        symbol_data = prices_df[[symbol]].dropna().rename(columns={symbol: 'close'}).reset_index()
-        symbol_signals = strategy_logic.generate_signals(symbol_data.rename(columns={'index':'dt'}), params=strategy_params)
-        symbol_signals['symbol'] = symbol
-        all_signals.append(symbol_signals.set_index('dt'))
-    
-    signals_df = pd.concat(all_signals)
-    
-    #Cashhh
-    cash = cash_start
-    positions = {symbol: 0 for symbol in symbols}
-    trades = []
-    daily_portfolio_value = []
-    
-    all_dates = prices_df.index.unique().sort_values()
-
-    
-    for date in all_dates:
-       
-        current_market_value = sum(positions[symbol] * prices_df.loc[date, symbol] for symbol in symbols if pd.notna(prices_df.loc[date, symbol]))
-        total_value = cash + current_market_value
-        daily_portfolio_value.append((date, total_value))
-
-        if date in signals_df.index:
-            signals_today = signals_df.loc[date]
-            if isinstance(signals_today, pd.Series):
-                signals_today = signals_today.to_frame().T
-
-            for _, signal_row in signals_today.iterrows():
-                symbol = signal_row['symbol']
-                signal = signal_row['signal']
-                current_price = prices_df.loc[date, symbol]
-
-                if pd.isna(current_price): continue
-
-                if signal == -1 and positions.get(symbol, 0) > 0:
-                    shares_to_sell = positions[symbol]
-                    proceeds = shares_to_sell * current_price
-                    cash += proceeds
-                    positions[symbol] = 0
-                    trades.append({"date": date.strftime('%Y-%m-%d'), "symbol": symbol, "side": "SELL", "qty": shares_to_sell, "price": current_price})
-
- 
-                elif signal == 1:
-                   
-                    base_investment = total_value * 0.10
-
-                    
-                    current_rsi = signal_row['rsi_14']
-
-
-                    conviction_multiplier = 1.0
-                    if current_rsi > 50:
-                       
-                        bonus = min((current_rsi - 50) / 20, 1.0)
-                        conviction_multiplier += bonus
-
-                   
-                    investment_amount = base_investment * conviction_multiplier
-                    
-                    if cash >= investment_amount:
-                        shares_to_buy = int(investment_amount / current_price)
-                        cost = shares_to_buy * current_price
-                        if shares_to_buy > 0:
-                            cash -= cost
-                            positions[symbol] += shares_to_buy
-                            trades.append({"date": date.strftime('%Y-%m-%d'), "symbol": symbol, "side": "BUY", "qty": shares_to_buy, "price": current_price})
-    
-    # Post-Backtest Calculations 
-    final_portfolio_value = daily_portfolio_value[-1][1] if daily_portfolio_value else cash_start
-    total_pnl = final_portfolio_value - cash_start
-    
-    
-    #advanced_kpis = calculate_kpis(daily_portfolio_value, cash_start)
-    advanced_kpis = calculate_kpis(daily_portfolio_value, cash_start, trades)
-
-    final_positions = []
-    last_prices = prices_df.iloc[-1]
-    for symbol, qty in positions.items():
-        if qty > 0 and symbol in last_prices:
-            final_positions.append({"symbol": symbol, "qty": qty, "last": last_prices[symbol], "avg_cost": 0, "unrealized": 0})
-
-    print(f"Final Portfolio Value: ${final_portfolio_value:,.2f}")
-
-    
-    all_kpis = {
-    "portfolio_value": round(final_portfolio_value, 2),
-    "total_pnl": round(total_pnl, 2),
-    "return_pct": advanced_kpis["total_return_pct"],
-    "cagr_pct": advanced_kpis["cagr_pct"],
-    "sharpe_ratio": advanced_kpis["sharpe_ratio"],
-    "sortino_ratio": advanced_kpis["sortino_ratio"],
-    "max_drawdown_pct": advanced_kpis["max_drawdown_pct"],
-    "calmar_ratio": advanced_kpis["calmar_ratio"],
-    "profit_factor": advanced_kpis["profit_factor"],
-    "win_rate_pct": advanced_kpis["win_rate_pct"],
-    "avg_win_loss_ratio": advanced_kpis["avg_win_loss_ratio"],
-    }
-
-    return { "kpis": all_kpis, "positions": final_positions, "trades": trades }
\ No newline at end of file
+    signals, rsi = build_signal_matrices(prices_df, strategy_logic, strategy_params, progress, timings, workers)
+
+    res = backtest_signals(prices_df, signals, rsi, cash_start, progress, timings, on_equity)
+    print(f"Final Portfolio Value: ${res['kpis']['portfolio_value']:,.2f}")
+    return res
+
+
+def _price(value) -> float:
+    # float32 matrices (see marketdata.py) give back their shortest repr, so a stored 123.45
+    # is reported as 123.45 rather than 123.44999694824219
+    return float(str(value)) if isinstance(value, np.float32) else float(value)
+
+
+def backtest_signals(prices_df: pd.DataFrame, signals: np.ndarray, rsi: np.ndarray, cash_start: float, progress=_no_progress, timings=NO_TIMINGS, on_equity=None):
+    # Simulation + KPIs for signal matrices that are already laid out on prices_df
+    # (walk-forward slices one set of signals into many windows)
+    dates = prices_df.index
+    stamp = '%Y-%m-%d %H:%M' if marketdata.is_intraday(dates) else '%Y-%m-%d'
+    n_dates = len(dates)
+    progress("simulation", 0, n_dates if on_equity else 1)
+
+    on_mark, pending = None, []
+    if on_equity is not None:
+        def on_mark(i, value):
+            pending.append({"date": dates[i].strftime(stamp), "value": round(value, 2)})
+            if len(pending) >= EQUITY_BATCH:
+                progress("simulation", int(i) + 1, n_dates)
+                on_equity(pending[:])
+                pending.clear()
+
+    with timings.stage("simulation"):
+        prices = prices_df.to_numpy()
+        fills, holdings, equity = simulate(prices, signals, rsi, cash_start, on_mark)
+    if pending:
+        on_equity(pending[:])
+    timings.count("fills", len(fills))
+    progress("kpis", 0, 1)
+    with timings.stage("kpis"):
+        cols = prices_df.columns
+        trades = [
+            {"date": dates[i].strftime(stamp), "symbol": cols[j], "side": side, "qty": qty, "price": _price(prices[i, j])}
+            for i, j, side, qty in fills
+        ]
+        daily_portfolio_value = list(zip(dates, equity))
+
+        # Post-Backtest Calculations
+        final_portfolio_value = daily_portfolio_value[-1][1] if daily_portfolio_value else cash_start
+        total_pnl = final_portfolio_value - cash_start
+
+        book = ledger.from_trades(trades)
+        advanced_kpis = calculate_kpis(daily_portfolio_value, cash_start, trades, book, marketdata.periods_per_year(dates))
+
+        final_positions = []
+        last_prices = prices_df.iloc[-1]
+        open_lots = book.positions()
+        for j, symbol in enumerate(cols):
+            qty = int(holdings[-1, j])
+            if qty > 0:
+                avg_cost = open_lots[symbol][1]
+                last = _price(last_prices[symbol])
+                final_positions.append({"symbol": symbol, "qty": qty, "last": last,
+                                        "avg_cost": round(avg_cost, 2), "unrealized": round(qty * (last - avg_cost), 2)})
+
+
+        all_kpis = {
+        "portfolio_value": round(final_portfolio_value, 2),
+        "total_pnl": round(total_pnl, 2),
+        "return_pct": advanced_kpis["total_return_pct"],
+        "cagr_pct": advanced_kpis["cagr_pct"],
+        "sharpe_ratio": advanced_kpis["sharpe_ratio"],
+        "sortino_ratio": advanced_kpis["sortino_ratio"],
+        "max_drawdown_pct": advanced_kpis["max_drawdown_pct"],
+        "calmar_ratio": advanced_kpis["calmar_ratio"],
+        "profit_factor": advanced_kpis["profit_factor"],
+        "win_rate_pct": advanced_kpis["win_rate_pct"],
+        "avg_win_loss_ratio": advanced_kpis["avg_win_loss_ratio"],
+        "avg_holding_days": advanced_kpis["avg_holding_days"],
+        }
+
+        equity_curve = [{"date": d.strftime(stamp), "value": round(float(v), 2)} for d, v in daily_portfolio_value]
+
+    return { "kpis": all_kpis, "positions": final_positions, "trades": trades, "equity": equity_curve }
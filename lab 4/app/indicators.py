@@ -0,0 +1,283 @@
+# indicators.py
+# Shared indicator store used by every strategy (and by sweeps through them).
+# Each series is keyed by (symbol, indicator, params, data-version) where the
+# data version is a hash of the dt/close input, so a different date window or a
+# refreshed parquet file can never return stale values.
+#
+# Two tiers:
+#   - in-memory LRU (INDICATOR_CACHE_SIZE entries, default 512)
+#   - parquet files in data/indicators/<SYMBOL>/<indicator>_<params>/<version>-k<kernels.VERSION>.parquet,
+#     keeping the INDICATOR_DISK_VERSIONS (default 4) most recently used data versions
+#     per (symbol, indicator, params), so runs over a few alternating date windows all
+#     stay on disk; files from older kernel code never match and age out the same way
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import kernels
+
+
+# Same definitions as pandas_ta (see kernels.py). Like pandas_ta, get() returns None
+# when the series is shorter than min_rows() for the indicator.
+def _sma(close, length, min_periods=None):
+    return pd.Series(kernels.sma(close.to_numpy(dtype=float), length, min_periods), index=close.index, name=f"SMA_{length}")
+
+
+def _ema(close, length):
+    return pd.Series(kernels.ema(close.to_numpy(dtype=float), length), index=close.index, name=f"EMA_{length}")
+
+
+def _rsi(close, length):
+    return pd.Series(kernels.rsi(close.to_numpy(dtype=float), length), index=close.index, name=f"RSI_{length}")
+
+
+def _macd(close, fast, slow, signal):
+    if slow < fast:
+        fast, slow = slow, fast
+    line, hist, sig = kernels.macd(close.to_numpy(dtype=float), fast, slow, signal)
+    suffix = f"{fast}_{slow}_{signal}"
+    return pd.DataFrame({f"MACD_{suffix}": line, f"MACDh_{suffix}": hist, f"MACDs_{suffix}": sig}, index=close.index)
+
+
+_MIN_ROWS = {
+    "sma": lambda length, min_periods=None: length if min_periods is None else 0,
+    "ema": lambda length: length,
+    "rsi": lambda length: length + 1,
+    "macd": lambda fast, slow, signal: max(fast, slow) + signal - 1,
+}
+
+
+def min_rows(name: str, **params) -> int:
+    """Shortest input for which get() returns the indicator rather than None."""
+    return _MIN_ROWS[name](**params)
+
+
+_COMPUTE = {"sma": _sma, "ema": _ema, "rsi": _rsi, "macd": _macd}
+
+
+def data_version(df: pd.DataFrame) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    h.update(pd.to_datetime(df["dt"]).to_numpy(dtype="datetime64[ns]").tobytes())
+    h.update(df["close"].to_numpy(dtype=float).tobytes())
+    return h.hexdigest()
+
+
+class IndicatorStore:
+    def __init__(self, data_dir: str = "data", max_entries: int = 512, persist: bool = True, disk_versions: int = 4):
+        self.data_dir = data_dir
+        self.max_entries = max_entries
+        self.disk_versions = max(1, disk_versions)
+        self.persist = persist
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "entries": len(self._mem), "max_entries": self.max_entries}
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def _dir(self, symbol: str, name: str, params: tuple) -> str:
+        tag = "_".join(f"{k}{v}" for k, v in params) or "default"
+        return os.path.join(self.data_dir, "indicators", symbol, f"{name}_{tag}")
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._mem[key] = value
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _read_disk(self, vdir: str, version: str):
+        path = os.path.join(vdir, f"{version}.parquet")
+        if not os.path.exists(path):
+            return None
+        try:
+            table = pq.read_table(path)
+            os.utime(path)  # recently used, pruned last
+        except Exception:
+            return None
+        meta = table.schema.metadata or {}
+        if meta.get(b"data_version", b"").decode() != version:
+            return None
+        return table.to_pandas()
+
+    def _write_disk(self, vdir: str, version: str, frame: pd.DataFrame):
+        os.makedirs(vdir, exist_ok=True)
+        path = os.path.join(vdir, f"{version}.parquet")
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"data_version": version.encode()})
+        # write then rename so concurrent sweep workers never see half a file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        # keep the most recently used versions only
+        files = []
+        for f in os.listdir(vdir):
+            if f.endswith(".parquet"):
+                try:
+                    files.append((os.path.getmtime(os.path.join(vdir, f)), f))
+                except OSError:
+                    pass
+        for _, f in sorted(files, reverse=True)[self.disk_versions:]:
+            try:
+                os.remove(os.path.join(vdir, f))
+            except OSError:
+                pass
+
+    def get(self, df: pd.DataFrame, name: str, version: str | None = None, **params):
+        """
+        Returns the indicator for df['close'] (a Series, or a DataFrame for macd),
+        aligned to df.index. None when the input is too short for the indicator.
+        The symbol is taken from df.attrs['symbol'] (set by the engine); without it
+        the value is only cached in memory. version is data_version(df) when the
+        caller already has it.
+        """
+        symbol = df.attrs.get("symbol")
+        items = tuple(sorted(params.items()))
+        version = version or data_version(df)
+        key = (symbol, name, items, version)
+
+        with self._lock:
+            value = self._mem.get(key)
+            if value is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+        if value is not None:
+            return _align(value, df.index)
+
+        vdir = self._dir(symbol, name, items) if (symbol and self.persist) else None
+        disk_version = f"{version}-k{kernels.VERSION}"
+        if vdir:
+            value = self._read_disk(vdir, disk_version)
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return _align(value, df.index)
+
+        with self._lock:
+            self.misses += 1
+        if len(df) < min_rows(name, **params):
+            return None
+        result = _COMPUTE[name](df["close"].reset_index(drop=True), **params)
+
+        value = result.to_frame() if isinstance(result, pd.Series) else result
+        value = value.reset_index(drop=True)
+        self._remember(key, value)
+        if vdir:
+            try:
+                self._write_disk(vdir, disk_version, value)
+            except OSError:
+                pass
+        return _align(value, df.index)
+
+
+def _align(frame: pd.DataFrame, index):
+    out = frame.set_axis(index, axis=0)
+    return out.iloc[:, 0] if out.shape[1] == 1 else out
+
+
+STORE = IndicatorStore(
+    data_dir=os.environ.get("INDICATOR_DATA_DIR", "data"),
+    max_entries=int(os.environ.get("INDICATOR_CACHE_SIZE", "512")),
+    disk_versions=int(os.environ.get("INDICATOR_DISK_VERSIONS", "4")),
+)
+
+
+def get(df: pd.DataFrame, name: str, **params):
+    return STORE.get(df, name, **params)
+
+
+def stats() -> dict:
+    return STORE.stats()
+
+
+# ---- dependency graph ---------------------------------------------------------
+# Strategies declare the indicators they read as (name, params) specs (see
+# strategies/common.py). evaluate() takes the specs of one or more strategies for
+# one symbol and computes every distinct node once. Composite indicators are built
+# from their dependencies (macd from the two EMAs, which are then shared with any
+# strategy that reads those EMAs directly). Nodes are resolved on demand: a node
+# whose history is too short is None and its dependencies are never computed.
+
+def _macd_deps(fast, slow, signal):
+    if slow < fast:
+        fast, slow = slow, fast
+    return [("ema", {"length": fast}), ("ema", {"length": slow})]
+
+
+def _macd_from(deps, fast, slow, signal):
+    if slow < fast:
+        fast, slow = slow, fast
+    ema_fast, ema_slow = deps
+    line = ema_fast.to_numpy(dtype=float) - ema_slow.to_numpy(dtype=float)
+    sig = kernels.ema(line, signal)
+    suffix = f"{fast}_{slow}_{signal}"
+    return pd.DataFrame({f"MACD_{suffix}": line, f"MACDh_{suffix}": line - sig, f"MACDs_{suffix}": sig}, index=ema_fast.index)
+
+
+# name -> (dependencies(**params) -> [(name, params)], build(dependency values, **params))
+_DERIVED = {"macd": (_macd_deps, _macd_from)}
+
+
+def spec_key(name: str, params: dict) -> tuple:
+    return name, tuple(sorted(params.items()))
+
+
+def evaluate(df: pd.DataFrame, specs, store: IndicatorStore | None = None) -> dict:
+    """
+    Values of the (name, params) specs on df (one symbol), keyed by spec_key().
+    Each distinct node is computed or fetched from the store once; None where the
+    history is too short for it.
+    """
+    store = store or STORE
+    version = data_version(df)
+    values = {}
+
+    def value(name, params):
+        key = spec_key(name, params)
+        if key not in values:
+            if len(df) < min_rows(name, **params):
+                values[key] = None
+            elif name in _DERIVED:
+                deps, build = _DERIVED[name]
+                values[key] = build([value(*d) for d in deps(**params)], **params)
+            else:
+                values[key] = store.get(df, name, version=version, **params)
+        return values[key]
+
+    for name, params in specs:
+        value(name, params)
+    return values
+
+
+def attach(df: pd.DataFrame, columns: dict, values: dict | None = None) -> pd.DataFrame:
+    """
+    Adds declared indicator columns {column: (name, params[, output])} to df and
+    returns it. output picks one column of a multi-column indicator by its prefix
+    (macd: "MACD", "MACDh", "MACDs"). Columns whose indicator is None are left out.
+    values is a precomputed evaluate() result covering these specs.
+    """
+    if values is None:
+        values = evaluate(df, [spec[:2] for spec in columns.values()])
+    for column, spec in columns.items():
+        value = values[spec_key(*spec[:2])]
+        if value is None:
+            continue
+        if len(spec) > 2:
+            value = value[next(c for c in value.columns if c.split("_")[0] == spec[2])]
+        df[column] = value
+    return df
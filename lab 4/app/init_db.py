@@ -110,6 +110,16 @@ DDL = [
         trades_count      INT NULL,
         FOREIGN KEY (session_id) REFERENCES sessions(session_id) ON DELETE CASCADE
     );
+    """,
+
+    # 9) The session equity curve: int32 days + float64 values, zlib'd (see results.py)
+    """
+    CREATE TABLE IF NOT EXISTS session_equity (
+        session_id  BIGINT PRIMARY KEY,
+        n_days      INT NOT NULL,
+        data        MEDIUMBLOB NOT NULL,
+        FOREIGN KEY (session_id) REFERENCES sessions(session_id) ON DELETE CASCADE
+    );
     """
 ]
 
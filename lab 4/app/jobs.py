@@ -0,0 +1,185 @@
+# jobs.py
+# In-process job queue for long backtests.
+# submit() returns a job id straight away and a small thread pool runs the work;
+# the caller polls status() for the current stage / progress and gets the result
+# once the job is done. At most `workers` jobs run at once and at most `max_pending`
+# can be waiting, beyond that submit() refuses new work.
+#
+# The job function receives a progress(stage, done, total) callback. Calling it
+# after cancel() raises JobCancelled, so cancellation takes effect at the next
+# stage/symbol boundary.
+#
+# Jobs submitted with events=True also get publish(name, data) for incremental output
+# (a fetched symbol, a batch of equity points). follow() turns those events plus the
+# progress counters into one stream for /api/jobs/<id>/events (server-sent events).
+#
+# Jobs live in the memory of one process: run gunicorn with a single worker
+# (threads are fine) or the status request may land on a process that never saw the job.
+
+import threading
+import time
+from collections import deque
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+MAX_EVENTS = 5000  # published events kept per job for (re)connecting streams
+FINAL = ("done", "error", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, kind: str, meta: dict | None = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = "queued"  # queued -> running -> done | error | cancelled
+        self.stage = "queued"
+        self.done = 0
+        self.total = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.events = deque(maxlen=MAX_EVENTS)  # (seq, name, data) from publish()
+        self._seq = 0
+        self._changed = threading.Condition()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def progress(self, stage: str, done: int = 0, total: int = 0):
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+        self.stage, self.done, self.total = stage, done, total
+        self._notify()
+
+    def publish(self, name: str, data):
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+        with self._changed:
+            self._seq += 1
+            self.events.append((self._seq, name, data))
+            self._changed.notify_all()
+
+    def follow(self, after: int = 0, keepalive: float = 15.0, min_interval: float = 0.1):
+        """
+        Yields (seq, name, data) as the job runs: published events after seq `after` in
+        order, a ("progress", counters) snapshot whenever they moved (coalesced, seq None),
+        and a last "done" / "error" / "cancelled" entry with the job dict. Yields None
+        after `keepalive` seconds without news so the caller can keep the connection open.
+        """
+        last = None
+        while True:
+            with self._changed:
+                def news():
+                    return (self._seq > after or self.status in FINAL
+                            or (self.status, self.stage, self.done, self.total) != last)
+                self._changed.wait_for(news, timeout=keepalive)
+                events = [e for e in self.events if e[0] > after]
+                state = (self.status, self.stage, self.done, self.total)
+                finished = self.status in FINAL
+            if not events and state == last and not finished:
+                yield None
+                continue
+            for event in events:
+                after = event[0]
+                yield event
+            if state != last:
+                last = state
+                yield None, "progress", {"status": state[0], "stage": state[1], "done": state[2], "total": state[3]}
+            if finished:
+                yield None, self.status, self.to_dict()
+                return
+            time.sleep(min_interval)  # counters can tick per symbol; don't send every tick
+
+    def to_dict(self, with_result: bool = True) -> dict:
+        d = {
+            "job_id": self.id, "kind": self.kind, "status": self.status, "stage": self.stage,
+            "done": self.done, "total": self.total,
+            "created": self.created, "started": self.started, "finished": self.finished,
+            **self.meta,
+        }
+        if self.error:
+            d["error"] = self.error
+        if with_result and self.status == "done":
+            d["result"] = self.result
+        return d
+
+
+class JobQueue:
+    def __init__(self, workers: int = 2, max_pending: int = 20, keep_seconds: float = 3600):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        # finished jobs are kept for keep_seconds so their result can still be fetched
+        cutoff = time.time() - self.keep_seconds
+        for jid in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+            del self._jobs[jid]
+
+    def submit(self, kind: str, fn, *args, meta: dict | None = None, events: bool = False, **kwargs) -> Job:
+        """Queues fn(*args, progress=job.progress, **kwargs), plus publish=job.publish with events=True."""
+        job = Job(kind, meta)
+        if events:
+            kwargs["publish"] = job.publish
+        with self._lock:
+            self._prune()
+            active = sum(1 for j in self._jobs.values() if j.status in ("queued", "running"))
+            if active >= self.workers + self.max_pending:
+                raise QueueFull(f"{active} jobs already queued or running")
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job.cancel_event.is_set():
+            job.status, job.finished = "cancelled", time.time()
+            job._notify()
+            return
+        job.status, job.started = "running", time.time()
+        try:
+            job.result = fn(*args, progress=job.progress, **kwargs)
+            job.status, job.stage = "done", "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status, job.error = "error", f"{type(e).__name__}: {e}"
+            print(f"job {job.id} ({job.kind}) failed: {job.error}")
+        finally:
+            job.finished = time.time()
+            job._notify()
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job | None:
+        job = self.get(job_id)
+        if job is not None and job.status in ("queued", "running"):
+            job.cancel_event.set()
+            if job.status == "queued":
+                job.status = "cancelled"
+            job._notify()
+        return job
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {}
+            for j in self._jobs.values():
+                counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "max_pending": self.max_pending, **counts}
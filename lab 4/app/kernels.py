@@ -0,0 +1,249 @@
+# kernels.py
+# Rolling indicator kernels in plain NumPy. Every function takes a 1-D series or a
+# 2-D dates x symbols array and handles all columns in one call. The results follow
+# pandas_ta's definitions (no TA-Lib):
+#
+#   sma   rolling mean, first value at row length-1 (or min_periods-1)
+#   ema   seeded with the SMA of the first `length` values, then alpha = 2/(length+1)
+#   rma   Wilder smoothing, alpha = 1/length, starts at the first value
+#   rsi   100 * rma(gains) / (rma(gains) + rma(|losses|))
+#   macd  ema(fast) - ema(slow), signal line = ema of macd from its first value
+#
+# Columns may start with NaNs (symbols listed later than others); each column's
+# indicator starts from its own first value. Gaps after that are not filled.
+# Lengths must be integers >= 1 (ValueError otherwise).
+
+import numpy as np
+
+# bump when any kernel's output changes; it is part of the indicator disk-cache key
+VERSION = 1
+
+# largest growth factor allowed inside one block of the recursive scan (see _ewm)
+_BLOCK_GROWTH = 1e4
+
+
+def _check_lengths(**lengths):
+    for name, value in lengths.items():
+        try:
+            ok = float(value).is_integer() and value >= 1
+        except (TypeError, ValueError):
+            ok = False
+        if not ok:
+            raise ValueError(f"{name} must be an integer >= 1, got {value!r}")
+
+
+def _as_2d(x):
+    x = np.asarray(x, dtype=float)
+    return (x[:, None], True) if x.ndim == 1 else (x, False)
+
+
+def _out(y, was_1d):
+    return y[:, 0] if was_1d else y
+
+
+def _first_valid(x: np.ndarray) -> np.ndarray:
+    # row of the first non-NaN value per column (len(x) when a column is all NaN)
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(x))
+
+
+def sma(x, length: int, min_periods: int | None = None):
+    _check_lengths(length=length)
+    x, was_1d = _as_2d(x)
+    min_periods = length if min_periods is None else min_periods
+    n = len(x)
+    filled = np.nan_to_num(x)
+    csum = np.cumsum(filled, axis=0)
+    count = np.cumsum(~np.isnan(x), axis=0)
+
+    win_sum = csum.copy()
+    win_cnt = count.copy()
+    win_sum[length:] -= csum[:-length] if length < n else 0
+    win_cnt[length:] -= count[:-length] if length < n else 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = win_sum / win_cnt
+    y[win_cnt < min_periods] = np.nan
+    return _out(y, was_1d)
+
+
+def _ewm(x: np.ndarray, alpha: float, start: np.ndarray, seed: np.ndarray) -> np.ndarray:
+    """
+    y[start] = seed, y[t] = (1 - alpha) * y[t-1] + alpha * x[t] afterwards, NaN before start.
+    The recursion is solved in closed form over blocks of rows: inside a block
+        y[t0+k] = d^(k+1) * y[t0-1] + alpha * sum_i d^(k-i) * x[t0+i],   d = 1 - alpha
+    which is a cumsum of x * d^-i. Blocks are kept short enough that d^-k stays
+    below _BLOCK_GROWTH, so only a handful of Python iterations run per call.
+    """
+    n, m = x.shape
+    d = 1.0 - alpha
+    y = np.full((n, m), np.nan)
+    if n == 0 or m == 0:
+        return y
+
+    # before each column's start, feed it its seed so the recursion idles at that value
+    rows = np.arange(n)[:, None]
+    xs = np.where(rows <= start[None, :], seed[None, :], x)
+    if d == 0:
+        y = xs.copy()
+    else:
+        prev = seed.astype(float).copy()
+        block = max(1, int(np.log(_BLOCK_GROWTH) / -np.log(d)))
+        for t0 in range(0, n, block):
+            xb = xs[t0:t0 + block]
+            k = np.arange(len(xb))[:, None]
+            yb = d ** k * (d * prev[None, :] + alpha * np.cumsum(xb * d ** -k, axis=0))
+            y[t0:t0 + block] = yb
+            prev = yb[-1]
+
+    y[rows < start[None, :]] = np.nan
+    return y
+
+
+def ema(x, length: int):
+    _check_lengths(length=length)
+    x, was_1d = _as_2d(x)
+    n = len(x)
+    first = _first_valid(x)
+    start = first + length - 1
+    # seed = mean of each column's first `length` values
+    seed = np.full(x.shape[1], np.nan)
+    ok = start < n
+    if ok.any():
+        csum = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(np.nan_to_num(x), axis=0)])
+        cols = np.nonzero(ok)[0]
+        seed[cols] = (csum[start[cols] + 1, cols] - csum[first[cols], cols]) / length
+    y = _ewm(x, 2.0 / (length + 1), np.minimum(start, n), np.nan_to_num(seed))
+    return _out(y, was_1d)
+
+
+def rma(x, length: int):
+    _check_lengths(length=length)
+    x, was_1d = _as_2d(x)
+    n = len(x)
+    start = _first_valid(x)
+    seed = np.zeros(x.shape[1])
+    ok = start < n
+    seed[ok] = x[start[ok], np.nonzero(ok)[0]]
+    return _out(_ewm(x, 1.0 / length, start, seed), was_1d)
+
+
+def rsi(x, length: int = 14):
+    _check_lengths(length=length)
+    x, was_1d = _as_2d(x)
+    diff = np.full(x.shape, np.nan)
+    diff[1:] = x[1:] - x[:-1]
+    gains = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    losses = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+    up, down = rma(gains, length), rma(losses, length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        y = 100.0 * up / (up + down)
+    return _out(y, was_1d)
+
+
+def macd(x, fast: int = 12, slow: int = 26, signal: int = 9):
+    """(macd line, histogram, signal line)."""
+    _check_lengths(fast=fast, slow=slow, signal=signal)
+    if slow < fast:
+        fast, slow = slow, fast
+    x, was_1d = _as_2d(x)
+    line = ema(x, fast) - ema(x, slow)
+    sig = ema(line, signal)
+    return _out(line, was_1d), _out(line - sig, was_1d), _out(sig, was_1d)
+
+
+# ---- streaming versions -------------------------------------------------------
+# The same definitions one value at a time, for paper trading where a new bar
+# arrives every day. update(x) returns the indicator for the latest value (NaN
+# while warming up) and costs O(1); feeding a series value by value gives the
+# batch result for that series.
+
+class StreamSMA:
+    # same arithmetic as sma(): difference of running sums, so the values are bit-identical
+    def __init__(self, length: int, min_periods: int | None = None):
+        _check_lengths(length=length)
+        self.length = length
+        self.min_periods = length if min_periods is None else min_periods
+        self.n = 0
+        self._sum = 0.0
+        self._count = 0
+        self._sums = [0.0] * length  # running sum / count as of each of the last `length` rows
+        self._counts = [0] * length
+
+    def update(self, x: float) -> float:
+        if x == x:
+            self._sum += x
+            self._count += 1
+        win_sum, win_cnt = self._sum, self._count
+        k = self.n % self.length
+        if self.n >= self.length:
+            win_sum -= self._sums[k]
+            win_cnt -= self._counts[k]
+        self._sums[k], self._counts[k] = self._sum, self._count
+        self.n += 1
+        if win_cnt == 0 or win_cnt < self.min_periods:
+            return np.nan
+        return win_sum / win_cnt
+
+
+class StreamEWM:
+    # y = mean of the first seed_length values, then y = (1 - alpha) * y + alpha * x.
+    # Leading NaNs are skipped. ema: seed_length=length, rma: seed_length=1
+    def __init__(self, alpha: float, seed_length: int):
+        self.alpha = alpha
+        self.seed_length = seed_length
+        self.y = np.nan
+        self._seen = 0
+        self._seed_sum = 0.0
+
+    def update(self, x: float) -> float:
+        if self._seen < self.seed_length:
+            if self._seen == 0 and x != x:
+                return np.nan
+            self._seen += 1
+            self._seed_sum += x if x == x else 0.0
+            if self._seen == self.seed_length:
+                self.y = self._seed_sum / self.seed_length
+            return self.y
+        self.y = (1.0 - self.alpha) * self.y + self.alpha * x
+        return self.y
+
+
+def stream_ema(length: int) -> StreamEWM:
+    _check_lengths(length=length)
+    return StreamEWM(2.0 / (length + 1), length)
+
+
+def stream_rma(length: int) -> StreamEWM:
+    _check_lengths(length=length)
+    return StreamEWM(1.0 / length, 1)
+
+
+class StreamRSI:
+    def __init__(self, length: int = 14):
+        self._prev = np.nan
+        self._up = stream_rma(length)
+        self._down = stream_rma(length)
+
+    def update(self, x: float) -> float:
+        diff, self._prev = x - self._prev, x
+        if diff != diff:
+            gain = loss = np.nan
+        else:
+            gain, loss = (diff, 0.0) if diff > 0 else (0.0, -diff if diff < 0 else 0.0)
+        up, down = self._up.update(gain), self._down.update(loss)
+        if up != up or down != down or up + down == 0:
+            return np.nan
+        return 100.0 * up / (up + down)
+
+
+class StreamMACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if slow < fast:
+            fast, slow = slow, fast
+        self._fast, self._slow, self._signal = stream_ema(fast), stream_ema(slow), stream_ema(signal)
+
+    def update(self, x: float) -> tuple[float, float, float]:
+        """(macd line, histogram, signal line) for the latest value."""
+        line = self._fast.update(x) - self._slow.update(x)
+        sig = self._signal.update(line)
+        return line, line - sig, sig
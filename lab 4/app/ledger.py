@@ -0,0 +1,175 @@
+# ledger.py
+# FIFO lot matching for a list of trades. Every BUY opens a lot and every SELL closes
+# the oldest open lots of its symbol first, partially if needed. The result is one
+# round trip per (lot, sell) match with its P&L and holding period, plus the lots
+# still open at the end, which give the average cost of the remaining position.
+#
+# There is no loop over trades. Without short selling, the n-th share sold of a symbol
+# is the n-th share bought, so lots and sells are laid out as intervals on one share
+# axis (symbols side by side) and the matches are where those intervals overlap.
+# One stable sort by symbol plus a few searchsorted calls handle millions of trades.
+
+import numpy as np
+
+_FIELDS = ("symbol", "entry_date", "exit_date", "qty", "entry_price", "exit_price", "pnl", "holding_days")
+
+
+class Ledger:
+    def __init__(self, symbols: np.ndarray, round_trips: dict, open_lots: dict):
+        self.symbols = symbols          # symbol names, indexed by the "symbol" codes below
+        self.round_trips = round_trips  # arrays: symbol, entry_day, exit_day, qty, entry_price, exit_price, pnl, holding_days
+        self.open_lots = open_lots      # arrays: symbol, day, qty, price
+
+    def stats(self) -> dict:
+        pnl = self.round_trips["pnl"]
+        wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+        gross_profit, gross_loss = float(wins.sum()), float(-losses.sum())
+        avg_win = float(wins.mean()) if len(wins) else 0
+        avg_loss = float(-losses.mean()) if len(losses) else 0
+        return {
+            "round_trips": len(pnl),
+            "profit_factor": gross_profit / gross_loss if gross_loss > 0 else 0,
+            "win_rate_pct": len(wins) / (len(wins) + len(losses)) * 100 if len(wins) + len(losses) else 0,
+            "avg_win_loss_ratio": avg_win / avg_loss if avg_loss > 0 else 0,
+            "avg_holding_days": float(self.round_trips["holding_days"].mean()) if len(pnl) else 0,
+        }
+
+    def positions(self) -> dict:
+        """symbol -> (open qty, average cost of the open lots)."""
+        lots = self.open_lots
+        qty = np.bincount(lots["symbol"], weights=lots["qty"], minlength=len(self.symbols))
+        cost = np.bincount(lots["symbol"], weights=lots["qty"] * lots["price"], minlength=len(self.symbols))
+        return {self.symbols[k]: (int(qty[k]), cost[k] / qty[k]) for k in np.flatnonzero(qty)}
+
+    def records(self) -> list[dict]:
+        rt = self.round_trips
+        columns = [
+            self.symbols[rt["symbol"]].tolist(),
+            np.datetime_as_string(rt["entry_day"]).tolist(), np.datetime_as_string(rt["exit_day"]).tolist(),
+            rt["qty"].tolist(), rt["entry_price"].tolist(), rt["exit_price"].tolist(),
+            np.round(rt["pnl"], 2).tolist(), rt["holding_days"].tolist(),
+        ]
+        return [dict(zip(_FIELDS, row)) for row in zip(*columns)]
+
+
+def _cap_sells(codes, is_buy, qty):
+    """
+    Sell quantities limited to the position held at the time (the engine never sells
+    more, but a hand-made trade list might). Input is symbol-major. The position is the
+    running share count floored at zero: running sum minus its running minimum, both
+    taken per symbol; subtracting `big` per symbol keeps the running minimum from
+    reaching back into the previous symbol.
+    """
+    if not len(qty):
+        return qty
+    flow = np.where(is_buy, qty, -qty)
+    new_symbol = np.concatenate([[True], codes[1:] != codes[:-1]])
+    seg = np.cumsum(new_symbol) - 1
+    total = np.cumsum(flow)
+    running = total - (total - flow)[new_symbol][seg]  # per-symbol running sum
+    big = 2 * int(qty.sum()) + 1
+    floor = np.minimum.accumulate(running - seg * big) + seg * big
+    held_after = running - np.minimum(floor, 0)
+    held_before = np.concatenate([[0], held_after[:-1]])
+    held_before[new_symbol] = 0
+    return np.where(is_buy, qty, np.minimum(qty, held_before))
+
+
+def match_fifo(codes, is_buy, qty, price, day, symbols) -> Ledger:
+    """
+    codes: int symbol index per trade (into symbols), is_buy: bool, qty: shares,
+    price: fill price, day: datetime64[D]. Trades must be in time order. Sells are
+    capped at the shares held.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    is_buy = np.asarray(is_buy, dtype=bool)
+    qty = np.asarray(qty, dtype=np.int64)
+    price = np.asarray(price, dtype=float)
+    day = np.asarray(day, dtype="datetime64[D]")
+    n_sym = len(symbols)
+
+    # symbol-major, time order kept inside each symbol
+    order = np.argsort(codes, kind="stable")
+    qty = qty.copy()
+    qty[order] = _cap_sells(codes[order], is_buy[order], qty[order])
+    b, s = order[is_buy[order]], order[~is_buy[order]]
+    b_sym, s_sym = codes[b], codes[s]
+
+    bought = np.bincount(b_sym, weights=qty[b], minlength=n_sym).astype(np.int64)
+    sold = np.bincount(s_sym, weights=qty[s], minlength=n_sym).astype(np.int64)
+    base = np.concatenate([[0], np.cumsum(bought)[:-1]])  # where each symbol's shares start on the axis
+
+    # lots: consecutive intervals of the axis
+    buy_end = np.cumsum(qty[b])
+    buy_start = buy_end - qty[b]
+
+    # sells: same axis, counted from the symbol's base
+    sold_before = np.concatenate([[0], np.cumsum(sold)[:-1]])
+    sell_end = base[s_sym] + np.cumsum(qty[s]) - sold_before[s_sym]
+    sell_start = sell_end - qty[s]
+
+    # every lot and sell edge cuts the axis; a piece that lies inside a sell is one match
+    edges = np.unique(np.concatenate([buy_start, buy_end, sell_start, sell_end]))
+    lo, hi = edges[:-1], edges[1:]
+    sell = np.searchsorted(sell_end, lo, side="right")
+    inside = sell < len(s)
+    inside[inside] = sell_start[sell[inside]] <= lo[inside]
+    lo, hi, sell = lo[inside], hi[inside], sell[inside]
+    lot = np.searchsorted(buy_end, lo, side="right")
+
+    # back into time order of the closing trade
+    chrono = np.lexsort((lot, s[sell]))
+    lot, sell, matched = lot[chrono], sell[chrono], (hi - lo)[chrono]
+
+    entry_price, exit_price = price[b[lot]], price[s[sell]]
+    entry_day, exit_day = day[b[lot]], day[s[sell]]
+    round_trips = {
+        "symbol": s_sym[sell], "entry_day": entry_day, "exit_day": exit_day, "qty": matched,
+        "entry_price": entry_price, "exit_price": exit_price, "pnl": matched * (exit_price - entry_price),
+        "holding_days": (exit_day - entry_day).astype(np.int64),
+    }
+
+    # whatever lies past a symbol's last sold share is still open
+    sold_through = base + sold
+    remaining = np.clip(buy_end - np.maximum(buy_start, sold_through[b_sym]), 0, None)
+    keep = remaining > 0
+    open_lots = {"symbol": b_sym[keep], "day": day[b][keep], "qty": remaining[keep], "price": price[b][keep]}
+
+    return Ledger(np.asarray(symbols), round_trips, open_lots)
+
+
+def from_trades(trades: list[dict]) -> Ledger:
+    """Ledger for engine-style trade dicts (date, symbol, side, qty, price)."""
+    if not trades:
+        return match_fifo([], [], [], [], [], [])
+    symbols, codes = np.unique([t["symbol"] for t in trades], return_inverse=True)
+    return match_fifo(
+        codes,
+        [t["side"] == "BUY" for t in trades],
+        [t["qty"] for t in trades],
+        [t["price"] for t in trades],
+        np.array([str(t["date"])[:10] for t in trades], dtype="datetime64[D]"),
+        symbols,
+    )
+
+
+def concat(books: list[Ledger], scales=None) -> Ledger:
+    """
+    Round trips of several ledgers as one; scales[k] multiplies book k's quantities and
+    P&L (walk-forward windows are simulated from the same cash and restated at the
+    stitched equity level). Open lots are not carried over.
+    """
+    scales = [1.0] * len(books) if scales is None else scales
+    symbols = np.unique(np.concatenate([b.symbols.astype(str) for b in books])) if books else np.array([], dtype=str)
+    parts = {k: [] for k in ("symbol", "entry_day", "exit_day", "qty", "entry_price", "exit_price", "pnl", "holding_days")}
+    for book, scale in zip(books, scales):
+        rt = book.round_trips
+        parts["symbol"].append(np.searchsorted(symbols, book.symbols.astype(str)[rt["symbol"]]))
+        for k in ("entry_day", "exit_day", "entry_price", "exit_price", "holding_days"):
+            parts[k].append(rt[k])
+        parts["qty"].append(rt["qty"] * scale)
+        parts["pnl"].append(rt["pnl"] * scale)
+    round_trips = {k: np.concatenate(v) if v else np.array([]) for k, v in parts.items()}
+    empty = np.array([], dtype=np.int64)
+    open_lots = {"symbol": empty, "day": empty.astype("datetime64[D]"), "qty": empty, "price": empty.astype(float)}
+    return Ledger(symbols, round_trips, open_lots)
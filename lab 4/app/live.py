@@ -0,0 +1,294 @@
+# live.py
+# Paper trading: portfolios follow their strategy one daily close at a time instead
+# of over a fixed history. Every symbol keeps the strategy's LiveState (streaming
+# indicators, see kernels.py), so a new bar costs O(1) per symbol however long the
+# history is, and the book is traded with engine.trade_row, the same rules as a backtest.
+#
+# A symbol's state only depends on (strategy, params, start date, symbol), so portfolios
+# that share those update each symbol once per bar. Symbols missing from a bar are
+# carried forward at their last close, like the ffill in build_price_matrix.
+#
+# A replay makes the same trades as engine.run_backtest over the same bars, with one
+# exception: consensus with its trend filter on only matches for symbols that have at
+# least trend_length bars (see its LiveState and check_parity).
+#
+# The book lives in process memory like the job queue: after a restart portfolios are
+# added again and replayed from their start date.
+#
+#   python live.py --synthetic 20 --years 3 --strategy consensus --portfolios 300 --check
+
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import engine
+import ledger
+import sweep
+from metrics import calculate_kpis
+
+
+def params_key(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class PaperPortfolio:
+    def __init__(self, portfolio_id, symbols: list[str], strategy_name: str, params: dict,
+                 cash_start: float, start_date):
+        if strategy_name not in sweep.STRATEGIES:
+            raise ValueError(f"unknown strategy '{strategy_name}'")
+        self.portfolio_id = portfolio_id
+        self.symbols = list(symbols)
+        self.strategy_name = strategy_name
+        self.params = dict(params)
+        self.cash_start = float(cash_start)
+        self.cash = float(cash_start)
+        self.start_date = pd.Timestamp(start_date)
+        self.positions = np.zeros(len(self.symbols), dtype=np.int64)
+        self.last_prices = np.full(len(self.symbols), np.nan)
+        self.trades = []
+        self.equity = []  # (date, value), marked before the day's trades as in engine.simulate
+        self.feed_key = (strategy_name, params_key(self.params), self.start_date)
+
+    def new_states(self) -> dict:
+        strategy = sweep.STRATEGIES[self.strategy_name]
+        return {s: strategy.LiveState(self.params) for s in self.symbols}
+
+    def step(self, dt: pd.Timestamp, closes: np.ndarray, signals: np.ndarray, rsi: np.ndarray) -> list[dict]:
+        # closes / signals / rsi are aligned with self.symbols
+        market_value = 0.0
+        for v in (self.positions * closes).tolist():
+            if v == v:
+                market_value += v
+        self.equity.append((dt, self.cash + market_value))
+        self.last_prices = closes
+
+        if not signals.any():
+            return []
+        self.cash, fills = engine.trade_row(self.cash, self.positions, closes, signals, rsi)
+        day = dt.strftime('%Y-%m-%d')
+        trades = [{"date": day, "symbol": self.symbols[j], "side": side, "qty": qty, "price": closes[j]}
+                  for j, side, qty in fills]
+        self.trades += trades
+        return trades
+
+    def summary(self) -> dict:
+        value = self.equity[-1][1] if self.equity else self.cash_start
+        return {
+            "portfolio_id": self.portfolio_id, "strategy": self.strategy_name, "params": self.params,
+            "start_date": self.start_date.strftime('%Y-%m-%d'),
+            "last_date": self.equity[-1][0].strftime('%Y-%m-%d') if self.equity else None,
+            "cash": round(self.cash, 2), "portfolio_value": round(float(value), 2),
+            "return_pct": round((value / self.cash_start - 1) * 100, 4), "trades": len(self.trades),
+        }
+
+    def to_dict(self) -> dict:
+        book = ledger.from_trades(self.trades)
+        open_lots = book.positions()
+        positions = []
+        for j, (s, q) in enumerate(zip(self.symbols, self.positions)):
+            if q > 0:
+                last, avg_cost = float(self.last_prices[j]), open_lots[s][1]
+                positions.append({"symbol": s, "qty": int(q), "last": last, "avg_cost": round(avg_cost, 2),
+                                  "unrealized": round(int(q) * (last - avg_cost), 2)})
+        return {
+            **self.summary(),
+            "kpis": calculate_kpis(self.equity, self.cash_start, self.trades, book),
+            "positions": positions, "trades": self.trades,
+            "equity": [{"date": d.strftime('%Y-%m-%d'), "value": round(float(v), 2)} for d, v in self.equity],
+        }
+
+
+def _bar_signals(states: list, closes: np.ndarray):
+    signals = np.zeros(len(states), dtype=np.int8)
+    rsi = np.full(len(states), np.nan)
+    for j, state in enumerate(states):
+        if not np.isnan(closes[j]):
+            signals[j], rsi[j] = state.update(closes[j])
+    return signals, rsi
+
+
+class PaperBook:
+    def __init__(self):
+        self.portfolios = {}
+        self.last_date = None
+        self.last_bar_ms = None
+        self._states = {}      # (feed_key, symbol) -> strategy LiveState
+        self._last_close = {}  # symbol -> latest close seen
+        self._lock = threading.Lock()
+
+    def add(self, portfolio: PaperPortfolio, history: pd.DataFrame | None = None):
+        """
+        Registers a portfolio. history (dates x symbols closes from its start date, as from
+        engine.build_price_matrix) is replayed first so the portfolio catches up with the book.
+        """
+        with self._lock:
+            if portfolio.portfolio_id in self.portfolios:
+                raise ValueError(f"portfolio {portfolio.portfolio_id} is already paper trading")
+            states = portfolio.new_states()
+            if history is not None and not history.empty:
+                if self.last_date is not None:
+                    history = history.loc[:self.last_date]
+                prices = history.reindex(columns=portfolio.symbols).to_numpy(dtype=float)
+                ordered = [states[s] for s in portfolio.symbols]
+                for i, dt in enumerate(history.index):
+                    portfolio.step(dt, prices[i], *_bar_signals(ordered, prices[i]))
+                if self.last_date is None and len(history):
+                    self.last_date = history.index[-1]
+                    last = history.ffill().iloc[-1]
+                    self._last_close.update({s: float(v) for s, v in last.items() if not np.isnan(v)})
+
+            # a portfolio with the same strategy, params and start date replayed the same bars
+            for s, state in states.items():
+                self._states.setdefault((portfolio.feed_key, s), state)
+            self.portfolios[portfolio.portfolio_id] = portfolio
+
+    def remove(self, portfolio_id) -> PaperPortfolio | None:
+        with self._lock:
+            portfolio = self.portfolios.pop(portfolio_id, None)
+            used = {(p.feed_key, s) for p in self.portfolios.values() for s in p.symbols}
+            for key in [k for k in self._states if k not in used]:
+                del self._states[key]
+            return portfolio
+
+    def symbols(self) -> list[str]:
+        return sorted({s for p in self.portfolios.values() for s in p.symbols})
+
+    def on_bar(self, dt, closes: dict) -> dict:
+        """Feeds one bar (symbol -> close) to every portfolio. Returns {portfolio_id: new trades}."""
+        dt = pd.Timestamp(dt)
+        t0 = time.perf_counter()
+        with self._lock:
+            if self.last_date is not None and dt <= self.last_date:
+                raise ValueError(f"bar {dt.date()} is not after the last one ({self.last_date.date()})")
+            self._last_close.update({s: float(c) for s, c in closes.items() if c is not None and not np.isnan(c)})
+
+            outputs = {}
+            for key, state in self._states.items():
+                close = self._last_close.get(key[1])
+                if close is not None and key[0][2] <= dt:
+                    outputs[key] = state.update(close)
+
+            fills = {}
+            for pid, p in self.portfolios.items():
+                if dt < p.start_date:
+                    continue
+                prices = np.array([self._last_close.get(s, np.nan) for s in p.symbols])
+                if np.isnan(prices).all():
+                    continue
+                signals = np.zeros(len(p.symbols), dtype=np.int8)
+                rsi = np.full(len(p.symbols), np.nan)
+                for j, s in enumerate(p.symbols):
+                    out = outputs.get((p.feed_key, s))
+                    if out is not None:
+                        signals[j], rsi[j] = out
+                fills[pid] = p.step(dt, prices, signals, rsi)
+
+            self.last_date = dt
+            self.last_bar_ms = round((time.perf_counter() - t0) * 1000, 3)
+        return fills
+
+    def stats(self) -> dict:
+        return {
+            "portfolios": len(self.portfolios), "symbol_states": len(self._states),
+            "last_date": self.last_date.strftime('%Y-%m-%d') if self.last_date is not None else None,
+            "last_bar_ms": self.last_bar_ms,
+        }
+
+
+def check_parity(prices_df: pd.DataFrame, strategy_name: str, params: dict, stride: int = 1) -> dict:
+    """
+    Feeds each symbol to LiveState and compares every `stride`-th bar with generate_signals
+    run on the symbol's whole history, the way a backtest over the same bars sees it
+    (rsi only on buys, the one place the engine uses it).
+    Symbols shorter than the state's parity_bars (consensus: trend_length) are skipped,
+    parity is not promised for them (see strategies/consensus.py).
+    """
+    strategy = sweep.STRATEGIES[strategy_name]
+    checked = mismatches = skipped = 0
+    max_rsi_diff = 0.0
+    for symbol in prices_df.columns:
+        series = prices_df[symbol].dropna()
+        closes = series.to_numpy(dtype=float)
+        state = strategy.LiveState(params)
+        if len(closes) < getattr(state, "parity_bars", 0):
+            skipped += 1
+            continue
+        live = [state.update(c) for c in closes]
+
+        try:
+            out = strategy.generate_signals(pd.DataFrame({"dt": series.index, "close": closes}), params=params)
+        except (TypeError, KeyError):
+            out = pd.DataFrame(columns=["dt", "signal"])  # consensus needs the full MACD warm-up before it can run at all
+        out = out.set_index("dt").reindex(series.index)
+        signals = out["signal"].where(out["signal"].isin([1, -1]), 0).to_numpy(dtype=int)
+        rsis = out["rsi_14"].to_numpy(dtype=float) if "rsi_14" in out.columns else np.full(len(closes), np.nan)
+
+        for t in range(stride - 1, len(closes), stride):
+            live_signal, live_rsi = live[t]
+            checked += 1
+            if signals[t] != live_signal or (live_signal == 1 and np.isnan(rsis[t]) != np.isnan(live_rsi)):
+                mismatches += 1
+            elif live_signal == 1 and not np.isnan(live_rsi):
+                max_rsi_diff = max(max_rsi_diff, float(abs(rsis[t] - live_rsi)))
+    return {"checked": checked, "signal_mismatches": mismatches, "max_rsi_diff": max_rsi_diff,
+            "skipped_symbols": skipped}
+
+
+if __name__ == "__main__":
+    from backtest import fetch_and_store_prices, load_prices_from_parquet, load_price_matrix
+    from bench import make_gbm_prices
+
+    ap = argparse.ArgumentParser(description="Paper-trading replay, timing and batch parity check")
+    ap.add_argument("--symbols", nargs="+", default=[])
+    ap.add_argument("--start", default="2020-01-01")
+    ap.add_argument("--end", default=pd.Timestamp.today().strftime('%Y-%m-%d'))
+    ap.add_argument("--synthetic", type=int, default=0, help="use N synthetic GBM symbols instead")
+    ap.add_argument("--years", type=int, default=3)
+    ap.add_argument("--strategy", default="consensus", choices=sorted(sweep.STRATEGIES))
+    ap.add_argument("--portfolios", type=int, default=100)
+    ap.add_argument("--cash", type=float, default=100000)
+    ap.add_argument("--check", action="store_true", help="compare against generate_signals bar by bar")
+    ap.add_argument("--stride", type=int, default=1)
+    ap.add_argument("--fetch", action="store_true", help="download prices from yfinance first")
+    args = ap.parse_args()
+
+    if args.synthetic:
+        data = make_gbm_prices(args.synthetic, args.years)
+        prices_df = pd.DataFrame({s: df.set_index("dt")["close"] for s, df in data.items()})
+    else:
+        symbols = [s.upper() for s in args.symbols]
+        if args.fetch:
+            for sym in symbols:
+                fetch_and_store_prices(sym, args.start, args.end)
+        prices_df = engine.build_price_matrix(symbols, args.start, args.end, load_prices_from_parquet, load_price_matrix)
+    if prices_df.empty:
+        raise SystemExit("No price data (use --symbols with --fetch, or --synthetic N).")
+
+    # every portfolio holds a different slice of the universe; half of them share params
+    book = PaperBook()
+    history, last = prices_df.iloc[:-1], prices_df.iloc[-1]
+    cols = list(prices_df.columns)
+    t0 = time.perf_counter()
+    for k in range(args.portfolios):
+        symbols = cols[k % len(cols):] + cols[:k % len(cols)]
+        symbols = symbols[:max(1, len(cols) // 2)]
+        params = {} if k % 2 == 0 else {"sma": {"short": 5}, "ema_rsi": {"fast": 5}, "consensus": {"buy_score": 2}}[args.strategy]
+        book.add(PaperPortfolio(k, symbols, args.strategy, params, args.cash, history.index[0]), history)
+    print(f"replayed {args.portfolios} portfolios over {len(history)} bars in {time.perf_counter() - t0:.2f}s")
+
+    book.on_bar(prices_df.index[-1], last.to_dict())
+    print(f"new bar for {args.portfolios} portfolios ({book.stats()['symbol_states']} symbol states): {book.last_bar_ms} ms")
+
+    one = PaperPortfolio("check", cols, args.strategy, {}, args.cash, prices_df.index[0])
+    PaperBook().add(one, prices_df)
+    batch = engine.backtest_prices(prices_df, args.cash, sweep.STRATEGIES[args.strategy], {})
+    same = [(t["date"], t["symbol"], t["side"], t["qty"]) for t in one.trades] == \
+           [(t["date"], t["symbol"], t["side"], t["qty"]) for t in batch["trades"]]
+    print(f"same trades as a backtest over the full history: {same}")
+
+    if args.check:
+        print(check_parity(prices_df, args.strategy, {}, args.stride))
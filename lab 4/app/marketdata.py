@@ -0,0 +1,66 @@
+# marketdata.py
+# Compact dates x symbols market data for large universes: one contiguous close array
+# over bar times only (trading days, or intraday bar times, on which at least one symbol
+# has a bar), in the smallest dtypes that still hold the values:
+#
+#   - prices (and RSI):  float32 once the matrix reaches COMPACT_MIN_CELLS cells
+#                        (default 5M, e.g. 800 symbols x 25 years), float64 below that
+#                        so ordinary runs keep full precision
+#   - share counts:      int32 unless a position could outgrow it
+#   - signal codes:      int8 (-1 / 0 / 1)
+#
+# The engine still does its arithmetic in float64 (rows are upcast as they're read),
+# so only the stored prices are rounded, to ~7 significant digits.
+# 5,000 symbols x 25 years is ~31M cells: ~126 MB of float32 closes instead of ~252 MB.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+COMPACT_MIN_CELLS = int(os.environ.get("COMPACT_MIN_CELLS", "5000000"))
+SIGNAL_DTYPE = np.int8
+
+
+def price_dtype(n_dates: int, n_symbols: int):
+    return np.float32 if n_dates * n_symbols >= COMPACT_MIN_CELLS else np.float64
+
+
+def share_dtype(max_shares: int):
+    return np.int32 if max_shares <= np.iinfo(np.int32).max else np.int64
+
+
+def is_intraday(dates: pd.DatetimeIndex) -> bool:
+    return bool(len(dates)) and bool((dates != dates.normalize()).any())
+
+
+def periods_per_year(dates: pd.DatetimeIndex) -> float:
+    # bars per year for annualizing per-bar returns: 252 sessions x bars per session
+    if not is_intraday(dates):
+        return 252
+    per_day = pd.Series(1, index=dates).groupby(dates.normalize()).size()
+    return 252 * float(per_day.median())
+
+
+class MarketData:
+    def __init__(self, dates, symbols, close: np.ndarray):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.close = np.ascontiguousarray(close)
+
+    @classmethod
+    def from_rows(cls, symbols, codes, dt, values, dtype=None) -> "MarketData":
+        """
+        Scatters long-format bars (symbol code into symbols, datetime64, close) into
+        the matrix. dtype=None picks price_dtype for the resulting shape.
+        """
+        dt = np.asarray(dt).astype("datetime64[ns]")
+        dates = np.unique(dt)
+        dtype = dtype or price_dtype(len(dates), len(symbols))
+        close = np.full((len(dates), len(symbols)), np.nan, dtype=dtype)
+        close[np.searchsorted(dates, dt), codes] = values
+        return cls(dates, symbols, close)
+
+    def frame(self) -> pd.DataFrame:
+        """The close matrix as a DataFrame, without copying it."""
+        return pd.DataFrame(self.close, index=self.dates, columns=self.symbols, copy=False)
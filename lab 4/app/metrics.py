@@ -1,13 +1,18 @@
 import pandas as pd
 import numpy as np
 
-def calculate_kpis(daily_portfolio_value: list, cash_start: float, trades: list):
+import ledger
+
+def calculate_kpis(daily_portfolio_value: list, cash_start: float, trades: list, book=None, periods_per_year: float = 252):
+    # book: a ledger.Ledger for these trades when the caller already built one
+    # periods_per_year annualizes Sharpe / Sortino (bars per year for intraday curves)
     
     if not daily_portfolio_value:
         return {
             "total_return_pct": 0, "cagr_pct": 0, "sharpe_ratio": 0,
             "sortino_ratio": 0, "max_drawdown_pct": 0, "calmar_ratio": 0,
             "profit_factor": 0, "win_rate_pct": 0, "avg_win_loss_ratio": 0,
+            "round_trips": 0, "avg_holding_days": 0,
         }
 
     # --- Portfolio-Level Metrics ---
@@ -26,12 +31,12 @@ def calculate_kpis(daily_portfolio_value: list, cash_start: float, trades: list)
     sortino_ratio = 0.0
 
     if daily_returns.std() > 0:
-        sharpe_ratio = (daily_returns.mean() / daily_returns.std()) * np.sqrt(252)
+        sharpe_ratio = (daily_returns.mean() / daily_returns.std()) * np.sqrt(periods_per_year)
         
         negative_returns = daily_returns[daily_returns < 0]
         downside_std = negative_returns.std()
         if downside_std > 0:
-            sortino_ratio = (daily_returns.mean() / downside_std) * np.sqrt(252)
+            sortino_ratio = (daily_returns.mean() / downside_std) * np.sqrt(periods_per_year)
 
     # Drawdown & Calmar
     running_max = equity_curve.cummax()
@@ -40,39 +45,11 @@ def calculate_kpis(daily_portfolio_value: list, cash_start: float, trades: list)
     calmar_ratio = (cagr_pct / 100) / abs(max_drawdown_pct / 100) if max_drawdown_pct != 0 else 0
 
     
-    profit_factor = 0
-    win_rate_pct = 0
-    avg_win_loss_ratio = 0
-
-    if trades:
-        # simplified P&L calculation 
-        trades_df = pd.DataFrame(trades)
-        pnl_per_symbol = {}
-        for symbol in trades_df['symbol'].unique():
-            buys = trades_df[(trades_df['symbol'] == symbol) & (trades_df['side'] == 'BUY')]
-            sells = trades_df[(trades_df['symbol'] == symbol) & (trades_df['side'] == 'SELL')]
-            
-            if not sells.empty:
-                total_cost = (buys['qty'] * buys['price']).sum()
-                total_proceeds = (sells['qty'] * sells['price']).sum()
-                pnl_per_symbol[symbol] = total_proceeds - total_cost
-
-        wins = [pnl for pnl in pnl_per_symbol.values() if pnl > 0]
-        losses = [pnl for pnl in pnl_per_symbol.values() if pnl < 0]
-
-        gross_profit = sum(wins)
-        gross_loss = abs(sum(losses))
-        
-        if gross_loss > 0:
-            profit_factor = gross_profit / gross_loss
-        
-        if len(wins) + len(losses) > 0:
-            win_rate_pct = (len(wins) / (len(wins) + len(losses))) * 100
-
-        avg_win = sum(wins) / len(wins) if wins else 0
-        avg_loss = abs(sum(losses) / len(losses)) if losses else 0
-        if avg_loss > 0:
-            avg_win_loss_ratio = avg_win / avg_loss
+    # trade statistics per FIFO round trip (each sell matched against the lots it closes)
+    trade_stats = (book if book is not None else ledger.from_trades(trades)).stats()
+    profit_factor = trade_stats["profit_factor"]
+    win_rate_pct = trade_stats["win_rate_pct"]
+    avg_win_loss_ratio = trade_stats["avg_win_loss_ratio"]
 
     return {
         "total_return_pct": round(total_return_pct, 2), "cagr_pct": round(cagr_pct, 2),
@@ -80,4 +57,5 @@ def calculate_kpis(daily_portfolio_value: list, cash_start: float, trades: list)
         "max_drawdown_pct": round(max_drawdown_pct, 2), "calmar_ratio": round(calmar_ratio, 2),
         "profit_factor": round(profit_factor, 2), "win_rate_pct": round(win_rate_pct, 2),
         "avg_win_loss_ratio": round(avg_win_loss_ratio, 2),
+        "round_trips": trade_stats["round_trips"], "avg_holding_days": round(trade_stats["avg_holding_days"], 1),
     }
\ No newline at end of file
@@ -0,0 +1,103 @@
+# montecarlo.py
+# Monte Carlo robustness check for a finished backtest.
+# The daily returns of the equity curve are resampled into many alternative paths
+# (plain bootstrap or circular block bootstrap, which keeps volatility clusters
+# together) and Sharpe / CAGR / max drawdown are computed for every path at once
+# as (paths x days) arrays. Paths are processed in chunks of about MAX_CELLS values
+# (~40 MB per float64 array) so 10k paths x 5k days never needs all 400 MB at once.
+
+import numpy as np
+import pandas as pd
+
+import marketdata
+
+MAX_CELLS = 5_000_000
+PERCENTILES = [5, 25, 50, 75, 95]
+METHODS = ("bootstrap", "block")
+
+
+def daily_returns(daily_portfolio_value: list) -> tuple[np.ndarray, float, float]:
+    """Returns of the equity curve, its length in years and bars per year (same conventions as calculate_kpis)."""
+    try:
+        rows = [(e["date"], e["value"]) if isinstance(e, dict) else tuple(e) for e in daily_portfolio_value]
+        curve = pd.DataFrame(rows, columns=['date', 'value'])
+        curve['date'] = pd.to_datetime(curve['date'])
+        values = curve['value'].to_numpy(dtype=float)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("equity points need a date and a numeric value") from None
+    years = (curve['date'].iloc[-1] - curve['date'].iloc[0]).days / 365.25
+    per_year = marketdata.periods_per_year(pd.DatetimeIndex(curve['date']))
+    return values[1:] / values[:-1] - 1, years, per_year
+
+
+def resample_index(rng, n_paths: int, n_days: int, method: str = "bootstrap", block: int = 20) -> np.ndarray:
+    # (paths x days) positions into the original return series
+    if method == "bootstrap":
+        return rng.integers(0, n_days, size=(n_paths, n_days), dtype=np.int32)
+    if method == "block":
+        n_blocks = -(-n_days // block)
+        starts = rng.integers(0, n_days, size=(n_paths, n_blocks, 1), dtype=np.int32)
+        idx = (starts + np.arange(block, dtype=np.int32)) % n_days  # wraps around the end
+        return idx.reshape(n_paths, n_blocks * block)[:, :n_days]
+    raise ValueError(f"method must be one of {METHODS}")
+
+
+def path_stats(returns: np.ndarray, years: float, periods_per_year: float = 252) -> dict:
+    """Sharpe, CAGR %, max drawdown % and total return % for each row of a (paths x days) return array."""
+    growth = np.cumprod(1.0 + returns, axis=1)
+    final = growth[:, -1]
+
+    std = returns.std(axis=1, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 0, returns.mean(axis=1) / std * np.sqrt(periods_per_year), 0.0)
+        cagr = (final ** (1 / years) - 1) * 100 if years > 0 else np.zeros_like(final)
+
+    # running peak includes the starting value 1.0; computed in place to keep one extra array
+    peak = np.maximum(growth, 1.0)
+    np.maximum.accumulate(peak, axis=1, out=peak)
+    np.divide(growth, peak, out=peak)
+    max_dd = (peak.min(axis=1) - 1) * 100
+
+    return {"sharpe_ratio": sharpe, "cagr_pct": cagr, "max_drawdown_pct": max_dd, "total_return_pct": (final - 1) * 100}
+
+
+def _summary(values: np.ndarray, actual: float, bins: int) -> dict:
+    lo, hi = float(values.min()), float(values.max())
+    if hi - lo < 1e-9 * max(1.0, abs(lo)):  # every path agrees up to rounding (e.g. block == days)
+        lo, hi = lo - 0.5, hi + 0.5
+    counts, edges = np.histogram(values, bins=bins, range=(lo, hi))
+    return {
+        "actual": round(float(actual), 4),
+        "mean": round(float(values.mean()), 4),
+        "std": round(float(values.std()), 4),
+        "percentiles": {str(p): round(float(v), 4) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))},
+        "histogram": {"counts": counts.tolist(), "edges": np.round(edges, 4).tolist()},
+    }
+
+
+def simulate_paths(daily_portfolio_value: list, n_paths: int = 5000, method: str = "bootstrap",
+                   block: int = 20, seed: int | None = None, bins: int = 40) -> dict:
+    returns, years, per_year = daily_returns(daily_portfolio_value)
+    if len(returns) < 2:
+        raise ValueError("need at least 3 days of equity to resample")
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    if method == "block" and not 1 <= block <= len(returns):
+        raise ValueError(f"block must be between 1 and {len(returns)} (the number of returns)")
+
+    rng = np.random.default_rng(seed)
+    n_days = len(returns)
+    chunk = max(1, MAX_CELLS // n_days)
+
+    parts = []
+    for start in range(0, n_paths, chunk):
+        idx = resample_index(rng, min(chunk, n_paths - start), n_days, method, block)
+        parts.append(path_stats(returns[idx], years, per_year))
+    stats = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    actual = {k: v[0] for k, v in path_stats(returns[None, :], years, per_year).items()}
+
+    return {
+        "paths": n_paths, "days": n_days, "method": method, "block": block if method == "block" else None,
+        "prob_loss_pct": round(float((stats["total_return_pct"] < 0).mean() * 100), 2),
+        "metrics": {k: _summary(stats[k], actual[k], bins) for k in stats},
+    }
@@ -0,0 +1,40 @@
+# pools.py
+# Process pools for the CPU-bound stages (signal generation, sweeps, walk-forward
+# windows, batches). The web app runs these from request and job-queue threads, so:
+#
+#   - workers are started from a forkserver (spawn where that isn't available), never
+#     forked from the multithreaded app process, where a lock held by another thread
+#     at fork time would stay locked in the child forever
+#   - at most MAX_POOLS pools exist at once across all threads (env MAX_PROCESS_POOLS,
+#     default 1), so concurrent jobs queue for the CPUs instead of each starting
+#     cpu_count() processes; a caller waits here until a pool slot is free
+#
+# Nothing is preloaded into the forkserver: importing numpy there starts BLAS threads,
+# which would make the server itself a multithreaded process that forks.
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+START_METHOD = os.environ.get("POOL_START_METHOD") or (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+MAX_POOLS = max(1, int(os.environ.get("MAX_PROCESS_POOLS", "1")))
+
+_CONTEXT = multiprocessing.get_context(START_METHOD)
+_SLOTS = threading.BoundedSemaphore(MAX_POOLS)
+
+
+@contextmanager
+def process_pool(workers: int, initializer=None, initargs=()):
+    """
+    A ProcessPoolExecutor for the duration of the with block, once a pool slot is free.
+    Leaving the block drops queued tasks and waits for running ones.
+    """
+    with _SLOTS:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=_CONTEXT, initializer=initializer, initargs=initargs)
+        try:
+            yield pool
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
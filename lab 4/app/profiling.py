@@ -0,0 +1,90 @@
+# profiling.py
+# Stage timers for the backtest pipeline. A Timings object collects wall time and
+# call counts per stage (fetch, load, align, signals, simulation, kpis, persist) and
+# plain counters (symbols, dates, event rows, fills). Finished runs are written to the
+# "backtest.timings" logger as one JSON line each and kept in a bounded in-memory
+# history that summary() turns into p50 / p95 per stage.
+#
+# Engine functions take timings=NO_TIMINGS by default, which costs nothing.
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+log = logging.getLogger("backtest.timings")
+
+
+class Timings:
+    def __init__(self):
+        self.stages = {}    # name -> [seconds, calls]
+        self.counters = {}
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            s = self.stages.setdefault(name, [0.0, 0])
+            s[0] += time.perf_counter() - t0
+            s[1] += 1
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def to_dict(self) -> dict:
+        return {
+            "total_ms": round((time.perf_counter() - self._t0) * 1000, 3),
+            "stages": {k: {"ms": round(sec * 1000, 3), "calls": calls} for k, (sec, calls) in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class _NoTimings:
+    def stage(self, name: str):
+        return nullcontext()
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+
+NO_TIMINGS = _NoTimings()
+
+
+class TimingHistory:
+    def __init__(self, max_runs: int = 500):
+        self._runs = deque(maxlen=max_runs)
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, timings: dict, **fields):
+        """Logs one finished run and keeps it for summary()."""
+        entry = {"ts": round(time.time(), 3), "kind": kind, **fields, **timings}
+        with self._lock:
+            self._runs.append(entry)
+        log.info(json.dumps(entry, default=str))
+
+    def summary(self, kind: str | None = None) -> dict:
+        with self._lock:
+            runs = [r for r in self._runs if kind is None or r["kind"] == kind]
+        per_stage = {"total": [r["total_ms"] for r in runs]}
+        for r in runs:
+            for name, s in r["stages"].items():
+                per_stage.setdefault(name, []).append(s["ms"])
+        out = {}
+        for name, values in per_stage.items():
+            if values:
+                v = np.asarray(values)
+                out[name] = {"runs": len(v), "mean_ms": round(float(v.mean()), 3),
+                             "p50_ms": round(float(np.percentile(v, 50)), 3),
+                             "p95_ms": round(float(np.percentile(v, 95)), 3)}
+        return {"runs": len(runs), "stages": out}
+
+
+HISTORY = TimingHistory(int(os.environ.get("TIMINGS_HISTORY", "500")))
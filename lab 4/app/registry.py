@@ -0,0 +1,61 @@
+# registry.py
+# Strategies by name. Each strategy module declares its parameters, the constraints
+# between them and the indicator columns it reads (see strategies/common.py). The API
+# validates and resolves parameters here; sweep.STRATEGIES (name -> module) is built
+# from it.
+#
+# A new strategy is a module with PARAMS / requires() / signals() / generate_signals()
+# plus one register() call below.
+
+from strategies import common, consensus, ema_rsi, sma
+
+
+class Strategy:
+    def __init__(self, name: str, module):
+        self.name = name
+        self.module = module
+        self.params = dict(module.PARAMS)
+        self.minimums = dict(getattr(module, "MINIMUMS", {}))
+        self.constraints = list(getattr(module, "CONSTRAINTS", []))
+        self.off = dict(getattr(module, "OFF", {}))
+
+    def resolve(self, params: dict) -> dict:
+        """Declared parameters with defaults filled in and values cast; other keys are dropped."""
+        return common.resolve(self.params, params, self.minimums)
+
+    def is_valid(self, params: dict) -> bool:
+        values = {**self.params, **params}
+        return all(values[a] < values[b] for a, b in self.constraints
+                   if self.off.get(a) != values[a] and self.off.get(b) != values[b])
+
+    def indicators(self, params: dict | None = None) -> list:
+        """Distinct (indicator, params) nodes the strategy reads for these params."""
+        out = []
+        for name, args in common.specs(self.module, params or {}):
+            if (name, args) not in out:
+                out.append((name, args))
+        return out
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "params": self.params, "minimums": self.minimums, "constraints": self.constraints,
+                "indicators": [{"name": n, **args} for n, args in self.indicators()]}
+
+
+STRATEGIES = {}
+
+
+def register(name: str, module) -> Strategy:
+    STRATEGIES[name] = Strategy(name, module)
+    return STRATEGIES[name]
+
+
+def get(name: str) -> Strategy:
+    strategy = STRATEGIES.get((name or "").lower())
+    if strategy is None:
+        raise ValueError(f"unknown strategy '{name}'")
+    return strategy
+
+
+register("sma", sma)
+register("consensus", consensus)
+register("ema_rsi", ema_rsi)
@@ -0,0 +1,127 @@
+# reports.py
+# Backtest report exports. Everything is produced as a generator of chunks so
+# Flask can stream it: the response never holds the whole report as one string.
+#
+#  - CSV:            KPI comment header, then the trades, CHUNK_ROWS rows at a time
+#  - Parquet/Arrow:  trades or the daily equity curve as a columnar file
+#                    (Arrow IPC stream format, readable with pyarrow.ipc.open_stream)
+
+import csv
+import io
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+CHUNK_ROWS = 5000
+
+# known column types; anything else a strategy adds is inferred from the first rows.
+# Dates of intraday runs carry a time ("YYYY-MM-DD HH:MM") and are written as timestamps
+_TYPES = {
+    "date": pa.date32(), "symbol": pa.string(), "side": pa.string(),
+    "qty": pa.int64(), "price": pa.float64(), "value": pa.float64(),
+}
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+
+def report_header(kpis: dict, params: dict) -> str:
+    header = []
+    header.append("# Backtest Report\n")
+    header.append(f"# Strategy: {params.get('params', {}).get('strategy', 'N/A')}\n")
+    header.append(f"# Date Range: {params.get('start_date', '')} to {params.get('end_date', '')}\n")
+    header.append("-" * 30 + "\n")
+    header.append("# Key Performance Indicators\n")
+    header.append(f"# Final Portfolio Value: ${kpis.get('portfolio_value', 0):,.2f}\n")
+    header.append(f"# Total P&L: ${kpis.get('total_pnl', 0):,.2f}\n")
+    header.append(f"# Total Return: {kpis.get('return_pct', 0.0):.2f}%\n")
+    header.append(f"# Sharpe Ratio: {kpis.get('sharpe_ratio', 0.0):.2f}\n")
+    header.append(f"# Max Drawdown: {kpis.get('max_drawdown_pct', 0.0):.2f}%\n")
+    header.append("-" * 30 + "\n")
+    header.append("# Trades\n")
+    return "".join(header)
+
+
+def iter_csv(kpis: dict, params: dict, trades: list[dict]):
+    yield report_header(kpis, params)
+    if not trades:
+        return
+
+    columns = list(trades[0])
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    writer.writerow(columns)
+    for start in range(0, len(trades), CHUNK_ROWS):
+        for t in trades[start:start + CHUNK_ROWS]:
+            writer.writerow([t.get(c) for c in columns])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+
+
+def _type(name: str, sample: list[dict]) -> pa.DataType:
+    if name == "date" and any(len(str(r.get(name) or "")) > 10 for r in sample):
+        return pa.timestamp("s")
+    return _TYPES.get(name) or pa.array([r.get(name) for r in sample]).type
+
+
+def _schema(rows: list[dict]) -> pa.Schema:
+    sample = rows[:CHUNK_ROWS]
+    return pa.schema([(name, _type(name, sample)) for name in rows[0]])
+
+
+def _batch(rows: list[dict], schema: pa.Schema) -> pa.RecordBatch:
+    # plain values (ISO date strings, ints for prices) are cast to the column type
+    return pa.RecordBatch.from_arrays(
+        [pa.array([r.get(f.name) for r in rows]).cast(f.type) for f in schema],
+        schema=schema,
+    )
+
+
+class _ChunkSink:
+    # write-only file object that hands back what pyarrow wrote since the last drain()
+    def __init__(self):
+        self.parts = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out, self.parts = b"".join(self.parts), []
+        return out
+
+
+def iter_columnar(rows: list[dict], fmt: str):
+    """Streams rows as Parquet (one row group per chunk) or an Arrow IPC stream."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown export format '{fmt}'")
+    schema = _schema(rows) if rows else pa.schema([("date", pa.date32())])
+
+    sink = _ChunkSink()
+    out = pa.PythonFile(sink, mode="w")
+    writer = pq.ParquetWriter(out, schema) if fmt == "parquet" else ipc.new_stream(out, schema)
+    for start in range(0, len(rows), CHUNK_ROWS):
+        batch = _batch(rows[start:start + CHUNK_ROWS], schema)
+        if fmt == "parquet":
+            writer.write_batch(batch, row_group_size=CHUNK_ROWS)
+        else:
+            writer.write_batch(batch)
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
@@ -0,0 +1,173 @@
+# results.py
+# Server-side store for finished backtests.
+# Every /api/run is written to the sessions tables as a 'draft' and gets a run id
+# (its session_id); saving just locks that row, and a past session can be reloaded
+# from MySQL without re-running the engine.
+#
+#  - sessions.snapshot_info:  params, full KPI dict and final positions (JSON)
+#  - session_trades:          one row per fill, bulk inserted
+#  - session_metrics:         headline KPIs, as before
+#  - session_equity:          daily equity curve packed into one compressed blob
+
+import json
+import zlib
+
+import numpy as np
+
+TRADE_BATCH = 1000
+DRAFT_DAYS = 7  # unsaved runs older than this are dropped
+
+
+def pack_equity(equity: list[dict]) -> bytes:
+    # int32 day numbers followed by float64 values, zlib'd (~12 bytes/day before compression)
+    days = np.array([e["date"] for e in equity], dtype="datetime64[D]").astype(np.int32)
+    values = np.array([e["value"] for e in equity], dtype=np.float64)
+    return zlib.compress(days.tobytes() + values.tobytes())
+
+
+def unpack_equity(blob: bytes, n: int) -> list[dict]:
+    raw = zlib.decompress(blob)
+    days = np.frombuffer(raw[:4 * n], dtype=np.int32).astype("datetime64[D]")
+    values = np.frombuffer(raw[4 * n:], dtype=np.float64)
+    return [{"date": str(d), "value": float(v)} for d, v in zip(days, values)]
+
+
+def strategy_id(cn, name: str, params: dict) -> int:
+    cur = cn.cursor()
+    cur.execute("SELECT strategy_id FROM strategies WHERE name=%s ORDER BY strategy_id LIMIT 1", (name,))
+    row = cur.fetchone()
+    if row:
+        cur.close()
+        return row[0]
+    cur.execute("INSERT INTO strategies (name, params_json) VALUES (%s, %s)", (name, json.dumps(params)))
+    sid = cur.lastrowid
+    cur.close()
+    return sid
+
+
+def save_trades(cur, session_id: int, trades: list[dict]):
+    rows = [(session_id, t["date"], t["symbol"], t["side"], float(t["price"]), int(t["qty"])) for t in trades]
+    for start in range(0, len(rows), TRADE_BATCH):
+        # executemany folds this into multi-row INSERTs
+        cur.executemany("""
+            INSERT INTO session_trades (session_id, dt, stock_symbol, side, price, shares)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, rows[start:start + TRADE_BATCH])
+
+
+def save_metrics(cur, session_id: int, kpis: dict, trades_count: int):
+    cur.execute("""
+        INSERT INTO session_metrics (session_id, total_return, annualized_return, sharpe, max_drawdown, trades_count)
+        VALUES (%s, %s, %s, %s, %s, %s)
+    """, (
+        session_id, kpis.get('total_pnl', 0), kpis.get('cagr_pct'), kpis.get('sharpe_ratio', 0),
+        kpis.get('max_drawdown_pct', 0), trades_count
+    ))
+
+
+def persist_run(cn, pid: int, params: dict, start: str, end: str, cash_start: float, res: dict) -> int:
+    """Writes a finished run as a draft session in one transaction, returns its run id."""
+    name = (params.get("strategy") or "sma").lower()
+    snapshot = {"params": params, "kpis": res.get("kpis", {}), "positions": res.get("positions", [])}
+    trades = res.get("trades", [])
+    equity = res.get("equity", [])
+    try:
+        sid = strategy_id(cn, name, params)
+        cur = cn.cursor()
+        cur.execute("""
+            INSERT INTO sessions (portfolio_id, strategy_id, start_date, end_date, initial_cash, status, snapshot_mode, snapshot_info)
+            VALUES (%s, %s, %s, %s, %s, 'draft', 'copied', %s)
+        """, (pid, sid, start, end, cash_start, json.dumps(snapshot, default=float)))
+        run_id = cur.lastrowid
+        save_trades(cur, run_id, trades)
+        save_metrics(cur, run_id, snapshot["kpis"], len(trades))
+        if equity:
+            cur.execute("INSERT INTO session_equity (session_id, n_days, data) VALUES (%s, %s, %s)",
+                        (run_id, len(equity), pack_equity(equity)))
+        # trades/metrics/equity of expired drafts go with them (ON DELETE CASCADE)
+        cur.execute("DELETE FROM sessions WHERE status='draft' AND created_at < NOW() - INTERVAL %s DAY", (DRAFT_DAYS,))
+        cn.commit()
+        cur.close()
+        return run_id
+    except Exception:
+        cn.rollback()
+        raise
+
+
+def lock_run(cn, run_id: int) -> bool:
+    cur = cn.cursor()
+    cur.execute("UPDATE sessions SET status='locked', locked_at=NOW() WHERE session_id=%s", (run_id,))
+    found = cur.rowcount > 0
+    if not found:
+        # rowcount is 0 for a run that was already locked too
+        cur.execute("SELECT 1 FROM sessions WHERE session_id=%s", (run_id,))
+        found = cur.fetchone() is not None
+    cn.commit()
+    cur.close()
+    return found
+
+
+def run_exists(cn, run_id: int) -> bool:
+    # drafts expire (DRAFT_DAYS), so a remembered run id may be gone
+    cur = cn.cursor()
+    cur.execute("SELECT 1 FROM sessions WHERE session_id=%s", (run_id,))
+    found = cur.fetchone() is not None
+    cur.close()
+    return found
+
+
+def load_run(cn, run_id: int) -> dict | None:
+    """Rebuilds the /api/run response for a stored session (None if it doesn't exist)."""
+    cur = cn.cursor()
+    cur.execute("""
+        SELECT portfolio_id, start_date, end_date, initial_cash, status, snapshot_info, created_at
+        FROM sessions WHERE session_id=%s
+    """, (run_id,))
+    row = cur.fetchone()
+    if not row:
+        cur.close()
+        return None
+    pid, start, end, cash, status, snapshot, created = row
+    snapshot = json.loads(snapshot) if snapshot else {}
+
+    cur.execute("""
+        SELECT dt, stock_symbol, side, shares, price FROM session_trades
+        WHERE session_id=%s ORDER BY dt, id
+    """, (run_id,))
+    trades = [{"date": str(dt), "symbol": sym, "side": side, "qty": qty, "price": price}
+              for dt, sym, side, qty, price in cur.fetchall()]
+
+    cur.execute("SELECT n_days, data FROM session_equity WHERE session_id=%s", (run_id,))
+    eq = cur.fetchone()
+    cur.close()
+
+    return {
+        "run_id": run_id,
+        # same shape as the /api/run request body
+        "params": {"portfolio_id": pid, "start_date": str(start), "end_date": str(end),
+                   "cash_start": cash, "params": snapshot.get("params", {})},
+        "status": status,
+        "created_at": str(created),
+        "kpis": snapshot.get("kpis", {}),
+        "positions": snapshot.get("positions", []),
+        "trades": trades,
+        "equity": unpack_equity(eq[1], eq[0]) if eq else [],
+    }
+
+
+def list_runs(cn, pid: int, limit: int = 50) -> list[dict]:
+    cur = cn.cursor()
+    cur.execute("""
+        SELECT s.session_id, st.name, s.start_date, s.end_date, s.initial_cash, s.status, s.created_at,
+               m.sharpe, m.max_drawdown, m.trades_count
+        FROM sessions s
+        JOIN strategies st ON st.strategy_id = s.strategy_id
+        LEFT JOIN session_metrics m ON m.session_id = s.session_id
+        WHERE s.portfolio_id=%s
+        ORDER BY s.session_id DESC LIMIT %s
+    """, (pid, limit))
+    rows = cur.fetchall()
+    cur.close()
+    return [{"run_id": r[0], "strategy": r[1], "start_date": str(r[2]), "end_date": str(r[3]),
+             "cash_start": r[4], "status": r[5], "created_at": str(r[6]),
+             "sharpe": r[7], "max_drawdown_pct": r[8], "trades_count": r[9]} for r in rows]
@@ -0,0 +1,173 @@
+# runcache.py
+# Memoized /api/run results. A run is keyed by everything that decides its output:
+# symbols (in run order), start, end, starting cash, strategy name, resolved params and
+# the content hash of every symbol's parquet partitions in range (PriceStore.version),
+# so rewriting a price file changes the key and the old entry is never served again.
+# SCHEMA is part of every key: bump it whenever a change to the engine, strategies,
+# indicators, metrics or the result layout would change what a run returns, so results
+# computed by older code are never served (they age out like any other stale entry).
+#
+# Two tiers:
+#   - in-memory LRU (RUN_CACHE_SIZE entries, default 64)
+#   - zlib-compressed JSON in data/runs/<key>.json.z, bounded to RUN_CACHE_DISK_MB
+#     (default 256); the least recently read files are removed first
+#
+# Stale entries just stop being looked up and age out of both tiers.
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+SCHEMA = 1
+
+
+def _default(o):
+    # numpy scalars / timestamps that slip into a result
+    if hasattr(o, "item"):
+        return o.item()
+    return str(o)
+
+
+def key(symbols, start, end, cash_start, strategy: str, params: dict, versions: dict) -> str:
+    blob = json.dumps({
+        "schema": SCHEMA, "symbols": list(symbols), "start": str(start), "end": str(end), "cash": float(cash_start),
+        "strategy": strategy, "params": params, "versions": versions,
+    }, sort_keys=True, default=_default)
+    return hashlib.blake2b(blob.encode(), digest_size=20).hexdigest()
+
+
+def etag(res: dict) -> str | None:
+    """Validator for a cached result: same key and same stored run -> same payload."""
+    if not res or not res.get("cache_key"):
+        return None
+    return f"{res['cache_key'][:16]}-{res.get('run_id') or 0}"
+
+
+class RunCache:
+    def __init__(self, data_dir: str = "data", max_entries: int = 64, max_disk_mb: float = 256, persist: bool = True):
+        self.dir = os.path.join(data_dir, "runs")
+        self.max_entries = max_entries
+        self.max_disk_bytes = int(max_disk_mb * 2**20)
+        self.persist = persist
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        disk = self._disk_files()
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "entries": len(self._mem), "max_entries": self.max_entries,
+                "disk_entries": len(disk), "disk_mb": round(sum(size for _, _, size in disk) / 2**20, 2),
+                "max_disk_mb": round(self.max_disk_bytes / 2**20, 2)}
+
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._mem.clear()
+            self.hits = self.disk_hits = self.misses = 0
+        if disk:
+            for path, _, _ in self._disk_files():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _path(self, k: str) -> str:
+        return os.path.join(self.dir, f"{k}.json.z")
+
+    def _disk_files(self) -> list:
+        # (path, mtime, size), oldest first
+        try:
+            names = os.listdir(self.dir)
+        except OSError:
+            return []
+        out = []
+        for name in names:
+            if not name.endswith(".json.z"):
+                continue
+            path = os.path.join(self.dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            out.append((path, st.st_mtime, st.st_size))
+        return sorted(out, key=lambda f: f[1])
+
+    def _remember(self, k: str, res: dict):
+        with self._lock:
+            self._mem[k] = res
+            self._mem.move_to_end(k)
+            while len(self._mem) > self.max_entries:
+                self._mem.popitem(last=False)
+
+    def _read_disk(self, k: str):
+        path = self._path(k)
+        try:
+            with open(path, "rb") as f:
+                res = json.loads(zlib.decompress(f.read()))
+            os.utime(path)  # recently used, evicted last
+        except (OSError, ValueError, zlib.error):
+            return None
+        return res
+
+    def _write_disk(self, k: str, res: dict):
+        os.makedirs(self.dir, exist_ok=True)
+        data = zlib.compress(json.dumps(res, default=_default).encode(), 6)
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._path(k)
+        # write then rename so a concurrent reader never sees half a file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        files = self._disk_files()
+        total = sum(size for _, _, size in files)
+        for path, _, size in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def get(self, k: str) -> dict | None:
+        """The cached result for key k (a shallow copy, safe to add fields to), or None."""
+        with self._lock:
+            res = self._mem.get(k)
+            if res is not None:
+                self._mem.move_to_end(k)
+                self.hits += 1
+        if res is None and self.persist:
+            res = self._read_disk(k)
+            if res is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(k, res)
+        if res is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return dict(res)
+
+    def put(self, k: str, res: dict):
+        res = dict(res)
+        self._remember(k, res)
+        if self.persist:
+            try:
+                self._write_disk(k, res)
+            except OSError as e:
+                print(f"run cache: could not write {k}: {e}")
+
+
+RUNS = RunCache(
+    data_dir=os.environ.get("RUN_CACHE_DIR", "data"),
+    max_entries=int(os.environ.get("RUN_CACHE_SIZE", "64")),
+    max_disk_mb=float(os.environ.get("RUN_CACHE_DISK_MB", "256")),
+    persist=os.environ.get("RUN_CACHE_PERSIST", "1") != "0",
+)
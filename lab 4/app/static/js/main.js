@@ -43,6 +43,129 @@ async function loadPortfolios() {
   }
 }
 
+const STAGE_LABELS = {
+  queued: 'Waiting for a free worker',
+  fetching: 'Fetching prices',
+  signals: 'Generating signals',
+  simulation: 'Simulating trades',
+  kpis: 'Computing KPIs',
+  saving: 'Saving results',
+};
+
+// last result per run body, with the ETag the server sent for it (see runcache.py)
+function cachedRun(key) {
+  try { return JSON.parse(sessionStorage.getItem(`run:${key}`)); } catch { return null; }
+}
+
+function rememberRun(key, etag, data) {
+  try {
+    sessionStorage.setItem(`run:${key}`, JSON.stringify({ etag, data }));
+  } catch {
+    sessionStorage.removeItem(`run:${key}`);  // over quota: just don't keep it
+  }
+}
+
+function showStage(statusMsg, job) {
+  const label = STAGE_LABELS[job.stage] || job.stage;
+  statusMsg.textContent = job.total ? `${label} (${job.done}/${job.total})...` : `${label}...`;
+}
+
+// equity curve as an SVG polyline, redrawn as streamed points arrive
+function drawEquity(points) {
+  const svg = document.getElementById('equityChart');
+  if (!svg) return;
+  document.getElementById('equityCard').style.display = points.length ? 'block' : 'none';
+  const step = Math.max(1, Math.floor(points.length / 600));
+  const values = points.filter((_, i) => i % step === 0 || i === points.length - 1).map(p => p.value);
+  const lo = Math.min(...values), hi = Math.max(...values);
+  const coords = values.map((v, i) =>
+    `${(i / Math.max(1, values.length - 1) * 600).toFixed(1)},${(150 - (hi > lo ? (v - lo) / (hi - lo) : 0.5) * 140).toFixed(1)}`);
+  svg.innerHTML = `<polyline fill="none" stroke="#0d6efd" stroke-width="1.5" points="${coords.join(' ')}" />`;
+}
+
+// follows /api/jobs/<id>/events (server-sent events): per-symbol fetches, stage progress and
+// partial equity points while the run goes, then the result. Falls back to polling
+// without EventSource or when the stream can't be opened.
+function streamJob(jobId, statusMsg, cached) {
+  if (!window.EventSource) return waitForJob(jobId, statusMsg, cached);
+  window.currentJobId = jobId;
+  const cancelBtn = document.getElementById('cancelBtn');
+  if (cancelBtn) cancelBtn.style.display = 'inline-block';
+  const query = cached && cached.etag ? `?etag=${encodeURIComponent(cached.etag)}` : '';
+  const curve = [];
+
+  return new Promise((resolve, reject) => {
+    const es = new EventSource(`/api/jobs/${jobId}/events${query}`);
+    const finish = () => {
+      es.close();
+      window.currentJobId = null;
+      if (cancelBtn) cancelBtn.style.display = 'none';
+    };
+    es.addEventListener('fetched', e => {
+      const d = JSON.parse(e.data);
+      statusMsg.textContent = `Fetched ${d.symbol} (${d.done}/${d.total})...`;
+    });
+    es.addEventListener('progress', e => {
+      const d = JSON.parse(e.data);
+      if (d.stage !== 'fetching') showStage(statusMsg, d);
+    });
+    es.addEventListener('equity', e => {
+      curve.push(...JSON.parse(e.data));
+      drawEquity(curve);
+    });
+    es.addEventListener('done', e => {
+      const d = JSON.parse(e.data);
+      finish();
+      resolve(d.unchanged ? { data: cached.data, etag: cached.etag } : { data: d.result, etag: d.etag });
+    });
+    es.addEventListener('failed', e => {
+      finish();
+      reject(new Error(`Run failed: ${JSON.parse(e.data).error}`));
+    });
+    es.addEventListener('cancelled', () => {
+      finish();
+      reject(new Error('Backtest cancelled.'));
+    });
+    es.onerror = () => {
+      // the browser reconnects by itself unless the stream is gone for good
+      if (es.readyState !== EventSource.CLOSED) return;
+      finish();
+      waitForJob(jobId, statusMsg, cached).then(resolve, reject);
+    };
+  });
+}
+
+// polls /api/jobs/<id> until the backtest finishes, showing the current stage.
+// With a cached copy, the server answers 304 instead of resending an unchanged result.
+async function waitForJob(jobId, statusMsg, cached) {
+  window.currentJobId = jobId;
+  const cancelBtn = document.getElementById('cancelBtn');
+  if (cancelBtn) cancelBtn.style.display = 'inline-block';
+  const headers = cached && cached.etag ? { 'If-None-Match': cached.etag } : {};
+  try {
+    while (true) {
+      const res = await fetch(`/api/jobs/${jobId}`, { cache: 'no-store', headers });
+      if (res.status === 304) return { data: cached.data, etag: cached.etag };
+      const job = await res.json();
+      if (!res.ok) throw new Error(job.error || res.statusText);
+
+      if (job.status === 'done') return { data: job.result, etag: res.headers.get('ETag') };
+      if (job.status === 'error') throw new Error(`Run failed: ${job.error}`);
+      if (job.status === 'cancelled') throw new Error('Backtest cancelled.');
+
+      showStage(statusMsg, job);
+      await new Promise(r => setTimeout(r, 1000));
+    }
+  } finally {
+    window.currentJobId = null;
+    if (cancelBtn) cancelBtn.style.display = 'none';
+  }
+}
+
+async function cancelBacktest() {
+  if (window.currentJobId) await fetch(`/api/jobs/${window.currentJobId}`, { method: 'DELETE' });
+}
+
 async function runBacktest() {
   const sel = document.getElementById('portfolio');
   if (!sel || !sel.value) {
@@ -71,11 +194,12 @@ async function runBacktest() {
   saveBtn.style.display = 'none';
   downloadBtn.style.display = 'none';
   window.lastBacktestResult = null;
+  drawEquity([]);
   statusMsg.textContent = 'Fetching data and running backtest...';
   statusMsg.style.color = 'blue';
 
   try {
-    const res = await fetch('/api/run', {
+    const res = await fetch('/api/jobs', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(body)
@@ -87,11 +211,15 @@ async function runBacktest() {
       throw new Error(`Run failed: ${msg}`);
     }
 
-    const data = await res.json();
+    const job = await res.json();
+    const runKey = JSON.stringify(body);
+    const { data, etag } = await streamJob(job.job_id, statusMsg, cachedRun(runKey));
+    if (etag) rememberRun(runKey, etag, data);
     statusMsg.textContent = 'Backtest complete. You can now save or download.';
     statusMsg.style.color = 'green';
 
-    window.lastBacktestResult = { params: body, kpis: data.kpis, trades: data.trades };
+    window.lastBacktestResult = { run_id: data.run_id, params: body, kpis: data.kpis, trades: data.trades, equity: data.equity };
+    drawEquity(data.equity || []);
     saveBtn.style.display = 'inline-block';
     downloadBtn.style.display = 'inline-block';
 
@@ -152,7 +280,10 @@ async function saveSession() {
     const res = await fetch('/api/save_session', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify(window.lastBacktestResult)
+      // the run is already stored server-side, only its id has to go back
+      body: JSON.stringify(window.lastBacktestResult.run_id
+        ? { run_id: window.lastBacktestResult.run_id }
+        : window.lastBacktestResult)
     });
 
     if (!res.ok) {
@@ -221,6 +352,9 @@ document.addEventListener('DOMContentLoaded', () => {
   
   const runBtn = document.getElementById('runBtn');
   if (runBtn) runBtn.addEventListener('click', runBacktest);
+
+  const cancelBtn = document.getElementById('cancelBtn');
+  if (cancelBtn) cancelBtn.addEventListener('click', cancelBacktest);
   
   const saveBtn = document.getElementById('saveBtn');
   if (saveBtn) saveBtn.addEventListener('click', saveSession);
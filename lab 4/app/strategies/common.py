@@ -0,0 +1,53 @@
+# strategies/common.py
+# What a strategy module declares, and how its signals are produced from that:
+#
+#   PARAMS             parameter -> default; the default's type is the parameter's type
+#   MINIMUMS           parameter -> lowest accepted value (indicator lengths are at least 1)
+#   CONSTRAINTS        (a, b) pairs with params[a] < params[b] (sweeps skip other combos)
+#   OFF                parameter -> value that switches its feature off; constraints
+#                      involving a parameter at that value don't apply
+#   requires(params)   {column: (indicator, {params}[, output])}, the indicator columns signals() reads
+#   signals(df, params)
+#                      df has dt, close and those columns (minus any the history is too
+#                      short for); returns a frame with dt, signal and optionally rsi_14
+#
+# The engine evaluates the requirements of every strategy in a run together (see
+# indicators.evaluate), so indicators shared between strategies or parameter combos
+# are computed once per symbol.
+
+import indicators
+
+
+def resolve(defaults: dict, params: dict, minimums: dict | None = None) -> dict:
+    """
+    Declared parameters with defaults filled in, cast to the default's type. Raises
+    ValueError for a non-integral value of an int parameter or one below its minimum.
+    """
+    out = {}
+    for name, default in defaults.items():
+        value = params.get(name)
+        if value is None:
+            out[name] = default
+            continue
+        if isinstance(default, int) and float(value) != int(float(value)):
+            raise ValueError(f"{name} must be an integer, got {value!r}")
+        out[name] = type(default)(float(value)) if isinstance(default, int) else type(default)(value)
+        low = (minimums or {}).get(name)
+        if low is not None and out[name] < low:
+            raise ValueError(f"{name} must be at least {low}, got {value!r}")
+    return out
+
+
+def specs(module, params: dict) -> list:
+    """The (indicator, params) nodes a strategy needs for these params."""
+    if not hasattr(module, "requires"):
+        return []
+    return [spec[:2] for spec in module.requires(resolve(module.PARAMS, params, getattr(module, "MINIMUMS", None))).values()]
+
+
+def generate(module, df, params: dict, values: dict | None = None):
+    """module's signals for df; values is a shared indicators.evaluate() result."""
+    if not hasattr(module, "requires"):
+        return module.generate_signals(df, params=params)
+    params = resolve(module.PARAMS, params, getattr(module, "MINIMUMS", None))
+    return module.signals(indicators.attach(df, module.requires(params), values), params)
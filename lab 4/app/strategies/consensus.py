@@ -1,24 +1,41 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import indicators
+import kernels
+from strategies import common
 
-def generate_signals(df, params: dict):
-    """
-    Generates trading signals for the Consensus Scoring
-    """
+PARAMS = {"macd_fast": 12, "macd_slow": 26, "macd_signal": 9, "rsi_length": 14,
+          "sma_length": 20, "trend_length": 200, "buy_score": 3, "sell_score": -3}
+MINIMUMS = {"macd_fast": 1, "macd_slow": 1, "macd_signal": 1, "rsi_length": 1, "sma_length": 1, "trend_length": 0}
+OFF = {"trend_length": 0}  # no trend filter
+CONSTRAINTS = [("macd_fast", "macd_slow"), ("sma_length", "trend_length"), ("sell_score", "buy_score")]
 
-    df.ta.macd(fast=12, slow=26, signal=9, append=True)
-    df.ta.rsi(length=14, append=True)
-    df.ta.sma(length=20, append=True)
-    df.ta.sma(length=200, append=True)
 
+def requires(params: dict) -> dict:
+    macd = {"fast": params["macd_fast"], "slow": params["macd_slow"], "signal": params["macd_signal"]}
+    columns = {
+        "macd_line": ("macd", macd, "MACD"),
+        "signal_line": ("macd", macd, "MACDs"),
+        "rsi_14": ("rsi", {"length": params["rsi_length"]}),
+        "sma_20": ("sma", {"length": params["sma_length"]}),
+    }
+    # trend_length 0 switches the trend filter off
+    if params["trend_length"] > 0:
+        columns["sma_200"] = ("sma", {"length": params["trend_length"]})
+    return columns
 
-    df.rename(columns={
-        'MACD_12_26_9': 'macd_line',
-        'MACDs_12_26_9': 'signal_line',
-        'RSI_14': 'rsi_14',
-        'SMA_20': 'sma_20'
 
-    }, inplace=True)
+def signals(df, params: dict):
+    """
+    Generates trading signals for the Consensus Scoring
+    Indicator lengths and score thresholds can be overridden through params
+    (macd_fast, macd_slow, macd_signal, rsi_length, sma_length, trend_length, buy_score, sell_score).
+    """
+    # indicators the history is too short for are missing; as NaN they drop every row
+    # (sma_200 is the exception, without it the trend filter is off)
+    for column in ('macd_line', 'signal_line', 'rsi_14', 'sma_20'):
+        if column not in df.columns:
+            df[column] = np.nan
 
     df['score'] = 0
     df.loc[df['macd_line'] > df['signal_line'], 'score'] += 1
@@ -31,20 +48,86 @@ def generate_signals(df, params: dict):
     
 
     df['signal'] = 0
-    sell_condition = (df['score'] == -3)
+    sell_condition = (df['score'] <= params["sell_score"])
 
 
-    if 'SMA_200' in df.columns:
-        df.dropna(subset=['SMA_200'], inplace=True)
-        df.rename(columns={'SMA_200': 'sma_200'}, inplace=True)
-        buy_condition = (df['score'] == 3) & (df['close'] > df['sma_200'])
+    # the trend filter only exists once there is enough history for it
+    if 'sma_200' in df.columns:
+        df.dropna(subset=['sma_200'], inplace=True)
+        buy_condition = (df['score'] >= params["buy_score"]) & (df['close'] > df['sma_200'])
     else:
        
         df.dropna(inplace=True) 
-        buy_condition = (df['score'] == 3)
+        buy_condition = (df['score'] >= params["buy_score"])
 
     df.loc[buy_condition, 'signal'] = 1
     df.loc[sell_condition, 'signal'] = -1
     
     
-    return df[['dt', 'signal', 'close', 'rsi_14','score']]
\ No newline at end of file
+    return df[['dt', 'signal', 'close', 'rsi_14','score']]
+
+
+def generate_signals(df, params: dict):
+    params = common.resolve(PARAMS, params, MINIMUMS)
+    return signals(indicators.attach(df, requires(params)), params)
+
+
+def _compare(a, b) -> int:
+    # +1 / -1 / 0 like the score updates above (NaN compares as neither)
+    return int(a > b) - int(a < b)
+
+
+class LiveState:
+    """
+    Bar-by-bar generate_signals for one symbol (paper trading): update(close) returns
+    the (signal, rsi) that generate_signals gives for that row of the whole history.
+    With the trend filter on, a history of at least trend_length bars loses the rows
+    before the first sma_200 value (dropna), so nothing is signalled before then.
+    A shorter history keeps those rows and trades without the filter, which a
+    bar-by-bar state can't know in advance: parity with a backtest over the same
+    bars holds once the symbol has parity_bars (= trend_length) bars.
+    """
+    def __init__(self, params: dict):
+        params = common.resolve(PARAMS, params, MINIMUMS)
+        macd = {"fast": params["macd_fast"], "slow": params["macd_slow"], "signal": params["macd_signal"]}
+        self.buy_score = params["buy_score"]
+        self.sell_score = params["sell_score"]
+
+        self.macd = kernels.StreamMACD(**macd)
+        self.rsi = kernels.StreamRSI(params["rsi_length"])
+        self.sma = kernels.StreamSMA(params["sma_length"])
+        # no trend filter when trend_length is 0 (as in requires())
+        trend_length = params["trend_length"]
+        self.trend = kernels.StreamSMA(trend_length) if trend_length > 0 else None
+        self.macd_rows = indicators.min_rows("macd", **macd)
+        self.rsi_rows = indicators.min_rows("rsi", length=params["rsi_length"])
+        self.trend_rows = indicators.min_rows("sma", length=trend_length) if trend_length > 0 else None
+        self.parity_bars = self.trend_rows or 0
+        self.n = 0
+
+    def update(self, close: float):
+        self.n += 1
+        macd_line, _, signal_line = self.macd.update(close)
+        rsi = self.rsi.update(close)
+        sma = self.sma.update(close)
+        trend = self.trend.update(close) if self.trend is not None else np.nan
+        if self.trend is not None:
+            if self.n < self.trend_rows:
+                return 0, np.nan  # row dropped by dropna on sma_200
+        elif self.n < self.macd_rows:
+            return 0, np.nan
+        if self.n < self.rsi_rows:
+            rsi = np.nan
+
+        score = _compare(macd_line, signal_line) + _compare(rsi, 50) + _compare(close, sma)
+
+        if self.trend is not None:
+            buy = score >= self.buy_score and close > trend
+        elif np.isnan([macd_line, signal_line, rsi, sma]).any():
+            return 0, np.nan  # row dropped by dropna
+        else:
+            buy = score >= self.buy_score
+
+        if score <= self.sell_score:
+            return -1, rsi
+        return (1 if buy else 0), rsi
@@ -1,30 +1,77 @@
+import numpy as np
 import pandas as pd
-import pandas_ta as ta
+import indicators
+import kernels
+from strategies import common
 
-def generate_signals(df, params: dict):
+PARAMS = {"fast": 10, "slow": 30, "rsi_length": 14, "rsi_buy": 45.0, "rsi_sell": 65.0}
+MINIMUMS = {"fast": 1, "slow": 1, "rsi_length": 1}
+CONSTRAINTS = [("fast", "slow"), ("rsi_buy", "rsi_sell")]
+
+
+def requires(params: dict) -> dict:
+    return {
+        "ema_fast": ("ema", {"length": params["fast"]}),
+        "ema_slow": ("ema", {"length": params["slow"]}),
+        # the engine sizes buys off the rsi_14 column, whatever length it was built with
+        "rsi_14": ("rsi", {"length": params["rsi_length"]}),
+    }
+
+
+def signals(df, params: dict):
     """
     Trading strategy based on RSI and a fast/slow EMA crossover.
     - Buy when RSI is below 45 and the fast EMA crosses above the slow EMA.
     - Sell when RSI is above 65.
+    Lengths and thresholds can be overridden through params
+    (fast, slow, rsi_length, rsi_buy, rsi_sell).
     """
-    
-    df.ta.ema(length=10, append=True) # Fast EMA
-    df.ta.ema(length=30, append=True) # Slow EMA
-    df.ta.rsi(length=14, append=True)
+    # indicators the history is too short for are missing; as NaN they drop every row
+    for column in ('ema_fast', 'ema_slow', 'rsi_14'):
+        if column not in df.columns:
+            df[column] = np.nan
     df.dropna(inplace=True)
 
- 
-    df.rename(columns={
-        'EMA_10': 'ema_10',
-        'EMA_30': 'ema_30',
-        'RSI_14': 'rsi_14'
-    }, inplace=True)
-
     df['signal'] = 0
-    buy_condition = (df['rsi_14'] < 45) & (df['ema_10'] > df['ema_30'])
-    sell_condition = (df['rsi_14'] > 65)
+    buy_condition = (df['rsi_14'] < params["rsi_buy"]) & (df['ema_fast'] > df['ema_slow'])
+    sell_condition = (df['rsi_14'] > params["rsi_sell"])
 
     df.loc[buy_condition, 'signal'] = 1  # Buy
     df.loc[sell_condition, 'signal'] = -1 # Sell
 
-    return df[['dt', 'signal', 'close', 'rsi_14']]
\ No newline at end of file
+    return df[['dt', 'signal', 'close', 'rsi_14']]
+
+
+def generate_signals(df, params: dict):
+    params = common.resolve(PARAMS, params, MINIMUMS)
+    return signals(indicators.attach(df, requires(params)), params)
+
+
+class LiveState:
+    """
+    Bar-by-bar generate_signals for one symbol (paper trading): update(close) returns
+    the (signal, rsi) that generate_signals gives on the last row of the same history.
+    """
+    def __init__(self, params: dict):
+        params = common.resolve(PARAMS, params, MINIMUMS)
+        self.rsi_buy = params["rsi_buy"]
+        self.rsi_sell = params["rsi_sell"]
+
+        self.ema_fast = kernels.stream_ema(params["fast"])
+        self.ema_slow = kernels.stream_ema(params["slow"])
+        self.rsi = kernels.StreamRSI(params["rsi_length"])
+        self.rsi_rows = indicators.min_rows("rsi", length=params["rsi_length"])
+        self.n = 0
+
+    def update(self, close: float):
+        self.n += 1
+        ema_fast, ema_slow, rsi = self.ema_fast.update(close), self.ema_slow.update(close), self.rsi.update(close)
+        if self.n < self.rsi_rows or np.isnan([ema_fast, ema_slow, rsi]).any():
+            return 0, np.nan  # row dropped by dropna
+
+        signal = 0
+        if rsi < self.rsi_buy and ema_fast > ema_slow:
+            signal = 1
+        if rsi > self.rsi_sell:
+            signal = -1
+        return signal, rsi
@@ -1,18 +1,26 @@
+import numpy as np
 import pandas as pd
+import indicators
+import kernels
+from strategies import common
 
-def generate_signals(data: pd.DataFrame, params: dict):
+PARAMS = {"short": 10, "long": 30}
+MINIMUMS = {"short": 1, "long": 1}
+CONSTRAINTS = [("short", "long")]
 
-    short_window = int(params.get("short", 10))
-    long_window = int(params.get("long", 30))
 
-    signals = data.copy()
+def requires(params: dict) -> dict:
+    return {
+        "sma_short": ("sma", {"length": params["short"], "min_periods": 1}),
+        "sma_long": ("sma", {"length": params["long"], "min_periods": 1}),
+    }
 
-    signals.fillna(method='ffill', inplace=True)
 
-    # --- 2. Indicator Calculation ---
-    signals['sma_short'] = signals['close'].rolling(window=short_window, min_periods=1).mean()
-    signals['sma_long'] = signals['close'].rolling(window=long_window, min_periods=1).mean()
+def signals(data: pd.DataFrame, params: dict):
+
+    signals = data.copy()
 
+    signals.ffill(inplace=True)
 
     signals['position'] = 0
     signals.loc[signals['sma_short'] > signals['sma_long'], 'position'] = 1
@@ -20,4 +28,27 @@ def generate_signals(data: pd.DataFrame, params: dict):
   
     signals['signal'] = signals['position'].diff()
 
-    return signals
\ No newline at end of file
+    return signals
+
+
+def generate_signals(data: pd.DataFrame, params: dict):
+    params = common.resolve(PARAMS, params, MINIMUMS)
+    return signals(indicators.attach(data.copy(), requires(params)), params)
+
+
+class LiveState:
+    """
+    Bar-by-bar generate_signals for one symbol (paper trading): update(close) returns
+    the (signal, rsi) that generate_signals gives on the last row of the same history.
+    """
+    def __init__(self, params: dict):
+        params = common.resolve(PARAMS, params, MINIMUMS)
+        self.sma_short = kernels.StreamSMA(params["short"], min_periods=1)
+        self.sma_long = kernels.StreamSMA(params["long"], min_periods=1)
+        self.position = None
+
+    def update(self, close: float):
+        position = 1 if self.sma_short.update(close) > self.sma_long.update(close) else 0
+        signal = 0 if self.position is None else position - self.position
+        self.position = position
+        return signal, np.nan
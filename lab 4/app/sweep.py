@@ -0,0 +1,177 @@
+# sweep.py
+# Parameter sweep / grid search for the backtester.
+# The price matrix is loaded once and handed to each pool worker at start-up,
+# so jobs only ship their parameter dict instead of re-reading parquet.
+#
+#   python sweep.py --symbols AAPL MSFT CVX --start 2024-01-01 --end 2025-01-01 \
+#       --strategy sma --grid short=5:20:5 long=30,50,100 --workers 4
+#   python sweep.py --symbols AAPL MSFT --start 2025-01-01 --end 2025-03-01 \
+#       --interval 1m --bars 5min --strategy ema_rsi --grid fast=5,10 slow=20,40
+
+import argparse
+import itertools
+import math
+import os
+
+import engine
+import pools
+import registry
+from backtest import INTERVALS, bar_loaders, fetch_and_store_prices
+
+STRATEGIES = {name: s.module for name, s in registry.STRATEGIES.items()}
+
+MAX_COMBOS = 500
+
+_PRICES = None  # per-worker copy of the price matrix
+
+
+def _number(v):
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+
+def _span(spec: str) -> tuple:
+    # (start, step, count) of a "start:stop[:step]" range, stop inclusive
+    parts = [float(p) for p in spec.split(":")]
+    start, stop = parts[0], parts[1]
+    step = parts[2] if len(parts) > 2 else 1
+    if not all(math.isfinite(p) for p in parts) or step <= 0:
+        raise ValueError(f"bad range '{spec}'")
+    return start, step, max(0, math.floor((stop - start) / step + 1e-9) + 1)
+
+
+def _range_spec(spec):
+    if isinstance(spec, dict):
+        if "start" not in spec or "stop" not in spec:
+            raise ValueError(f"range {spec} needs start and stop")
+        return f"{spec['start']}:{spec['stop']}:{spec.get('step', 1)}"
+    return spec
+
+
+def axis_size(spec) -> int:
+    """Number of values parse_range(spec) yields, without building them."""
+    spec = _range_spec(spec)
+    if isinstance(spec, (list, tuple)):
+        return len(spec)
+    if isinstance(spec, (int, float)):
+        return 1
+    spec = str(spec).strip()
+    if ":" in spec:
+        return _span(spec)[2]
+    return sum(1 for p in spec.split(",") if p.strip())
+
+
+def parse_range(spec) -> list:
+    """
+    A grid axis can be a list, a single number, "a,b,c", "start:stop[:step]" (stop inclusive)
+    or {"start":..,"stop":..,"step":..}.
+    """
+    spec = _range_spec(spec)
+    if isinstance(spec, (list, tuple)):
+        return [_number(v) for v in spec]
+    if isinstance(spec, (int, float)):
+        return [_number(spec)]
+
+    spec = str(spec).strip()
+    if ":" in spec:
+        start, step, count = _span(spec)
+        return [_number(round(start + i * step, 10)) for i in range(count)]
+    return [_number(p) for p in spec.split(",") if p.strip()]
+
+
+def is_valid(strategy_name: str, params: dict) -> bool:
+    # combinations that make no sense for a strategy (fast window >= slow window, etc.)
+    # are ruled out by its declared CONSTRAINTS
+    return registry.get(strategy_name).is_valid(params)
+
+
+def expand_grid(strategy_name: str, grid: dict) -> list[dict]:
+    """
+    The valid combinations of the grid. The size of the full cartesian product is
+    worked out from the axis specs first, so an oversized grid is rejected before any
+    value list is built.
+    """
+    keys = sorted(grid)
+    sizes = [axis_size(grid[k]) for k in keys]
+    for k, n in zip(keys, sizes):
+        if n > MAX_COMBOS:  # even when another axis is empty
+            raise ValueError(f"'{k}' has {n} values, limit is {MAX_COMBOS}")
+    if math.prod(sizes) > MAX_COMBOS:
+        raise ValueError(f"{math.prod(sizes)} combinations requested, limit is {MAX_COMBOS}")
+    axes = [parse_range(grid[k]) for k in keys]
+    combos = (dict(zip(keys, values)) for values in itertools.product(*axes))
+    valid = [p for p in combos if is_valid(strategy_name, p)]
+    for p in valid:
+        registry.get(strategy_name).resolve(p)  # out-of-range values (a length of 0, ...) raise here
+    return valid
+
+
+def _init_worker(prices_df):
+    global _PRICES
+    _PRICES = prices_df
+
+
+def _run_combo(job):
+    # the sweep is already parallel over combos, so signals stay serial inside a worker
+    strategy_name, params, cash_start = job
+    res = engine.backtest_prices(_PRICES, cash_start, STRATEGIES[strategy_name], params, workers=1)
+    return {"params": params, **res["kpis"], "trades_count": len(res["trades"])}
+
+
+def run_sweep(prices_df, strategy_name: str, grid: dict, cash_start: float,
+              rank_by: str = "sharpe_ratio", workers: int | None = None, top: int | None = None) -> list[dict]:
+    if strategy_name not in STRATEGIES:
+        raise ValueError(f"unknown strategy '{strategy_name}'")
+
+    engine.check_rank_by(rank_by)
+    combos = expand_grid(strategy_name, grid)
+
+    jobs = [(strategy_name, p, cash_start) for p in combos]
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(jobs)) if jobs else 1
+
+    if workers <= 1:
+        _init_worker(prices_df)
+        rows = [_run_combo(j) for j in jobs]
+    else:
+        chunk = max(1, len(jobs) // (workers * 4))
+        with pools.process_pool(workers, _init_worker, (prices_df,)) as pool:
+            rows = list(pool.map(_run_combo, jobs, chunksize=chunk))
+
+    rows.sort(key=lambda r: engine.rank_key(r, rank_by), reverse=True)
+    for rank, r in enumerate(rows, start=1):
+        r["rank"] = rank
+    return rows[:top] if top else rows
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Grid search over strategy parameters")
+    ap.add_argument("--symbols", nargs="+", required=True)
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", required=True)
+    ap.add_argument("--cash", type=float, default=10000)
+    ap.add_argument("--strategy", default="sma", choices=sorted(STRATEGIES))
+    ap.add_argument("--grid", nargs="+", default=[], help="name=spec, e.g. short=5:20:5 long=30,50")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--rank-by", default="sharpe_ratio", choices=engine.RANK_KPIS)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--interval", default="1d", choices=sorted(INTERVALS), help="stored bar interval")
+    ap.add_argument("--bars", default=None, help="resample to this coarser frequency on load, e.g. 5min, 1h")
+    ap.add_argument("--fetch", action="store_true", help="download prices from yfinance first")
+    args = ap.parse_args()
+
+    grid = dict(g.split("=", 1) for g in args.grid)
+    symbols = [s.upper() for s in args.symbols]
+    if args.fetch:
+        for sym in symbols:
+            fetch_and_store_prices(sym, args.start, args.end, args.interval)
+
+    price_loader, matrix_loader = bar_loaders(args.interval, args.bars)
+    prices_df = engine.build_price_matrix(symbols, args.start, args.end, price_loader, matrix_loader)
+    if prices_df.empty:
+        raise SystemExit("No price data on disk for these symbols (use --fetch).")
+
+    rows = run_sweep(prices_df, args.strategy, grid, args.cash, args.rank_by, args.workers, args.top)
+    for r in rows:
+        print(f"{r['rank']:>3}  {r['params']}  {args.rank_by}={r.get(args.rank_by)}  "
+              f"return={r['return_pct']}%  mdd={r['max_drawdown_pct']}%  trades={r['trades_count']}")
@@ -0,0 +1,206 @@
+# tests/test_engine_parity.py
+# The columnar engine against the per-row loop it replaced. baseline_backtest below is
+# the original run_backtest loop (pandas per date, iterrows over the day's signals);
+# the engine must produce the same trades, equity curve, KPIs and final positions.
+#
+#   cd "lab 4/app" && python -m pytest -q tests
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import indicators
+from metrics import calculate_kpis
+from strategies import consensus, ema_rsi, sma
+
+indicators.STORE.persist = False  # keep indicator results out of the working tree's data/
+
+START, END, CASH = "2018-01-01", "2020-12-31", 100_000.0
+KPI_KEYS = {"return_pct": "total_return_pct", "cagr_pct": "cagr_pct", "sharpe_ratio": "sharpe_ratio",
+            "sortino_ratio": "sortino_ratio", "max_drawdown_pct": "max_drawdown_pct", "calmar_ratio": "calmar_ratio",
+            "profit_factor": "profit_factor", "win_rate_pct": "win_rate_pct",
+            "avg_win_loss_ratio": "avg_win_loss_ratio", "avg_holding_days": "avg_holding_days"}
+
+
+def make_prices(n_symbols: int = 10, seed: int = 3) -> dict:
+    """
+    symbol -> (dt, close) frames on business days: every third symbol lists late,
+    S0001 has missing bars mid-series, S0002 is trimmed early (delisted) and NODATA
+    has no bars at all.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(START, END)
+    data = {}
+    for k in range(n_symbols):
+        close = 40 * np.exp(np.cumsum(rng.normal(0.0004, 0.02, len(days))))
+        df = pd.DataFrame({"dt": days, "close": close})
+        if k % 3 == 0 and k:
+            df = df.iloc[rng.integers(100, len(days) // 2):]
+        if k == 1:
+            df = df.drop(df.index[rng.choice(len(df), 60, replace=False)])
+        if k == 2:
+            df = df.iloc[:len(days) - 150]
+        data[f"S{k:04d}"] = df.reset_index(drop=True)
+    data["NODATA"] = pd.DataFrame(columns=["dt", "close"])
+    return data
+
+
+def loader_for(data: dict):
+    def price_loader(symbol, start, end):
+        df = data.get(symbol, pd.DataFrame())
+        if df.empty:
+            return df
+        return df.loc[(df["dt"] >= pd.to_datetime(start)) & (df["dt"] <= pd.to_datetime(end))]
+    return price_loader
+
+
+def baseline_loop(prices_df: pd.DataFrame, signals_df: pd.DataFrame, cash_start: float):
+    # The pre-columnar loop. Changes from the original: the book is marked over the
+    # columns that have data (a requested symbol without bars raised KeyError), and a
+    # signal row without rsi_14 sizes with the neutral multiplier.
+    symbols = list(prices_df.columns)
+    cash = cash_start
+    positions = {symbol: 0 for symbol in symbols}
+    trades = []
+    daily_portfolio_value = []
+
+    for date in prices_df.index.unique().sort_values():
+        current_market_value = sum(positions[symbol] * prices_df.loc[date, symbol] for symbol in symbols if pd.notna(prices_df.loc[date, symbol]))
+        total_value = cash + current_market_value
+        daily_portfolio_value.append((date, total_value))
+
+        if date in signals_df.index:
+            signals_today = signals_df.loc[date]
+            if isinstance(signals_today, pd.Series):
+                signals_today = signals_today.to_frame().T
+
+            for _, signal_row in signals_today.iterrows():
+                symbol = signal_row["symbol"]
+                signal = signal_row["signal"]
+                current_price = prices_df.loc[date, symbol]
+
+                if pd.isna(current_price): continue
+
+                if signal == -1 and positions.get(symbol, 0) > 0:
+                    shares_to_sell = positions[symbol]
+                    cash += shares_to_sell * current_price
+                    positions[symbol] = 0
+                    trades.append({"date": date.strftime("%Y-%m-%d"), "symbol": symbol, "side": "SELL", "qty": shares_to_sell, "price": current_price})
+
+                elif signal == 1:
+                    base_investment = total_value * 0.10
+                    current_rsi = signal_row.get("rsi_14", np.nan)
+                    conviction_multiplier = 1.0
+                    if current_rsi > 50:
+                        conviction_multiplier += min((current_rsi - 50) / 20, 1.0)
+
+                    investment_amount = base_investment * conviction_multiplier
+                    if cash >= investment_amount:
+                        shares_to_buy = int(investment_amount / current_price)
+                        if shares_to_buy > 0:
+                            cash -= shares_to_buy * current_price
+                            positions[symbol] += shares_to_buy
+                            trades.append({"date": date.strftime("%Y-%m-%d"), "symbol": symbol, "side": "BUY", "qty": shares_to_buy, "price": current_price})
+
+    return trades, daily_portfolio_value, positions
+
+
+def baseline_backtest(symbols, start, end, cash_start, price_loader, strategy_logic, strategy_params):
+    # data consolidation and per-symbol signal generation as in the original run_backtest
+    prices_df = pd.DataFrame(index=pd.date_range(start=start, end=end))
+    for symbol in symbols:
+        df = price_loader(symbol, start, end)
+        if not df.empty:
+            temp_df = pd.DataFrame(index=df["dt"])
+            temp_df[symbol] = df["close"].values
+            prices_df = prices_df.join(temp_df)
+    prices_df.dropna(how="all", inplace=True)
+    prices_df.ffill(inplace=True)
+
+    all_signals = []
+    for symbol in prices_df.columns:
+        symbol_data = prices_df[[symbol]].dropna().rename(columns={symbol: "close"}).reset_index()
+        symbol_signals = strategy_logic.generate_signals(symbol_data.rename(columns={"index": "dt"}), params=strategy_params).copy()
+        symbol_signals["symbol"] = symbol
+        all_signals.append(symbol_signals.set_index("dt"))
+    return baseline_loop(prices_df, pd.concat(all_signals), cash_start)
+
+
+def assert_same(res: dict, trades, daily_portfolio_value, positions, cash_start):
+    assert [dict(t, price=float(t["price"])) for t in trades] == res["trades"]
+    assert [{"date": d.strftime("%Y-%m-%d"), "value": round(float(v), 2)} for d, v in daily_portfolio_value] == res["equity"]
+
+    kpis = calculate_kpis(daily_portfolio_value, cash_start, trades)
+    assert res["kpis"]["portfolio_value"] == round(daily_portfolio_value[-1][1], 2)
+    for key, ref_key in KPI_KEYS.items():
+        assert res["kpis"][key] == kpis[ref_key], key
+
+    assert {p["symbol"]: p["qty"] for p in res["positions"]} == {s: q for s, q in positions.items() if q > 0}
+
+
+@pytest.mark.parametrize("strategy, params", [(consensus, {}), (ema_rsi, {}), (sma, {"short": 5, "long": 20})],
+                         ids=["consensus", "ema_rsi", "sma"])
+def test_run_backtest_matches_baseline(strategy, params):
+    data = make_prices()
+    loader = loader_for(data)
+    res = engine.run_backtest(list(data), START, END, CASH, loader, strategy, params, workers=1)
+    assert res["trades"], "fixture should trade"
+    assert_same(res, *baseline_backtest(list(data), START, END, CASH, loader, strategy, params), CASH)
+
+
+def test_backtest_signals_matches_baseline_loop():
+    # random signals (dense enough to hit the cash limit) on a matrix with late-listed,
+    # delisted and all-NaN columns
+    rng = np.random.default_rng(11)
+    dates = pd.bdate_range(START, periods=400)
+    prices = 30 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), 6)), axis=0))
+    prices[:150, 1] = np.nan
+    prices[300:, 2] = np.nan
+    prices[:, 3] = np.nan
+    prices_df = pd.DataFrame(prices, index=dates, columns=[f"S{k}" for k in range(6)])
+    signals = rng.choice(np.array([0, 0, 0, 1, -1], dtype=np.int8), size=prices.shape)
+    rsi = rng.uniform(20, 80, prices.shape)
+
+    rows = [(dates[i], prices_df.columns[j], signals[i, j], rsi[i, j]) for i, j in zip(*np.nonzero(signals))]
+    signals_df = pd.DataFrame(rows, columns=["dt", "symbol", "signal", "rsi_14"]).set_index("dt")
+
+    res = engine.backtest_signals(prices_df, signals, rsi, CASH)
+    assert len(res["trades"]) > 50
+    assert_same(res, *baseline_loop(prices_df, signals_df, CASH), CASH)
+
+
+def test_simulate_holdings_follow_fills():
+    rng = np.random.default_rng(5)
+    prices = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, (250, 4)), axis=0))
+    signals = rng.choice(np.array([0, 0, 1, -1], dtype=np.int8), size=prices.shape)
+    fills, holdings, equity = engine.simulate(prices, signals, np.full(prices.shape, 50.0), CASH)
+
+    expected = np.zeros(prices.shape, dtype=np.int64)
+    for i, j, side, qty in fills:
+        expected[i:, j] += qty if side == "BUY" else -qty
+    assert np.array_equal(holdings, expected)
+    assert (holdings >= 0).all()
+    assert equity[0] == CASH
+
+
+def test_compact_prices_report_stored_values():
+    # a float32 matrix (marketdata.COMPACT_MIN_CELLS) still reports cent prices as entered
+    rng = np.random.default_rng(8)
+    dates = pd.bdate_range(START, periods=200)
+    prices = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.02, (len(dates), 3)), axis=0)), 2)
+    prices_df = pd.DataFrame(prices, index=dates, columns=["A", "B", "C"]).astype(np.float32)
+    signals = rng.choice(np.array([0, 0, 1, -1], dtype=np.int8), size=prices.shape)
+
+    res = engine.backtest_signals(prices_df, signals, np.full(prices.shape, 50.0), CASH)
+    assert res["trades"]
+    col = {s: j for j, s in enumerate(prices_df.columns)}
+    for t in res["trades"]:
+        assert t["price"] == prices[dates.get_loc(pd.Timestamp(t["date"])), col[t["symbol"]]]
+    for p in res["positions"]:
+        assert p["last"] == prices[-1, col[p["symbol"]]]
@@ -0,0 +1,85 @@
+# tests/test_kernels.py
+# The NumPy indicator kernels on short series worked out by hand, the streaming versions
+# against the batch ones, and pandas_ta itself when it is installed (requirements-dev.txt).
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import kernels
+
+nan = np.nan
+X = [2.0, 4.0, 6.0, 8.0, 12.0]
+
+
+@pytest.mark.parametrize("fn, expected", [
+    (lambda: kernels.sma(X, 3), [nan, nan, 4, 6, 26 / 3]),
+    (lambda: kernels.sma(X, 3, min_periods=1), [2, 3, 4, 6, 26 / 3]),
+    (lambda: kernels.sma(X, 1), X),
+    # seeded with mean(2, 4, 6) = 4, then alpha = 1/2
+    (lambda: kernels.ema(X, 3), [nan, nan, 4, 6, 9]),
+    # alpha = 2/3 after the seed mean(2, 4) = 3
+    (lambda: kernels.ema(X, 2), [nan, 3, 5, 7, 31 / 3]),
+    # Wilder smoothing from the first value, alpha = 1/2
+    (lambda: kernels.rma(X, 2), [2, 3, 4.5, 6.25, 9.125]),
+    # gains 1, 0, 1, 1 and losses 0, 1, 0, 0 smoothed with alpha = 1/2
+    (lambda: kernels.rsi([1.0, 2.0, 1.0, 2.0, 3.0], 2), [nan, 100, 50, 75, 87.5]),
+], ids=["sma", "sma_min_periods", "sma_1", "ema_3", "ema_2", "rma", "rsi"])
+def test_golden_values(fn, expected):
+    np.testing.assert_allclose(fn(), expected, rtol=1e-12, equal_nan=True)
+
+
+def test_macd_golden_values():
+    # ema(2) - ema(3) = 1, 1, 4/3; the signal line (ema 2) starts at mean(1, 1)
+    line, hist, sig = kernels.macd(X, 2, 3, 2)
+    np.testing.assert_allclose(line, [nan, nan, 1, 1, 4 / 3], rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(sig, [nan, nan, nan, 1, 11 / 9], rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(hist, [nan, nan, nan, 0, 1 / 9], rtol=1e-12, atol=1e-15, equal_nan=True)
+
+
+def test_columns_start_at_their_own_first_value():
+    m = np.column_stack([X, [nan, nan, 2.0, 4.0, 6.0]])
+    np.testing.assert_allclose(kernels.sma(m, 2)[:, 1], [nan, nan, nan, 3, 5], equal_nan=True)
+    np.testing.assert_allclose(kernels.ema(m, 2)[:, 1], [nan, nan, nan, 3, 5], equal_nan=True)
+    np.testing.assert_allclose(kernels.rma(m, 2)[:, 0], kernels.rma(X, 2))
+
+
+def test_streaming_matches_batch():
+    x = 100 * np.exp(np.cumsum(np.random.default_rng(4).normal(0, 0.02, 300)))
+    x[:7] = nan
+    for stream, batch in [(kernels.StreamSMA(20), kernels.sma(x, 20)),
+                          (kernels.stream_ema(10), kernels.ema(x, 10)),
+                          (kernels.StreamRSI(14), kernels.rsi(x, 14))]:
+        np.testing.assert_allclose([stream.update(v) for v in x], batch, rtol=1e-9, equal_nan=True)
+    macd = kernels.StreamMACD(12, 26, 9)
+    streamed = np.array([macd.update(v) for v in x])
+    for k, batch in enumerate(kernels.macd(x, 12, 26, 9)):
+        np.testing.assert_allclose(streamed[:, k], batch, rtol=1e-9, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("call", [
+    lambda: kernels.sma(X, 0), lambda: kernels.ema(X, -1), lambda: kernels.rma(X, 0), lambda: kernels.rsi(X, 2.5),
+    lambda: kernels.macd(X, 0, 26, 9), lambda: kernels.macd(X, 12, 26, 0), lambda: kernels.StreamSMA(0),
+    lambda: kernels.stream_ema(0), lambda: kernels.StreamRSI(0), lambda: kernels.StreamMACD(12, 26, None),
+])
+def test_lengths_below_one_are_rejected(call):
+    with pytest.raises(ValueError, match="must be an integer >= 1"):
+        call()
+
+
+def test_matches_pandas_ta():
+    ta = pytest.importorskip("pandas_ta")
+    s = pd.Series(100 * np.exp(np.cumsum(np.random.default_rng(9).normal(0, 0.02, 500))))
+    x = s.to_numpy()
+    np.testing.assert_allclose(kernels.sma(x, 20), ta.sma(s, length=20), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(kernels.ema(x, 30), ta.ema(s, length=30), rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(kernels.rsi(x, 14), ta.rsi(s, length=14), rtol=1e-9, equal_nan=True)
+    line, hist, sig = kernels.macd(x, 12, 26, 9)
+    ref = ta.macd(s, 12, 26, 9)
+    for k, mine in enumerate([line, hist, sig]):
+        np.testing.assert_allclose(mine, ref.iloc[:, k], rtol=1e-9, atol=1e-12, equal_nan=True)
@@ -0,0 +1,89 @@
+# tests/test_ledger.py
+# ledger.match_fifo against a plain per-trade FIFO queue: hand-picked partial sells,
+# full exits and multi-lot sells, then a few hundred random trade lists.
+
+import os
+import random
+import sys
+from collections import deque
+from datetime import date
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ledger
+
+
+def reference_fifo(trades):
+    """(round trips in closing order, symbol -> (open qty, average cost)); sells past the position are capped."""
+    lots, round_trips = {}, []
+    for t in trades:
+        queue = lots.setdefault(t["symbol"], deque())
+        if t["side"] == "BUY":
+            queue.append([t["qty"], t["price"], t["date"]])
+            continue
+        left = t["qty"]
+        while left > 0 and queue:
+            lot = queue[0]
+            matched = min(left, lot[0])
+            held = (date.fromisoformat(t["date"]) - date.fromisoformat(lot[2])).days
+            round_trips.append({"symbol": t["symbol"], "entry_date": lot[2], "exit_date": t["date"], "qty": matched,
+                                "entry_price": lot[1], "exit_price": t["price"],
+                                "pnl": round(matched * (t["price"] - lot[1]), 2), "holding_days": held})
+            lot[0] -= matched
+            left -= matched
+            if lot[0] == 0:
+                queue.popleft()
+    positions = {}
+    for symbol, queue in lots.items():
+        qty = sum(lot[0] for lot in queue)
+        if qty:
+            positions[symbol] = (qty, sum(lot[0] * lot[1] for lot in queue) / qty)
+    return round_trips, positions
+
+
+def trade(day, symbol, side, qty, price):
+    return {"date": f"2024-01-{day:02d}", "symbol": symbol, "side": side, "qty": qty, "price": price}
+
+
+def assert_matches_reference(trades):
+    book = ledger.from_trades(trades)
+    round_trips, positions = reference_fifo(trades)
+    assert book.records() == round_trips
+    got = book.positions()
+    assert set(got) == set(positions)
+    for symbol, (qty, avg_cost) in positions.items():
+        assert got[symbol][0] == qty
+        assert got[symbol][1] == pytest.approx(avg_cost)
+
+
+@pytest.mark.parametrize("trades", [
+    # partial sell leaves the rest of the lot open
+    [trade(1, "A", "BUY", 10, 5.0), trade(3, "A", "SELL", 4, 7.0)],
+    # full exit, then a new position
+    [trade(1, "A", "BUY", 10, 5.0), trade(2, "A", "SELL", 10, 6.0), trade(4, "A", "BUY", 3, 9.0)],
+    # one sell across several lots, oldest first
+    [trade(1, "A", "BUY", 2, 1.0), trade(2, "A", "BUY", 3, 2.0), trade(3, "A", "BUY", 4, 3.0),
+     trade(5, "A", "SELL", 6, 4.0), trade(6, "A", "SELL", 3, 1.5)],
+    # symbols interleaved, and a sell larger than the position
+    [trade(1, "B", "BUY", 5, 10.0), trade(1, "A", "BUY", 1, 2.0), trade(2, "B", "SELL", 2, 12.0),
+     trade(3, "A", "SELL", 4, 3.0), trade(4, "B", "BUY", 1, 8.0), trade(5, "B", "SELL", 4, 9.0)],
+    # selling with nothing held
+    [trade(1, "A", "SELL", 3, 2.0), trade(2, "A", "BUY", 2, 2.0)],
+    [],
+], ids=["partial", "full_exit", "multi_lot", "interleaved_capped", "sell_first", "empty"])
+def test_cases_match_reference(trades):
+    assert_matches_reference(trades)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_random_trades_match_reference(seed):
+    rng = random.Random(seed)
+    symbols = "ABCD"[:rng.randint(1, 4)]
+    trades = []
+    for day in range(1, rng.randint(1, 28)):
+        for _ in range(rng.randint(1, 3)):  # several trades on the same day keep list order
+            trades.append(trade(day, rng.choice(symbols), rng.choice(["BUY", "BUY", "SELL"]), rng.randint(1, 12),
+                                float(rng.randint(100, 5000)) / 100))
+    assert_matches_reference(trades)
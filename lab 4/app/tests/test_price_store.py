@@ -0,0 +1,123 @@
+# tests/test_price_store.py
+# PriceStore.ensure against a fake provider: only the missing head/tail gaps are
+# downloaded, answered gaps are covered even when empty, and offline stores never download.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import Downloader, PriceStore
+
+
+class FakeDownloader(Downloader):
+    """Business-day bars from `listed` on, close = day number; records every request."""
+    def __init__(self, listed="2000-01-01", fail=False):
+        self.listed = pd.Timestamp(listed)
+        self.fail = fail
+        self.calls = []
+        self.during = None  # called inside download(), to interleave another ensure()
+
+    def download(self, symbol, start, end, interval='1d'):
+        self.calls.append((start, end))
+        if self.during is not None:
+            during, self.during = self.during, None
+            during()
+        if self.fail:
+            raise ConnectionError("provider down")
+        dt = pd.bdate_range(max(pd.Timestamp(start), self.listed), pd.Timestamp(end) - pd.Timedelta(days=1))
+        close = (dt - pd.Timestamp("2000-01-01")).days.to_numpy(dtype=float)
+        return pd.DataFrame({"dt": dt, "open": close, "high": close, "low": close, "close": close,
+                             "volume": np.ones(len(dt), dtype=np.int64)})
+
+
+def expected_days(start, end):
+    return list(pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1)))
+
+
+@pytest.fixture
+def fake():
+    return FakeDownloader()
+
+
+@pytest.fixture
+def store(tmp_path, fake):
+    return PriceStore(str(tmp_path), downloader=fake)
+
+
+def test_cold_fill(store, fake):
+    df = store.ensure("AAA", "2020-01-01", "2020-03-01")
+    assert fake.calls == [("2020-01-01", "2020-03-01")]
+    assert list(df["dt"]) == expected_days("2020-01-01", "2020-03-01")
+    assert store.coverage("AAA") == ("2020-01-01", "2020-03-01")
+
+
+def test_head_and_tail_gaps_only(store, fake):
+    store.ensure("AAA", "2020-01-01", "2020-03-01")
+    df = store.ensure("AAA", "2019-11-01", "2020-04-01")
+    assert fake.calls[1:] == [("2019-11-01", "2020-01-01"), ("2020-03-01", "2020-04-01")]
+    assert list(df["dt"]) == expected_days("2019-11-01", "2020-04-01")
+    assert store.coverage("AAA") == ("2019-11-01", "2020-04-01")
+
+
+def test_covered_range_is_not_refetched(store, fake):
+    store.ensure("AAA", "2020-01-01", "2020-03-01")
+    df = store.ensure("AAA", "2020-01-15", "2020-02-15")
+    assert len(fake.calls) == 1
+    assert list(df["dt"]) == expected_days("2020-01-15", "2020-02-16")
+
+
+def test_empty_head_before_listing_is_covered(tmp_path):
+    fake = FakeDownloader(listed="2020-03-02")  # the head gap comes back empty
+    store = PriceStore(str(tmp_path), downloader=fake)
+    store.ensure("NEW", "2020-03-01", "2020-04-01")
+    store.ensure("NEW", "2019-01-01", "2020-04-01")
+    store.ensure("NEW", "2019-01-01", "2020-04-01")
+    assert fake.calls == [("2020-03-01", "2020-04-01"), ("2019-01-01", "2020-03-01")]
+    assert store.coverage("NEW") == ("2019-01-01", "2020-04-01")
+
+
+def test_empty_weekend_tail_is_covered(store, fake):
+    store.ensure("AAA", "2020-01-01", "2020-02-08")  # through Friday 2020-02-07
+    store.ensure("AAA", "2020-01-01", "2020-02-10")  # Saturday and Sunday, no bars
+    store.ensure("AAA", "2020-01-01", "2020-02-10")
+    assert fake.calls == [("2020-01-01", "2020-02-08"), ("2020-02-08", "2020-02-10")]
+    assert store.coverage("AAA") == ("2020-01-01", "2020-02-10")
+
+
+def test_failed_download_is_retried(tmp_path):
+    fake = FakeDownloader(fail=True)
+    store = PriceStore(str(tmp_path), downloader=fake)
+    with pytest.raises(ConnectionError):
+        store.ensure("AAA", "2020-01-01", "2020-02-01")
+    assert store.coverage("AAA") is None
+    fake.fail = False
+    store.ensure("AAA", "2020-01-01", "2020-02-01")
+    assert fake.calls == [("2020-01-01", "2020-02-01")] * 2
+    assert store.coverage("AAA") == ("2020-01-01", "2020-02-01")
+
+
+def test_overlapping_ensures_only_grow_coverage(tmp_path, fake):
+    store = PriceStore(str(tmp_path), downloader=fake)
+    other = PriceStore(str(tmp_path), downloader=FakeDownloader())
+    store.ensure("AAA", "2020-01-01", "2020-03-01")
+    # another run extends the tail while this one is still downloading the head
+    fake.during = lambda: other.ensure("AAA", "2020-01-01", "2020-05-01")
+    store.ensure("AAA", "2019-10-01", "2020-03-01")
+    assert store.coverage("AAA") == ("2019-10-01", "2020-05-01")
+    assert list(store.load("AAA", "2019-10-01", "2020-04-30")["dt"]) == expected_days("2019-10-01", "2020-05-01")
+
+
+def test_offline_reads_disk_only(tmp_path, fake):
+    PriceStore(str(tmp_path), downloader=fake).ensure("AAA", "2020-01-01", "2020-02-01")
+    offline_fake = FakeDownloader()
+    offline = PriceStore(str(tmp_path), downloader=offline_fake, offline=True)
+    df = offline.ensure("AAA", "2019-01-01", "2020-06-01")
+    assert offline_fake.calls == []
+    assert list(df["dt"]) == expected_days("2020-01-01", "2020-02-01")
+    assert offline.ensure("BBB", "2020-01-01", "2020-02-01").empty
+    assert offline.coverage("AAA") == ("2020-01-01", "2020-02-01")
@@ -0,0 +1,41 @@
+# tests/test_reports.py
+# Columnar exports of daily and intraday runs.
+
+import io
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reports
+
+
+def read_back(rows, fmt):
+    data = b"".join(reports.iter_columnar(rows, fmt))
+    if fmt == "parquet":
+        return pq.read_table(io.BytesIO(data))
+    return ipc.open_stream(data).read_all()
+
+
+@pytest.mark.parametrize("fmt", sorted(reports.FORMATS))
+def test_daily_dates_are_date32(fmt):
+    rows = [{"date": "2024-01-02", "value": 100.0}, {"date": "2024-01-03", "value": 101.5}]
+    table = read_back(rows, fmt)
+    assert table.schema.field("date").type == pa.date32()
+    assert table.num_rows == 2
+
+
+@pytest.mark.parametrize("fmt", sorted(reports.FORMATS))
+def test_intraday_stamps_are_timestamps(fmt, monkeypatch):
+    monkeypatch.setattr(reports, "CHUNK_ROWS", 3)  # several chunks
+    rows = [{"date": f"2024-01-02 {9 + i // 60:02d}:{i % 60:02d}", "symbol": "AAA", "side": "BUY", "qty": i, "price": 1.5}
+            for i in range(10)]
+    table = read_back(rows, fmt)
+    assert pa.types.is_timestamp(table.schema.field("date").type)
+    assert str(table.column("date")[4].as_py()) == "2024-01-02 09:04:00"
+    assert table.num_rows == 10
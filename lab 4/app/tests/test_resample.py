@@ -0,0 +1,62 @@
+# tests/test_resample.py
+# Bucket boundaries of resample_bars for fixed and calendar frequencies.
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backtest
+
+
+def daily_bars(start="2023-12-20", periods=60):
+    dt = pd.bdate_range(start, periods=periods)
+    close = np.arange(1, periods + 1, dtype=float)
+    return pd.DataFrame({"dt": dt, "open": close, "high": close + 1, "low": close - 1, "close": close,
+                         "volume": np.full(periods, 10, dtype=np.int64)})
+
+
+@pytest.mark.parametrize("freq", ["W", "1W"])
+def test_weekly_buckets_start_on_monday(freq):
+    bars = daily_bars()
+    out = backtest.resample_bars(bars, freq)
+    assert (out["dt"].dt.dayofweek == 0).all()
+    assert out["dt"].iloc[0] == pd.Timestamp("2023-12-18")
+    # every bar lands in the week that contains it
+    expected = bars.groupby(bars["dt"].dt.to_period("W")).agg(close=("close", "last"), volume=("volume", "sum"))
+    assert out["close"].tolist() == expected["close"].tolist()
+    assert out["volume"].tolist() == expected["volume"].tolist()
+
+
+def test_weekly_spellings_agree():
+    bars = daily_bars()
+    assert backtest.resample_bars(bars, "W").equals(backtest.resample_bars(bars, "1W"))
+    two = backtest.resample_bars(bars, "2W")
+    assert (two["dt"].diff().dropna() == pd.Timedelta(days=14)).all()
+
+
+@pytest.mark.parametrize("freq, first", [("ME", "2023-12-01"), ("M", "2023-12-01"), ("QE", "2023-10-01"),
+                                         ("QE-DEC", "2023-10-01"), ("YE", "2023-01-01")])
+def test_calendar_aliases(freq, first):
+    out = backtest.resample_bars(daily_bars(), freq)
+    assert out["dt"].iloc[0] == pd.Timestamp(first)
+
+
+def test_fixed_frequencies_floor_from_midnight():
+    dt = pd.date_range("2024-01-02 09:30", periods=120, freq="1min")
+    bars = pd.DataFrame({"dt": dt, "close": np.arange(120, dtype=float)})
+    out = backtest.resample_bars(bars, "1h")
+    assert out["dt"].tolist() == [pd.Timestamp("2024-01-02 09:00"), pd.Timestamp("2024-01-02 10:00"),
+                                  pd.Timestamp("2024-01-02 11:00")]
+
+
+def test_unknown_frequency_is_rejected():
+    store = backtest.PriceStore(data_dir="unused", offline=True)
+    with pytest.raises(ValueError, match="unknown resample frequency"):
+        store._check_freq("bogus")
+    with pytest.raises(ValueError, match="can't resample"):
+        store._check_freq("5min")
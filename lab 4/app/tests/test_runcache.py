@@ -0,0 +1,101 @@
+# tests/test_runcache.py
+# Run cache keys, both tiers, and the ETag / If-None-Match handling of cached results.
+
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+import runcache
+
+ARGS = (["AAPL", "MSFT"], "2020-01-01", "2021-01-01", 10_000, "sma", {"short": 5, "long": 20},
+        {"AAPL": "a1", "MSFT": "m1"})
+
+
+def result(run_id=7):
+    return {"kpis": {"portfolio_value": 11_000.0}, "trades": [{"symbol": "AAPL", "qty": 3}],
+            "equity": [{"date": "2020-01-02", "value": 10_000.0}], "run_id": run_id, "cache_key": runcache.key(*ARGS)}
+
+
+def test_key_is_stable():
+    k = runcache.key(*ARGS)
+    # dict order and numpy scalars don't matter, and neither does the process's hash seed
+    assert runcache.key(ARGS[0], *ARGS[1:3], np.float64(10_000), "sma", {"long": np.int64(20), "short": 5},
+                        {"MSFT": "m1", "AAPL": "a1"}) == k
+    code = f"import runcache; print(runcache.key(*{ARGS!r}))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, env={**os.environ, "PYTHONHASHSEED": "123"},
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == k
+
+
+@pytest.mark.parametrize("index, value", [
+    (0, ["MSFT", "AAPL"]), (1, "2020-01-02"), (2, "2021-01-02"), (3, 10_001), (4, "ema_rsi"),
+    (5, {"short": 5, "long": 21}), (6, {"AAPL": "a2", "MSFT": "m1"}),
+])
+def test_key_changes_with_every_input(index, value):
+    args = list(ARGS)
+    args[index] = value
+    assert runcache.key(*args) != runcache.key(*ARGS)
+
+
+def test_schema_bump_invalidates_both_tiers(tmp_path, monkeypatch):
+    cache = runcache.RunCache(str(tmp_path))
+    old, stored = runcache.key(*ARGS), result()
+    cache.put(old, stored)
+    monkeypatch.setattr(runcache, "SCHEMA", runcache.SCHEMA + 1)
+    new = runcache.key(*ARGS)
+    assert new != old
+    assert cache.get(new) is None
+    cache.clear()  # memory tier gone, the old file is still on disk but never looked up
+    assert cache.get(new) is None
+    assert cache.get(old) == stored
+
+
+def test_disk_tier_survives_a_restart(tmp_path):
+    k = runcache.key(*ARGS)
+    runcache.RunCache(str(tmp_path)).put(k, result())
+    fresh = runcache.RunCache(str(tmp_path))
+    assert fresh.get(k) == result()
+    assert fresh.stats()["disk_hits"] == 1
+
+
+def test_get_and_put_copy(tmp_path):
+    cache = runcache.RunCache(str(tmp_path), persist=False)
+    k = runcache.key(*ARGS)
+    stored = result()
+    cache.put(k, stored)
+    stored["run_id"] = 99  # the caller keeps using its dict after put()
+
+    got = cache.get(k)
+    assert got is not cache.get(k)
+    got["timings"] = {"total_ms": 1}
+    got["run_id"] = None
+    assert cache.get(k) == result()
+
+
+def test_matching_if_none_match_gets_304():
+    app = pytest.importorskip("app")
+    res = result()
+    tag = runcache.etag(res)
+
+    with app.app.test_request_context(headers={"If-None-Match": f'W/"{tag}"'}):
+        resp = app._cached_response(res, app.jsonify)
+    assert resp.status_code == 304
+    assert resp.get_etag() == (tag, True)
+    assert resp.get_data() == b""
+
+    with app.app.test_request_context(headers={"If-None-Match": 'W/"something-else"'}):
+        resp = app._cached_response(res, app.jsonify)
+    assert resp.status_code == 200
+    assert resp.get_json()["run_id"] == 7
+
+    # results with a timings block are one-offs and carry no validator
+    with app.app.test_request_context(headers={"If-None-Match": f'W/"{tag}"'}):
+        resp = app._cached_response({**res, "timings": {}}, app.jsonify)
+    assert resp.status_code == 200
+    assert resp.get_etag() == (None, None)
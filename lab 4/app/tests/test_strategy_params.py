@@ -0,0 +1,40 @@
+# tests/test_strategy_params.py
+# Parameter resolution and constraints declared by the strategy modules.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import registry
+import sweep
+
+
+@pytest.mark.parametrize("name, params", [
+    ("sma", {"short": 0}), ("sma", {"long": -5}), ("ema_rsi", {"fast": 0}), ("ema_rsi", {"rsi_length": 0}),
+    ("consensus", {"macd_signal": 0}), ("consensus", {"trend_length": -1}), ("sma", {"short": 2.5}),
+    ("sma", {"short": "x"}),
+])
+def test_out_of_range_params_raise_value_error(name, params):
+    with pytest.raises(ValueError):
+        registry.get(name).resolve(params)
+
+
+def test_params_are_cast():
+    assert registry.get("sma").resolve({"short": "5", "long": 20.0}) == {"short": 5, "long": 20}
+    assert registry.get("ema_rsi").resolve({"rsi_buy": "40"})["rsi_buy"] == 40.0
+
+
+def test_consensus_trend_filter_off_is_valid():
+    consensus = registry.get("consensus")
+    assert consensus.resolve({"trend_length": 0})["trend_length"] == 0
+    assert consensus.is_valid({"trend_length": 0})
+    assert not consensus.is_valid({"sma_length": 50, "trend_length": 20})
+    assert {p["trend_length"] for p in sweep.expand_grid("consensus", {"trend_length": "0,100"})} == {0, 100}
+
+
+def test_sweep_grid_with_zero_length_is_rejected():
+    with pytest.raises(ValueError, match="short must be at least 1"):
+        sweep.expand_grid("sma", {"short": "0:10:5", "long": 20})
@@ -0,0 +1,46 @@
+# tests/test_sweep.py
+# Grid expansion limits and KPI ranking for sweeps.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import engine
+import sweep
+
+
+@pytest.mark.parametrize("spec, values", [
+    ("5:20:5", [5, 10, 15, 20]), ("0:1:0.25", [0, 0.25, 0.5, 0.75, 1]), ("10:5", []),
+    ({"start": 2, "stop": 6, "step": 2}, [2, 4, 6]), ("3,7", [3, 7]), ([1, 2.5], [1, 2.5]), (9, [9]),
+])
+def test_axis_size_matches_parse_range(spec, values):
+    assert sweep.parse_range(spec) == values
+    assert sweep.axis_size(spec) == len(values)
+
+
+@pytest.mark.parametrize("grid", [
+    {"short": "1:1e9", "long": "30"},                 # one huge axis
+    {"short": "1:1e12", "long": "10:5"},              # huge axis next to an empty one
+    {"short": "1:30", "long": "1:30"},                # product over the limit
+])
+def test_oversized_grid_rejected_without_building_it(grid, monkeypatch):
+    monkeypatch.setattr(sweep, "parse_range", lambda spec: pytest.fail("axis built before the size check"))
+    with pytest.raises(ValueError, match="limit is"):
+        sweep.expand_grid("sma", grid)
+
+
+@pytest.mark.parametrize("spec", ["1:inf", "1:5:0", {"stop": 3}])
+def test_bad_ranges(spec):
+    with pytest.raises(ValueError):
+        sweep.axis_size(spec)
+
+
+def test_rank_by_is_checked_and_missing_values_rank_last():
+    with pytest.raises(ValueError, match="unknown rank_by"):
+        sweep.run_sweep(None, "sma", {"short": 5, "long": 20}, 1000, rank_by="params")
+    rows = [{"sharpe_ratio": None}, {"sharpe_ratio": -1.0}, {"sharpe_ratio": 0.5}]
+    rows.sort(key=lambda r: engine.rank_key(r, "sharpe_ratio"), reverse=True)
+    assert [r["sharpe_ratio"] for r in rows] == [0.5, -1.0, None]
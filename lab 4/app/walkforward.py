@@ -0,0 +1,228 @@
+# walkforward.py
+# Walk-forward optimization: rolling train (in-sample) / test (out-of-sample) windows.
+# In every window the parameter grid is ranked on the train slice, the winner is
+# traded on the following test slice, and the test equity curves are stitched together.
+# Each test window starts from cash, so whatever it still holds when the next window
+# takes over is sold at that bar's close for the stitched trade statistics.
+#
+# All indicators used by the strategies only look backwards, so signals for each
+# parameter combination are generated once over the whole price matrix and then
+# sliced per window; a window only costs simulations, never indicator work.
+# Windows are simulated in parallel, each worker gets the matrices once at start-up.
+#
+#   python walkforward.py --symbols AAPL MSFT CVX --start 2015-01-01 --end 2025-01-01 \
+#       --strategy sma --grid short=5:20:5 long=30,50,100 --train 36 --test 6 --step 1
+
+import argparse
+import hashlib
+import os
+
+import pandas as pd
+
+import engine
+import ledger
+import marketdata
+import pools
+import sweep
+from backtest import INTERVALS, bar_loaders, fetch_and_store_prices
+from metrics import calculate_kpis
+
+_STATE = None  # per-worker (prices_df, combos, signals, rsi arrays)
+
+
+def make_windows(dates: pd.DatetimeIndex, train_months: int, test_months: int, step_months: int) -> list[tuple]:
+    """(train_lo, train_hi, test_hi) row offsets into dates; train is [lo, hi), test [hi, test_hi)."""
+    if train_months <= 0 or test_months <= 0 or step_months <= 0:
+        raise ValueError("train, test and step must be positive month counts")
+    windows = []
+    anchor = dates[0]
+    while True:
+        train_end = anchor + pd.DateOffset(months=train_months)
+        if train_end > dates[-1]:
+            break
+        test_end = train_end + pd.DateOffset(months=test_months)
+        lo, hi, test_hi = dates.searchsorted([anchor, train_end, test_end])
+        if test_hi > hi and hi - lo > 1:
+            windows.append((int(lo), int(hi), int(test_hi)))
+        anchor = anchor + pd.DateOffset(months=step_months)
+    return windows
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _signals_job(job):
+    # a slice of the combos; their common indicators are computed once per symbol
+    strategy_name, combos = job
+    strategy = sweep.STRATEGIES[strategy_name]
+    return engine.build_signal_sets(_STATE[0], [(strategy, p) for p in combos], workers=1)
+
+
+def _pool_map(fn, jobs, workers, state, progress, stage):
+    # runs fn over jobs with the state installed once per worker; progress() may raise
+    # to cancel, in which case queued jobs are dropped
+    if workers <= 1:
+        _init_worker(state)
+        out = []
+        for i, j in enumerate(jobs):
+            progress(stage, i, len(jobs))
+            out.append(fn(j))
+        return out
+    with pools.process_pool(workers, _init_worker, (state,)) as pool:
+        out = []
+        for i, r in enumerate(pool.map(fn, jobs)):
+            progress(stage, i, len(jobs))
+            out.append(r)
+        return out
+
+
+def build_all_signals(prices_df, strategy_name: str, combos: list[dict], workers: int, progress=engine._no_progress):
+    """Signal matrices for every combo; identical rsi matrices are stored once."""
+    # one slice per worker shares the most indicator work; a few more keep progress moving
+    n_jobs = min(len(combos), workers * 2 if workers > 1 else 4)
+    bounds = [round(k * len(combos) / n_jobs) for k in range(n_jobs + 1)]
+    jobs = [(strategy_name, combos[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    out = _pool_map(_signals_job, jobs, workers, (prices_df,), progress, "signals")
+
+    signals, rsi_keys, rsi_arrays, seen = [], [], [], {}
+    for sig, rsi in (pair for chunk in out for pair in chunk):
+        key = hashlib.blake2b(rsi.tobytes(), digest_size=16).digest()
+        if key not in seen:
+            seen[key] = len(rsi_arrays)
+            rsi_arrays.append(rsi)
+        signals.append(sig)
+        rsi_keys.append(seen[key])
+    return signals, rsi_keys, rsi_arrays
+
+
+def _seam_book(test_df, trades: list[dict], stop: int, flatten: bool) -> ledger.Ledger:
+    """
+    Ledger of the trades on a window's first stop rows. The next window starts from
+    cash, so with flatten the positions still open there are sold at that row's close.
+    """
+    dates = test_df.index
+    stamp = '%Y-%m-%d %H:%M' if marketdata.is_intraday(dates) else '%Y-%m-%d'
+    kept = [t for t in trades if t["date"] < dates[stop].strftime(stamp)] if stop < len(dates) else trades
+    closing = []
+    if flatten:
+        held = {}
+        for t in kept:
+            held[t["symbol"]] = held.get(t["symbol"], 0) + (t["qty"] if t["side"] == "BUY" else -t["qty"])
+        closing = [{"date": dates[stop - 1].strftime(stamp), "symbol": sym, "side": "SELL", "qty": qty,
+                    "price": float(test_df[sym].iloc[stop - 1])} for sym, qty in held.items() if qty > 0]
+    return ledger.from_trades(kept + closing)
+
+
+def _run_window(job):
+    lo, hi, test_hi, stop, cash_start, rank_by = job
+    prices_df, combos, signals, rsi_keys, rsi_arrays = _STATE
+
+    train_df = prices_df.iloc[lo:hi]
+    best, best_score, best_kpis = None, None, None
+    for k, params in enumerate(combos):
+        res = engine.backtest_signals(train_df, signals[k][lo:hi], rsi_arrays[rsi_keys[k]][lo:hi], cash_start)
+        score = engine.rank_key(res["kpis"], rank_by)
+        if best_score is None or score > best_score:
+            best, best_score, best_kpis = k, score, res["kpis"]
+
+    test_df = prices_df.iloc[hi:test_hi]
+    test = engine.backtest_signals(test_df, signals[best][hi:test_hi], rsi_arrays[rsi_keys[best]][hi:test_hi], cash_start)
+    return {
+        "train_start": train_df.index[0].strftime('%Y-%m-%d'), "train_end": train_df.index[-1].strftime('%Y-%m-%d'),
+        "test_start": test_df.index[0].strftime('%Y-%m-%d'), "test_end": test_df.index[-1].strftime('%Y-%m-%d'),
+        "params": combos[best], "train_kpis": best_kpis, "test_kpis": test["kpis"],
+        "equity": test["equity"][:stop - hi], "book": _seam_book(test_df, test["trades"], stop - hi, stop < test_hi),
+    }
+
+
+def stitch(windows: list[dict], cash_start: float) -> tuple[list[dict], ledger.Ledger]:
+    """
+    Chains the test windows into one curve. Each window was simulated from cash_start,
+    so its returns are compounded onto where the previous one finished, and its round
+    trips (already cut and flattened at the seam) are restated at that level too.
+    """
+    curve, books, scales, level = [], [], [], cash_start
+    for w in windows:
+        if not w["equity"]:
+            continue
+        scale = level / cash_start
+        curve += [{"date": e["date"], "value": round(e["value"] * scale, 2)} for e in w["equity"]]
+        books.append(w["book"])
+        scales.append(scale)
+        level = curve[-1]["value"]
+    return curve, ledger.concat(books, scales)
+
+
+def run_walkforward(prices_df, strategy_name: str, grid: dict, cash_start: float,
+                    train_months: int = 36, test_months: int = 6, step_months: int = 1,
+                    rank_by: str = "sharpe_ratio", workers: int | None = None, progress=engine._no_progress) -> dict:
+    if strategy_name not in sweep.STRATEGIES:
+        raise ValueError(f"unknown strategy '{strategy_name}'")
+    engine.check_rank_by(rank_by)
+    combos = sweep.expand_grid(strategy_name, grid)  # rejects grids over sweep.MAX_COMBOS
+    if not combos:
+        raise ValueError("no valid parameter combinations in the grid")
+    windows = make_windows(prices_df.index, train_months, test_months, step_months)
+    if not windows:
+        raise ValueError("price history is shorter than one train + test window")
+
+    workers = workers or os.cpu_count() or 1
+
+    signals, rsi_keys, rsi_arrays = build_all_signals(prices_df, strategy_name, combos, min(workers, len(combos)), progress)
+    state = (prices_df, combos, signals, rsi_keys, rsi_arrays)
+
+    # overlapping windows (step < test) only contribute the bars before the next one starts
+    stops = [min(nxt[1], test_hi) for (_, _, test_hi), nxt in zip(windows, windows[1:])] + [windows[-1][2]]
+    jobs = [(lo, hi, test_hi, stop, cash_start, rank_by) for (lo, hi, test_hi), stop in zip(windows, stops)]
+    results = _pool_map(_run_window, jobs, min(workers, len(jobs)), state, progress, "windows")
+
+    equity, book = stitch(results, cash_start)
+    kpis = calculate_kpis([(pd.Timestamp(e["date"]), e["value"]) for e in equity], cash_start, None, book,
+                          periods_per_year=marketdata.periods_per_year(prices_df.index))
+
+    return {
+        "strategy": strategy_name, "combos": len(combos),
+        "train_months": train_months, "test_months": test_months, "step_months": step_months,
+        "rank_by": rank_by, "kpis": kpis, "equity": equity,
+        "windows": [{k: v for k, v in w.items() if k not in ("book", "equity")} for w in results],
+    }
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Walk-forward optimization")
+    ap.add_argument("--symbols", nargs="+", required=True)
+    ap.add_argument("--start", required=True)
+    ap.add_argument("--end", required=True)
+    ap.add_argument("--cash", type=float, default=10000)
+    ap.add_argument("--strategy", default="sma", choices=sorted(sweep.STRATEGIES))
+    ap.add_argument("--grid", nargs="+", default=[], help="name=spec, e.g. short=5:20:5 long=30,50")
+    ap.add_argument("--train", type=int, default=36, help="train window, months")
+    ap.add_argument("--test", type=int, default=6, help="test window, months")
+    ap.add_argument("--step", type=int, default=1, help="step between windows, months")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--rank-by", default="sharpe_ratio", choices=engine.RANK_KPIS)
+    ap.add_argument("--interval", default="1d", choices=sorted(INTERVALS), help="stored bar interval")
+    ap.add_argument("--bars", default=None, help="resample to this coarser frequency on load, e.g. 5min, 1h")
+    ap.add_argument("--fetch", action="store_true", help="download prices from yfinance first")
+    args = ap.parse_args()
+
+    grid = dict(g.split("=", 1) for g in args.grid)
+    symbols = [s.upper() for s in args.symbols]
+    if args.fetch:
+        for sym in symbols:
+            fetch_and_store_prices(sym, args.start, args.end, args.interval)
+
+    price_loader, matrix_loader = bar_loaders(args.interval, args.bars)
+    prices_df = engine.build_price_matrix(symbols, args.start, args.end, price_loader, matrix_loader)
+    if prices_df.empty:
+        raise SystemExit("No price data on disk for these symbols (use --fetch).")
+
+    out = run_walkforward(prices_df, args.strategy, grid, args.cash, args.train, args.test, args.step,
+                          args.rank_by, args.workers)
+    for w in out["windows"]:
+        print(f"{w['test_start']} -> {w['test_end']}  {w['params']}  "
+              f"train {args.rank_by}={w['train_kpis'].get(args.rank_by)}  "
+              f"test return={w['test_kpis']['return_pct']}%  sharpe={w['test_kpis']['sharpe_ratio']}")
+    print(f"\nstitched: {out['kpis']}")
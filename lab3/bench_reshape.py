@@ -0,0 +1,91 @@
+# Benchmark: turning a wide yfinance frame into long (symbol, dt, ...) rows.
+# Compares the old iterrows loop with prices.to_long_format on synthetic frames (no network):
+#   python bench_reshape.py --symbols 10 100 1000 --days 252
+import argparse
+import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from prices import FIELDS, LONG_COLS, to_long_format
+
+
+#What yf.download(list_of_tickers) hands back: (field, ticker) columns, dates as index
+def synthetic_wide(n_symbols: int, n_days: int, seed: int = 3) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-02", periods=n_days, name="Date")
+    tickers = [f"T{k:05d}" for k in range(n_symbols)]
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, (n_days, n_symbols)), axis=0))
+    data = {
+        "Open": close * 0.99, "High": close * 1.01, "Low": close * 0.98, "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, (n_days, n_symbols)).astype(float),
+    }
+    # late listings / missing volume, like real downloads
+    data["Close"][: n_days // 4, ::7] = np.nan
+    data["Open"][: n_days // 4, ::7] = np.nan
+    data["High"][: n_days // 4, ::7] = np.nan
+    data["Low"][: n_days // 4, ::7] = np.nan
+    data["Volume"][: n_days // 4, ::7] = np.nan
+    data["Volume"][-1, ::5] = np.nan
+    cols = pd.MultiIndex.from_product([list(data), tickers], names=["Price", "Ticker"])
+    return pd.DataFrame(np.concatenate([data[f] for f in data], axis=1), index=dates, columns=cols), tickers
+
+
+#The previous implementation, kept here only as the baseline
+def to_long_format_rowwise(df: pd.DataFrame, symbols: List[str]) -> pd.DataFrame:
+    rows = []
+    if isinstance(df.columns, pd.MultiIndex):
+        if set(FIELDS).intersection(df.columns.get_level_values(0)):
+            df = df.swaplevel(0, 1, axis=1)
+        syms_in_df = set(df.columns.get_level_values(0))
+        for sym in [s for s in symbols if s in syms_in_df]:
+            sub = df[sym].reindex(columns=FIELDS)
+            for idx, r in sub.dropna(how="all").iterrows():
+                v = r["Volume"]
+                rows.append([sym, idx.date(), r["Open"], r["High"], r["Low"], r["Close"],
+                             int(v) if pd.notna(v) else None])
+    else:
+        sym = symbols[0]
+        sub = df.reindex(columns=FIELDS)
+        for idx, r in sub.dropna(how="all").iterrows():
+            v = r["Volume"]
+            rows.append([sym, idx.date(), r["Open"], r["High"], r["Low"], r["Close"],
+                         int(v) if pd.notna(v) else None])
+    return pd.DataFrame(rows, columns=LONG_COLS)
+
+
+def same_rows(a: pd.DataFrame, b: pd.DataFrame) -> bool:
+    if len(a) != len(b):
+        return False
+    a_vol = pd.array(a["volume"], dtype="Int64")
+    b_vol = pd.array(b["volume"], dtype="Int64")
+    return (a[LONG_COLS[:2]].reset_index(drop=True).equals(b[LONG_COLS[:2]].reset_index(drop=True))
+            and np.allclose(a[LONG_COLS[2:6]].to_numpy(float), b[LONG_COLS[2:6]].to_numpy(float), equal_nan=True)
+            and bool((a_vol == b_vol).fillna(a_vol.isna() & b_vol.isna()).all()))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbols", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--days", type=int, default=252)
+    ap.add_argument("--skip-rowwise-above", type=int, default=1000,
+                    help="don't time the old loop for universes wider than this")
+    args = ap.parse_args()
+
+    print(f"{'symbols':>8} {'rows':>9} {'rowwise s':>10} {'columnar s':>11}  match")
+    for n in args.symbols:
+        wide, tickers = synthetic_wide(n, args.days)
+
+        t0 = time.perf_counter()
+        new = to_long_format(wide, tickers)
+        t_new = time.perf_counter() - t0
+
+        if n <= args.skip_rowwise_above:
+            t0 = time.perf_counter()
+            old = to_long_format_rowwise(wide, tickers)
+            t_old = f"{time.perf_counter() - t0:10.3f}"
+            match = same_rows(old, new)
+        else:
+            t_old, match = f"{'-':>10}", "-"
+        print(f"{n:>8} {len(new):>9} {t_old} {t_new:11.4f}  {match}")
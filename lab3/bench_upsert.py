@@ -0,0 +1,170 @@
+# Benchmark: row-by-row upsert vs bulk upsert into a scratch copy of stock_prices.
+# Against the server in db_config.py (after init_db.py):
+#   python bench_upsert.py --symbols 50 --days 500
+#
+# Or against a throwaway local stand-in, so the numbers don't depend on a shared server:
+#   python bench_upsert.py --standin --symbols 50 --days 500
+# --standin bootstraps a fresh MariaDB/MySQL datadir in a temp directory (mariadbd or
+# mysqld must be on PATH), starts it on 127.0.0.1:--standin-port, creates the dsci user
+# and schema via init_db.py, runs the benchmark and deletes the datadir afterwards.
+# Without a local server binary, the same stand-in from docker:
+#   docker run --rm -d -p 3307:3306 -e MARIADB_USER=dsci -e MARIADB_PASSWORD=dsci \
+#     -e MARIADB_DATABASE=stock_data -e MARIADB_ROOT_PASSWORD=root mariadb:11 --local-infile=1
+#   python bench_upsert.py --port 3307 --init-db
+import argparse
+import getpass
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import mysql.connector
+import numpy as np
+import pandas as pd
+
+import init_db
+from db_config import DB_SETTINGS, get_connection
+from prices import upsert_prices, upsert_prices_rowwise
+
+BENCH_TABLE = "stock_prices_bench"
+
+
+def synthetic_prices(n_symbols: int, n_days: int, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2015-01-02", periods=n_days)
+    frames = []
+    for k in range(n_symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days)))
+        frames.append(pd.DataFrame({
+            "symbol": f"SYM{k:04d}", "dt": dates,
+            "open": close * 0.99, "high": close * 1.01, "low": close * 0.98, "close": close,
+            "volume": rng.integers(1_000, 1_000_000, n_days),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def reset_table():
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {BENCH_TABLE} LIKE stock_prices;")
+        cur.execute(f"TRUNCATE TABLE {BENCH_TABLE};")
+        conn.commit()
+        cur.close()
+
+
+def start_standin(port: int):
+    """Bootstrap and start a throwaway server; returns (process, datadir)."""
+    server = shutil.which("mariadbd") or shutil.which("mysqld")
+    if server is None:
+        raise SystemExit("--standin needs mariadbd or mysqld on PATH (or use the docker one-liner in this file)")
+    mariadb = "MariaDB" in subprocess.run([server, "--version"], capture_output=True, text=True).stdout
+    datadir = tempfile.mkdtemp(prefix="bench_upsert_db_")
+    sock = os.path.join(datadir, "mysqld.sock")
+    user = f"--user={getpass.getuser()}"
+
+    if mariadb:
+        install_db = shutil.which("mariadb-install-db") or shutil.which("mysql_install_db")
+        subprocess.run([install_db, "--no-defaults", f"--datadir={datadir}", user, "--auth-root-authentication-method=normal",
+                        "--skip-test-db"], check=True, stdout=subprocess.DEVNULL)
+    else:
+        subprocess.run([server, "--no-defaults", "--initialize-insecure", f"--datadir={datadir}", user], check=True)
+
+    cmd = [server, "--no-defaults", f"--datadir={datadir}", f"--socket={sock}", f"--port={port}",
+           "--bind-address=127.0.0.1", f"--pid-file={os.path.join(datadir, 'mysqld.pid')}",
+           "--local-infile=1", user]
+    if not mariadb:
+        cmd.append("--mysqlx=OFF")
+    err_log = os.path.join(datadir, "mysqld.err")
+    with open(err_log, "w") as err:
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=err)
+
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            root = mysql.connector.connect(unix_socket=sock, user="root", password="")
+            break
+        except mysql.connector.Error:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                with open(err_log) as err:
+                    log = err.read()[-2000:]
+                stop_standin(proc, datadir)
+                raise SystemExit(f"stand-in server did not start:\n{log}")
+            time.sleep(0.5)
+    cur = root.cursor()
+    # localhost too, so an anonymous ''@localhost account can't shadow the '%' one
+    for host in ("%", "localhost"):
+        cur.execute(f"CREATE USER '{DB_SETTINGS['user']}'@'{host}' IDENTIFIED BY '{DB_SETTINGS['password']}';")
+        cur.execute(f"GRANT ALL PRIVILEGES ON *.* TO '{DB_SETTINGS['user']}'@'{host}';")
+    cur.close()
+    root.close()
+
+    DB_SETTINGS.update(host="127.0.0.1", port=port)
+    return proc, datadir
+
+
+def stop_standin(proc, datadir: str):
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+    shutil.rmtree(datadir, ignore_errors=True)
+
+
+def timed(label: str, fn, *args, **kwargs):
+    t0 = time.perf_counter()
+    inserted, updated = fn(*args, **kwargs)
+    dt = time.perf_counter() - t0
+    print(f"{label:<32} {dt:9.2f}s  inserted={inserted:<8} updated={updated}")
+
+
+def run(args):
+    df = synthetic_prices(args.symbols, args.days)
+    print(f"{len(df)} rows ({args.symbols} symbols x {args.days} days)\n")
+
+    if not args.skip_rowwise:
+        reset_table()
+        timed("row-by-row insert", upsert_prices_rowwise, df, table=BENCH_TABLE)
+        timed("row-by-row update", upsert_prices_rowwise, df, table=BENCH_TABLE)
+
+    reset_table()
+    timed("bulk insert (executemany)", upsert_prices, df, batch_size=args.batch, table=BENCH_TABLE)
+    timed("bulk update (executemany)", upsert_prices, df, batch_size=args.batch, table=BENCH_TABLE)
+
+    if args.load_data:
+        reset_table()
+        timed("bulk insert (load data)", upsert_prices, df, method="load_data", table=BENCH_TABLE)
+        timed("bulk update (load data)", upsert_prices, df, method="load_data", table=BENCH_TABLE)
+
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE};")
+        conn.commit()
+        cur.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--symbols", type=int, default=20)
+    ap.add_argument("--days", type=int, default=250)
+    ap.add_argument("--batch", type=int, default=1000)
+    ap.add_argument("--skip-rowwise", action="store_true")
+    ap.add_argument("--load-data", action="store_true", help="also time the LOAD DATA LOCAL INFILE path")
+    ap.add_argument("--port", type=int, help="server port (default: db_config.py)")
+    ap.add_argument("--init-db", action="store_true", help="create the schema (init_db.py) first")
+    ap.add_argument("--standin", action="store_true", help="run against a throwaway local server")
+    ap.add_argument("--standin-port", type=int, default=3307)
+    args = ap.parse_args()
+
+    if args.port:
+        DB_SETTINGS["port"] = args.port
+    standin = start_standin(args.standin_port) if args.standin else None
+    try:
+        if args.init_db or standin:
+            init_db.main()
+        run(args)
+    finally:
+        if standin:
+            stop_standin(*standin)
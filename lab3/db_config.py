@@ -1,6 +1,9 @@
 #THis is a single file for db stuff
+import os
 import mysql.connector
 
+from db_pool import ConnectionPool
+
 # THe below are details of db configuration local
 DB_SETTINGS = {
     "host": "127.0.0.1",
@@ -10,6 +13,20 @@ DB_SETTINGS = {
     "database": "stock_data",
 }
 
-#Establish connection using the details
+#Connections come from a small pool (close() hands them back); size via DB_POOL_SIZE
+_pool = None
+
+#Establish connection using the details (a pooled one)
 def get_connection():
-    return mysql.connector.connect(**DB_SETTINGS)
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(DB_SETTINGS, size=int(os.environ.get("DB_POOL_SIZE", "5")))
+    return _pool.get_connection()
+
+#A dedicated connection outside the pool, for connector options pooled ones don't have
+#(e.g. allow_local_infile); close() really disconnects it
+def get_unpooled_connection(**options):
+    return mysql.connector.connect(**{**DB_SETTINGS, **options})
+
+def pool_stats():
+    return _pool.stats() if _pool is not None else {}
@@ -0,0 +1,151 @@
+# db_pool.py
+# Small MySQL connection pool shared by every DB helper.
+# Connections handed out behave like normal mysql.connector connections, except
+# close() puts them back in the pool instead of tearing down the socket. Use them as
+# `with pool.get_connection() as conn:` so the slot comes back even when the body raises;
+# a connection that is dropped without close() is returned by its finalizer.
+#
+#  - size:      max connections checked out at once (callers wait up to `timeout` s)
+#  - ping_idle: connections idle longer than this are pinged (and reconnected) on checkout
+#  - recycle:   connections older than this are replaced instead of reused
+
+import queue
+import threading
+import time
+import weakref
+
+import mysql.connector
+
+
+class PoolTimeout(mysql.connector.errors.PoolError):
+    pass
+
+
+class PooledConnection:
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        # gives the slot back if this wrapper is garbage collected while still checked out
+        self._finalizer = weakref.finalize(self, pool._release, raw)
+        self._finalizer.atexit = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            self._raw = None
+            self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionPool:
+    def __init__(self, settings: dict, size: int = 5, timeout: float = 10.0,
+                 ping_idle: float = 30.0, recycle: float = 3600.0):
+        self.settings = dict(settings)
+        self.size = size
+        self.timeout = timeout
+        self.ping_idle = ping_idle
+        self.recycle = recycle
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = queue.LifoQueue()
+        self._born = {}
+        self._lock = threading.Lock()
+        self._stats = {"checkouts": 0, "created": 0, "reconnects": 0, "discarded": 0, "timeouts": 0,
+                       "wait_total_s": 0.0, "wait_max_s": 0.0, "in_use": 0}
+
+    def _bump(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+
+    def _mark_born(self, raw, stat):
+        # _born is shared by every thread checking out or releasing, so only touched under the lock
+        with self._lock:
+            self._born[id(raw)] = time.monotonic()
+            self._stats[stat] += 1
+
+    def _age(self, raw) -> float:
+        with self._lock:
+            born = self._born.get(id(raw), 0)
+        return time.monotonic() - born
+
+    def _connect(self):
+        raw = mysql.connector.connect(**self.settings)
+        self._mark_born(raw, "created")
+        return raw
+
+    def _discard(self, raw):
+        with self._lock:
+            self._born.pop(id(raw), None)
+            self._stats["discarded"] += 1
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def get_connection(self) -> PooledConnection:
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            self._bump("timeouts")
+            raise PoolTimeout(f"no MySQL connection free after {self.timeout}s (pool size {self.size})")
+        wait = time.perf_counter() - t0
+
+        try:
+            raw = None
+            while raw is None:
+                try:
+                    raw, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    raw = self._connect()
+                    break
+                if self._age(raw) > self.recycle:
+                    self._discard(raw)
+                    raw = None
+                elif time.monotonic() - idle_since > self.ping_idle:
+                    # stale socket (server wait_timeout, network blip): health check, reconnect if dead
+                    try:
+                        if not raw.is_connected():
+                            raw.reconnect(attempts=1, delay=0)
+                            self._mark_born(raw, "reconnects")  # a fresh socket, so its age restarts
+                    except mysql.connector.Error:
+                        self._discard(raw)
+                        raw = None
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            self._stats["wait_total_s"] += wait
+            self._stats["wait_max_s"] = max(self._stats["wait_max_s"], wait)
+        return PooledConnection(self, raw)
+
+    def _release(self, raw):
+        try:
+            # never hand the next caller someone else's open transaction or unread rows
+            raw.consume_results()
+            if raw.in_transaction:
+                raw.rollback()
+            self._idle.put((raw, time.monotonic()))
+        except mysql.connector.Error:
+            self._discard(raw)
+        finally:
+            with self._lock:
+                self._stats["in_use"] -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["size"] = self.size
+        s["idle"] = self._idle.qsize()
+        s["wait_avg_ms"] = round(1000 * s["wait_total_s"] / s["checkouts"], 3) if s["checkouts"] else 0.0
+        s["wait_max_ms"] = round(1000 * s.pop("wait_max_s"), 3)
+        s.pop("wait_total_s")
+        return s
@@ -6,25 +6,23 @@ def create_portfolio():
     if not name:
         print("Portfolio name is needed!!!")
         return
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO portfolios (portfolio_name) VALUES (%s);", (name,))
-        conn.commit()
-        print("Your portfolio is created.Woah!")
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        cur.close()
-        conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("INSERT INTO portfolios (portfolio_name) VALUES (%s);", (name,))
+            conn.commit()
+            print("Your portfolio is created.Woah!")
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            cur.close()
 
 def list_portfolios():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT portfolio_id, portfolio_name, created_at FROM portfolios;")
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT portfolio_id, portfolio_name, created_at FROM portfolios;")
+        rows = cur.fetchall()
+        cur.close()
 
     if not rows:
         print("(There are no portfolios yet!)")
@@ -1,100 +1,221 @@
 #Handling the price data for symbols
+import csv
+import os
+import tempfile
 from datetime import datetime
 from typing import List, Tuple
+import numpy as np
 import pandas as pd
 import yfinance as yf
 from preprocessing import preprocess_stock_data
 
 
-from db_config import get_connection
+from db_config import get_connection, get_unpooled_connection
 
 
 #Get symbol from portfolio
 def get_symbols_for_portfolio(pid: int) -> List[str]:
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT stock_symbol FROM portfolio_stocks WHERE portfolio_id=%s;", (pid,))
-    symbols = [r[0] for r in cur.fetchall()]
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT stock_symbol FROM portfolio_stocks WHERE portfolio_id=%s;", (pid,))
+        symbols = [r[0] for r in cur.fetchall()]
+        cur.close()
     return symbols
 
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+LONG_COLS = ["symbol", "dt", "open", "high", "low", "close", "volume"]
+
+
 #Download data from yahoo finance and converting it into data frame
 def fetch_prices(symbols: List[str], start: str, end: str) -> pd.DataFrame:
     if not symbols:
-        return pd.DataFrame(columns=["symbol", "dt", "open", "high", "low", "close", "volume"])
+        return pd.DataFrame(columns=LONG_COLS)
     if isinstance(symbols, str):
         symbols = [symbols]
 
     df = yf.download(symbols, start=start, end=end, auto_adjust=False, progress=False, threads=True)
     if df.empty:
-        return pd.DataFrame(columns=["symbol", "dt", "open", "high", "low", "close", "volume"])
+        return pd.DataFrame(columns=LONG_COLS)
+    return to_long_format(df, symbols)
 
-    rows = []
 
+#yfinance wide frame -> one row per (symbol, dt), done as a single reshape of the value block.
+#Handles (field, ticker) and (ticker, field) column layouts as well as flat single-ticker frames.
+#Rows come out grouped by symbol (in the order asked for), then by date; volume is nullable Int64.
+def to_long_format(df: pd.DataFrame, symbols: List[str]) -> pd.DataFrame:
     if isinstance(df.columns, pd.MultiIndex):
-        if {"Open", "High", "Low", "Close", "Volume"}.intersection(df.columns.get_level_values(0)):
-            df = df.swaplevel(0, 1, axis=1)  
+        if set(FIELDS).intersection(df.columns.get_level_values(0)):
+            df = df.swaplevel(0, 1, axis=1)
         syms_in_df = set(df.columns.get_level_values(0))
-        for sym in [s for s in symbols if s in syms_in_df]:
-            sub = df[sym].reindex(columns=["Open", "High", "Low", "Close", "Volume"])
-            for idx, r in sub.dropna(how="all").iterrows():
-                v = r["Volume"]
-                rows.append([sym, idx.date(), r["Open"], r["High"], r["Low"], r["Close"],
-                             int(v) if pd.notna(v) else None])
+        syms = [s for s in symbols if s in syms_in_df]
+        wide = df.reindex(columns=pd.MultiIndex.from_product([syms, FIELDS]))
     else:
         # Single ticker: flat columns
-        sym = symbols[0]
-        sub = df.reindex(columns=["Open", "High", "Low", "Close", "Volume"])
-        for idx, r in sub.dropna(how="all").iterrows():
-            v = r["Volume"]
-            rows.append([sym, idx.date(), r["Open"], r["High"], r["Low"], r["Close"],
-                         int(v) if pd.notna(v) else None])
+        syms = symbols[:1]
+        wide = df.reindex(columns=FIELDS)
+
+    if not syms:
+        return pd.DataFrame(columns=LONG_COLS)
+
+    n_dates, n_syms, n_fields = len(wide.index), len(syms), len(FIELDS)
+    # (dates, syms*fields) -> (syms, dates, fields) -> (syms*dates, fields)
+    block = wide.to_numpy(dtype=float).reshape(n_dates, n_syms, n_fields).transpose(1, 0, 2).reshape(-1, n_fields)
+    keep = ~np.isnan(block).all(axis=1)
+    block = block[keep]
+
+    dates = pd.DatetimeIndex(wide.index)
+    out = pd.DataFrame({
+        "symbol": np.repeat(np.array(syms, dtype=object), n_dates)[keep],
+        "dt": np.tile(dates.date, n_syms)[keep],
+        "open": block[:, 0],
+        "high": block[:, 1],
+        "low": block[:, 2],
+        "close": block[:, 3],
+        "volume": pd.array(block[:, 4], dtype="Float64").round().astype("Int64"),
+    })
+    return out
+
+
+PRICE_COLS = ["stock_symbol", "dt", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+UPSERT_SQL = """
+    INSERT INTO {table} (stock_symbol, dt, open_price, high_price, low_price, close_price, volume)
+    VALUES (%s,%s,%s,%s,%s,%s,%s)
+    ON DUPLICATE KEY UPDATE
+        open_price=VALUES(open_price), high_price=VALUES(high_price), low_price=VALUES(low_price),
+        close_price=VALUES(close_price), volume=VALUES(volume)
+"""
 
-    return pd.DataFrame(rows, columns=["symbol", "dt", "open", "high", "low", "close", "volume"])
 
+#Turn the frame into plain python tuples (NaN -> NULL) in one columnar pass
+def _price_rows(df: pd.DataFrame) -> List[tuple]:
+    cols = [
+        df["symbol"].astype(str).tolist(),
+        pd.to_datetime(df["dt"]).dt.date.tolist(),
+    ]
+    for c in ["open", "high", "low", "close"]:
+        v = df[c].astype(float)
+        cols.append(v.astype(object).where(v.notna(), None).tolist())
+    vol = pd.to_numeric(df["volume"], errors="coerce")
+    cols.append([int(x) if pd.notna(x) else None for x in vol.tolist()])
+    return list(zip(*cols))
 
-#Add stock info
-def upsert_prices(df: pd.DataFrame) -> Tuple[int, int]:
+
+#How many of these symbols' rows are already stored in the date window
+def _count_existing(cur, rows: List[tuple], table: str) -> int:
+    symbols = sorted({r[0] for r in rows})
+    dmin = min(r[1] for r in rows)
+    dmax = max(r[1] for r in rows)
+    marks = ",".join(["%s"] * len(symbols))
+    cur.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE stock_symbol IN ({marks}) AND dt BETWEEN %s AND %s;",
+        (*symbols, dmin, dmax)
+    )
+    return cur.fetchone()[0]
+
+
+def _load_data_infile(cur, rows: List[tuple], table: str):
+    # stage through a temp table with LOAD DATA LOCAL INFILE, then one set-based upsert
+    with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, newline="") as f:
+        w = csv.writer(f)
+        for r in rows:
+            w.writerow(["\\N" if v is None else v for v in r])
+        path = f.name
+    try:
+        cur.execute(f"CREATE TEMPORARY TABLE IF NOT EXISTS stock_prices_stage LIKE {table};")
+        cur.execute("TRUNCATE TABLE stock_prices_stage;")
+        cur.execute(
+            f"""
+            LOAD DATA LOCAL INFILE %s INTO TABLE stock_prices_stage
+            FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"'
+            LINES TERMINATED BY '\\r\\n'
+            ({", ".join(PRICE_COLS)})
+            """,
+            (path,)
+        )
+        cur.execute(
+            f"""
+            INSERT INTO {table} ({", ".join(PRICE_COLS)})
+            SELECT {", ".join(PRICE_COLS)} FROM stock_prices_stage
+            ON DUPLICATE KEY UPDATE
+                open_price=VALUES(open_price), high_price=VALUES(high_price), low_price=VALUES(low_price),
+                close_price=VALUES(close_price), volume=VALUES(volume)
+            """
+        )
+        cur.execute("DROP TEMPORARY TABLE IF EXISTS stock_prices_stage;")
+    finally:
+        os.remove(path)
+
+
+#Add stock info (bulk): INSERT ... ON DUPLICATE KEY UPDATE in executemany batches.
+#method="load_data" stages the rows with LOAD DATA LOCAL INFILE instead
+#(the server needs local_infile=1).
+#Returns (inserted, updated): input rows repeating a (symbol, day) are dropped first (the last
+#one wins, as it would in the table), then "updated" is every remaining row whose key was
+#already stored, whether or not its values changed.
+def upsert_prices(df: pd.DataFrame, batch_size: int = 1000, method: str = "executemany",
+                  table: str = "stock_prices") -> Tuple[int, int]:
+    if df.empty:
+        return (0, 0)
+
+    rows = list({(r[0], r[1]): r for r in _price_rows(df)}.values())
+    with (get_unpooled_connection(allow_local_infile=True) if method == "load_data" else get_connection()) as conn:
+        cur = conn.cursor()
+        try:
+            # the row counts from ON DUPLICATE KEY depend on the client's FOUND_ROWS flag and
+            # count changed rows twice, so count stored rows before and after instead (same transaction)
+            before = _count_existing(cur, rows, table)
+            if method == "load_data":
+                _load_data_infile(cur, rows, table)
+            else:
+                sql = UPSERT_SQL.format(table=table)
+                for i in range(0, len(rows), batch_size):
+                    cur.executemany(sql, rows[i:i + batch_size])
+            after = _count_existing(cur, rows, table)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    inserted = after - before
+    return (inserted, len(rows) - inserted)
+
+
+#Row-by-row version (SELECT then UPDATE/INSERT per bar), kept for comparison in bench_upsert.py
+def upsert_prices_rowwise(df: pd.DataFrame, table: str = "stock_prices") -> Tuple[int, int]:
     if df.empty:
         return (0, 0)
 
-    conn = get_connection()
-    cur = conn.cursor()
     inserted, updated = 0, 0
+    with get_connection() as conn:
+        cur = conn.cursor()
+        for r in _price_rows(df):
+            cur.execute(f"SELECT id FROM {table} WHERE stock_symbol=%s AND dt=%s;", (r[0], r[1]))
+            row = cur.fetchone()
+            if row:
+                cur.execute(
+                    f"""
+                    UPDATE {table}
+                       SET open_price=%s, high_price=%s, low_price=%s, close_price=%s, volume=%s
+                     WHERE id=%s
+                    """,
+                    (*r[2:], row[0])
+                )
+                updated += 1
+            else:
+                cur.execute(
+                    f"""
+                    INSERT INTO {table} (stock_symbol, dt, open_price, high_price, low_price, close_price, volume)
+                    VALUES (%s,%s,%s,%s,%s,%s,%s)
+                    """,
+                    r
+                )
+                inserted += 1
 
-    for _, r in df.iterrows():
-        cur.execute(
-            "SELECT id FROM stock_prices WHERE stock_symbol=%s AND dt=%s;",
-            (r["symbol"], r["dt"])
-        )
-        row = cur.fetchone()
-        if row:
-            cur.execute(
-                """
-                UPDATE stock_prices
-                   SET open_price=%s, high_price=%s, low_price=%s, close_price=%s, volume=%s
-                 WHERE id=%s
-                """,
-                (r["open"], r["high"], r["low"], r["close"],
-                 int(r["volume"]) if pd.notna(r["volume"]) else None,
-                 row[0])
-            )
-            updated += 1
-        else:
-            cur.execute(
-                """
-                INSERT INTO stock_prices (stock_symbol, dt, open_price, high_price, low_price, close_price, volume)
-                VALUES (%s,%s,%s,%s,%s,%s,%s)
-                """,
-                (r["symbol"], r["dt"], r["open"], r["high"], r["low"], r["close"],
-                 int(r["volume"]) if pd.notna(r["volume"]) else None)
-            )
-            inserted += 1
-
-    conn.commit()
-    cur.close()
-    conn.close()
+        conn.commit()
+        cur.close()
     return (inserted, updated)
 
 #Get the symbols and fetch relevant price data
@@ -123,18 +244,17 @@ def fetch_and_store_for_portfolio(pid: int, start: str, end: str) -> Tuple[int,
 def query_prices(symbol: str, start: str, end: str):
     sdt = datetime.strptime(start, "%Y-%m-%d").date()
     edt = datetime.strptime(end, "%Y-%m-%d").date()
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT dt, open_price, high_price, low_price, close_price, volume
-          FROM stock_prices
-         WHERE stock_symbol=%s AND dt BETWEEN %s AND %s
-         ORDER BY dt
-        """,
-        (symbol.upper().strip(), sdt, edt)
-    )
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT dt, open_price, high_price, low_price, close_price, volume
+              FROM stock_prices
+             WHERE stock_symbol=%s AND dt BETWEEN %s AND %s
+             ORDER BY dt
+            """,
+            (symbol.upper().strip(), sdt, edt)
+        )
+        rows = cur.fetchall()
+        cur.close()
     return rows
@@ -14,17 +14,16 @@ def show_portfolio_stocks():
     if not rows:
         return
     pid = input_int("Enter portfolio ID to view stocks: ")
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT stock_symbol, added_at
-          FROM portfolio_stocks
-         WHERE portfolio_id = %s
-         ORDER BY added_at DESC;
-    """, (pid,))
-    stocks = cur.fetchall()
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT stock_symbol, added_at
+              FROM portfolio_stocks
+             WHERE portfolio_id = %s
+             ORDER BY added_at DESC;
+        """, (pid,))
+        stocks = cur.fetchall()
+        cur.close()
 
     if not stocks:
         print("(No stocks in this portfolio)")
@@ -45,20 +44,19 @@ def add_stock_to_portfolio():
         print("Symbol needed")
         return
 
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            "INSERT INTO portfolio_stocks (portfolio_id, stock_symbol) VALUES (%s, %s);",
-            (pid, symbol),
-        )
-        conn.commit()
-        print("Stock added.Success!!")
-    except Exception as e:
-        print(f"Error: {e}")
-    finally:
-        cur.close()
-        conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                "INSERT INTO portfolio_stocks (portfolio_id, stock_symbol) VALUES (%s, %s);",
+                (pid, symbol),
+            )
+            conn.commit()
+            print("Stock added.Success!!")
+        except Exception as e:
+            print(f"Error: {e}")
+        finally:
+            cur.close()
 
 def remove_stock_from_portfolio():
     rows = list_portfolios()
@@ -67,19 +65,18 @@ def remove_stock_from_portfolio():
     pid = input_int("Enter portfolio ID to remove a stock from: ")
     symbol = input("Enter stock symbol to remove example AAPL: ").upper().strip()
 
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "DELETE FROM portfolio_stocks WHERE portfolio_id=%s AND stock_symbol=%s;",
-        (pid, symbol),
-    )
-    conn.commit()
-    if cur.rowcount > 0:
-        print("Stock removed.")
-    else:
-        print("Nothing removed.")
-    cur.close()
-    conn.close()
+    with get_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(
+            "DELETE FROM portfolio_stocks WHERE portfolio_id=%s AND stock_symbol=%s;",
+            (pid, symbol),
+        )
+        conn.commit()
+        if cur.rowcount > 0:
+            print("Stock removed.")
+        else:
+            print("Nothing removed.")
+        cur.close()
 
 def menu():
     while True:
@@ -25,26 +25,26 @@ def fetch_posts(subreddit_name, post_limit):
     if not connection:
         return 
 
-    db_handler.create_table(connection)
+    with connection:
+        db_handler.create_table(connection)
 
-    print("Starting to fetch posts...")
-    fetched_count = 0
-    for post in subreddit.new(limit=300):
-        author_name = post.author.name if post.author else None
+        print("Starting to fetch posts...")
+        fetched_count = 0
+        for post in subreddit.new(limit=300):
+            author_name = post.author.name if post.author else None
         
-        post_data = (
-            post.id,
-            subreddit.display_name,
-            post.title,
-            mask_username(author_name),
-            post.created_utc,
-            post.selftext
-        )
+            post_data = (
+                post.id,
+                subreddit.display_name,
+                post.title,
+                mask_username(author_name),
+                post.created_utc,
+                post.selftext
+            )
         
-        db_handler.insert_post(connection, post_data)
-        fetched_count += 1
-        print(f"Fetched and stored post {fetched_count}/{post_limit}: {post.id}")
+            db_handler.insert_post(connection, post_data)
+            fetched_count += 1
+            print(f"Fetched and stored post {fetched_count}/{post_limit}: {post.id}")
         
-    print(f"\nFinished fetching {fetched_count} posts.")
-    connection.close()
+        print(f"\nFinished fetching {fetched_count} posts.")
     print("Database connection closed.")
\ No newline at end of file
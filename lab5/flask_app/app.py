@@ -15,9 +15,8 @@ def index():
         query = request.form['query']
         cluster_id = analysis.find_matching_cluster(query)
         if cluster_id is not None:
-            connection = db_handler.create_connection()
-            posts = db_handler.fetch_posts_by_cluster(connection, cluster_id)
-            connection.close()
+            with db_handler.create_connection() as connection:
+                posts = db_handler.fetch_posts_by_cluster(connection, cluster_id)
             results = {'cluster_id': cluster_id, 'posts': posts}
             
     return render_template('index.html', results=results)
\ No newline at end of file